@@ -0,0 +1,147 @@
+import hashlib
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+ZIP_LOCAL_MAGIC = b'PK\x03\x04'
+ZIP_EOCD_MAGIC = b'PK\x05\x06'
+ZIP64_LOCATOR_MAGIC = b'PK\x06\x07'
+ZIP64_EOCD_MAGIC = b'PK\x06\x06'
+ZIP_CENTRAL_MAGIC = b'PK\x01\x02'
+EOCD_SIZE = 22
+MAX_COMMENT = 0xFFFF
+
+class InvalidAPKError(Exception):
+    """Downloaded bytes are not a usable APK"""
+
+@dataclass
+class ZipEntry:
+    """One central-directory record"""
+    name: str
+    crc32: int
+    compressed_size: int
+    file_size: int
+    local_offset: int
+    method: int
+
+@dataclass
+class APKArtifact:
+    """A downloaded APK that has already been hashed and checked"""
+    path: str
+    size: int
+    sha256: str
+    url: Optional[str] = None
+    entries: List[ZipEntry] = field(default_factory=list, repr=False)
+    from_store: bool = False
+    # Delta package from the previous version, when the delta stage made one
+    delta_path: Optional[str] = None
+
+    @property
+    def has_manifest(self):
+        return any(entry.name == 'AndroidManifest.xml' for entry in self.entries)
+
+class StreamValidator:
+    """Validate an APK while its bytes stream in, in file order.
+
+    Keeps a rolling SHA-256, rejects HTML/error pages on the first chunk
+    and checks the final length against Content-Length.
+    """
+    def __init__(self, expected_size=None):
+        self.expected_size = expected_size
+        self.position = 0
+        self._sha256 = hashlib.sha256()
+
+    def update(self, chunk):
+        if self.position == 0 and chunk:
+            check_magic(chunk)
+        self._sha256.update(chunk)
+        self.position += len(chunk)
+        if self.expected_size is not None and self.position > self.expected_size:
+            raise InvalidAPKError(f"received {self.position} bytes, more than the advertised {self.expected_size}")
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def finish(self):
+        if self.expected_size is not None and self.position != self.expected_size:
+            raise InvalidAPKError(f"received {self.position} bytes, Content-Length was {self.expected_size}")
+        return self.hexdigest()
+
+def check_magic(head):
+    """Raise InvalidAPKError unless head starts like a zip file"""
+    if head.startswith(ZIP_LOCAL_MAGIC[:len(head)]):
+        return
+    sniff = head[:512].lstrip().lower()
+    if sniff.startswith((b'<!doctype', b'<html', b'<head', b'<body', b'<?xml', b'<')):
+        raise InvalidAPKError("server returned an HTML page instead of an APK")
+    if sniff.startswith((b'{', b'[')):
+        raise InvalidAPKError("server returned JSON instead of an APK")
+    raise InvalidAPKError(f"unexpected file header {head[:4]!r}")
+
+def read_central_directory(f, size):
+    """Parse the zip central directory using only the tail of an open file"""
+    tail_size = min(size, EOCD_SIZE + MAX_COMMENT)
+    f.seek(size - tail_size)
+    tail = f.read(tail_size)
+    eocd = tail.rfind(ZIP_EOCD_MAGIC)
+    if eocd < 0:
+        raise InvalidAPKError("no zip end-of-central-directory record")
+
+    (_, _, _, _, count, cd_size, cd_offset, _) = struct.unpack('<4sHHHHIIH', tail[eocd:eocd + EOCD_SIZE])
+
+    locator = eocd - 20
+    if locator >= 0 and tail[locator:locator + 4] == ZIP64_LOCATOR_MAGIC:
+        (_, _, eocd64_offset, _) = struct.unpack('<4sIQI', tail[locator:locator + 20])
+        f.seek(eocd64_offset)
+        record = f.read(56)
+        if record[:4] != ZIP64_EOCD_MAGIC:
+            raise InvalidAPKError("corrupt zip64 end-of-central-directory record")
+        (count, cd_size, cd_offset) = struct.unpack('<QQQ', record[32:56])
+
+    if cd_offset + cd_size > size:
+        raise InvalidAPKError("central directory points past the end of the file")
+
+    f.seek(cd_offset)
+    directory = f.read(cd_size)
+    entries = []
+    pos = 0
+    while pos + 46 <= len(directory) and directory[pos:pos + 4] == ZIP_CENTRAL_MAGIC:
+        (method, crc32, compressed_size, file_size,
+         name_len, extra_len, comment_len, local_offset) = struct.unpack(
+            '<10xH4xIIIHHH8xI', directory[pos:pos + 46])
+        name = directory[pos + 46:pos + 46 + name_len].decode('utf-8', errors='replace')
+        extra = directory[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+        if 0xFFFFFFFF in (compressed_size, file_size, local_offset):
+            file_size, compressed_size, local_offset = _zip64_sizes(extra, file_size, compressed_size, local_offset)
+        entries.append(ZipEntry(name, crc32, compressed_size, file_size, local_offset, method))
+        pos += 46 + name_len + extra_len + comment_len
+
+    if len(entries) != count:
+        raise InvalidAPKError(f"central directory lists {len(entries)} of {count} entries")
+    return entries
+
+def _zip64_sizes(extra, file_size, compressed_size, local_offset):
+    """Apply the zip64 extended-information extra field to 32-bit placeholders"""
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack('<HH', extra[pos:pos + 4])
+        if tag == 0x0001:
+            values = list(struct.unpack(f'<{length // 8}Q', extra[pos + 4:pos + 4 + length - length % 8]))
+            if file_size == 0xFFFFFFFF and values:
+                file_size = values.pop(0)
+            if compressed_size == 0xFFFFFFFF and values:
+                compressed_size = values.pop(0)
+            if local_offset == 0xFFFFFFFF and values:
+                local_offset = values.pop(0)
+            break
+        pos += 4 + length
+    return file_size, compressed_size, local_offset
+
+def inspect_apk(path, size, sha256, url=None, from_store=False):
+    """Build an APKArtifact, reading only the zip tail of path"""
+    with open(path, 'rb') as f:
+        entries = read_central_directory(f, size)
+    artifact = APKArtifact(path=path, size=size, sha256=sha256, url=url, entries=entries, from_store=from_store)
+    if not artifact.has_manifest:
+        raise InvalidAPKError("zip has no AndroidManifest.xml entry")
+    return artifact
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Compare the single-pass extractor against the old BeautifulSoup lookups.
+
+Runs both over saved HTML pages and reports parse+extract time and peak
+memory per page, and flags any page where the two disagree. Also reports
+the streamed version probe: how much of each page it reads before the
+version is settled, and how long that takes.
+
+    python scripts/bench_extract.py 'fixtures/html/**/*.html' --repeat 20
+"""
+import argparse
+import glob
+import re
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from extractor import VERSION_PATTERN, VERSION_PROBE_CHUNK, scan_html, scan_until_version
+
+# -- reference implementation (the BeautifulSoup path the scraper used) ----
+
+def soup_version(soup):
+    version_pattern = VERSION_PATTERN
+    title = soup.find('title')
+    if title:
+        version_match = re.search(version_pattern, title.get_text(), re.I)
+        if version_match:
+            return version_match.group(0)
+    main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main', re.I))
+    if main_content:
+        version_match = re.search(version_pattern, main_content.get_text(), re.I)
+        if version_match:
+            return version_match.group(0)
+    version_elements = soup.find_all(['span', 'div', 'p'], string=re.compile(VERSION_PATTERN, re.I))
+    for element in version_elements:
+        match = re.search(version_pattern, element.get_text())
+        if match:
+            return match.group(0)
+    version_match = re.search(version_pattern, soup.get_text(), re.I)
+    return version_match.group(0) if version_match else None
+
+def soup_download_links(soup):
+    download_links = soup.find_all('a', href=re.compile(r'/download/\d+/', re.I))
+    if not download_links:
+        for button in soup.find_all(['a', 'button'], string=re.compile(r'download|begin download', re.I)):
+            href = button.get('href', '')
+            if href and '/download/' in href:
+                download_links.append(button)
+    if not download_links:
+        download_links = soup.find_all(['a', 'div'], attrs={'class': re.compile(r'download', re.I),
+                                                           'href': re.compile(r'.*')})
+    return [link.get('href') for link in download_links]
+
+def soup_apk_link(soup):
+    for link in soup.find_all('a', href=re.compile(r'\.apk($|\?|#)', re.I)):
+        if link.get('href', ''):
+            return link.get('href')
+    for element in soup.find_all(attrs={'data-download': True, 'href': re.compile(r'.*')}):
+        href = element.get('href', '')
+        if href and '.apk' in href.lower():
+            return href
+    for iframe in soup.find_all('iframe', src=re.compile(r'.*')):
+        src = iframe.get('src', '')
+        if src and '.apk' in src.lower():
+            return src
+    patterns = [
+        r'https?://[^"\']*\.apk[^"\']*',
+        r'downloadUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
+        r'fileUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
+        r'href\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']'
+    ]
+    for script in soup.find_all('script'):
+        if script.string:
+            for pattern in patterns:
+                matches = re.findall(pattern, script.string, re.I)
+                if matches:
+                    return matches[0]
+    return None
+
+def soup_extract(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup_version(soup), soup_download_links(soup), soup_apk_link(soup)
+
+def scan_extract(content):
+    scan = scan_html(content)
+    method, hrefs = scan.find_download_links()
+    return scan.find_version(), hrefs, scan.find_apk_link()[1]
+
+def probe_version(content):
+    chunks = (content[i:i + VERSION_PROBE_CHUNK] for i in range(0, len(content), VERSION_PROBE_CHUNK))
+    scan, _, size = scan_until_version(chunks)
+    return scan.find_version(), size
+
+# -- harness ---------------------------------------------------------------
+
+def measure(func, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(content)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML extraction against saved pages')
+    parser.add_argument('paths', nargs='*', default=['fixtures/html/**/*.html'],
+                        help='HTML files or glob patterns')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed iterations per page')
+    args = parser.parse_args()
+
+    files = []
+    for pattern in args.paths:
+        files.extend(sorted(glob.glob(pattern, recursive=True)))
+    if not files:
+        print("❌ No HTML fixtures found - record some pages first")
+        return 1
+
+    print(f"{'page':<40} {'size':>8} {'bs4 ms':>8} {'scan ms':>8} {'speedup':>8} {'bs4 MB':>7} {'scan MB':>7} "
+          f"{'probe ms':>8} {'read':>8}")
+    totals = [0.0, 0.0, 0.0]
+    sizes = [0, 0]
+    mismatches = 0
+    for path in files:
+        with open(path, 'rb') as f:
+            content = f.read()
+        soup_result, soup_time, soup_peak = measure(soup_extract, content, args.repeat)
+        scan_result, scan_time, scan_peak = measure(scan_extract, content, args.repeat)
+        (probe_result, probe_size), probe_time, _ = measure(probe_version, content, args.repeat)
+        totals[0] += soup_time
+        totals[1] += scan_time
+        totals[2] += probe_time
+        sizes[0] += len(content)
+        sizes[1] += probe_size
+
+        name = path if len(path) <= 40 else '...' + path[-37:]
+        print(f"{name:<40} {len(content) // 1024:>6}KB {soup_time * 1000:>8.2f} {scan_time * 1000:>8.2f} "
+              f"{soup_time / scan_time:>7.1f}x {soup_peak / 1e6:>7.2f} {scan_peak / 1e6:>7.2f} "
+              f"{probe_time * 1000:>8.2f} {probe_size // 1024:>6}KB")
+        if soup_result != scan_result:
+            mismatches += 1
+            print(f"   ⚠️  results differ: bs4={soup_result} scan={scan_result}")
+        if probe_result != scan_result[0]:
+            mismatches += 1
+            print(f"   ⚠️  probe version differs: probe={probe_result} scan={scan_result[0]}")
+
+    print(f"\n📊 {len(files)} pages: bs4 {totals[0] * 1000:.1f} ms, scan {totals[1] * 1000:.1f} ms "
+          f"({totals[0] / totals[1]:.1f}x), {mismatches} mismatches")
+    print(f"📊 version probe: {totals[2] * 1000:.1f} ms, read {sizes[1] / max(sizes[0], 1):.0%} of "
+          f"{sizes[0] // 1024} KB")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
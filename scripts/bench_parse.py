@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Measure HTML parse throughput against the number of parse worker processes.
+
+Parses saved pages from many threads at once, as the async pipeline does,
+first in-thread (workers=0, bound by the GIL) and then on ParsePools of
+increasing size. Reports pages per second, speedup over in-thread parsing
+and the one-off pool warm-up time, and checks every worker result against
+the in-thread one.
+
+Recorded pages are small, so --sizes also pads each one with related-app
+cards up to the given sizes (KB, 0 = as recorded) and reports the smallest
+page size at which a pool beats in-thread parsing. Below that crossover
+pickling and IPC cost more than the GIL does, which is why parsing stays
+in-thread unless APK_PARSE_WORKERS / --parse-workers says otherwise.
+
+    python scripts/bench_parse.py --workers 0,1,2,4,8 --threads 16 --repeat 5 --sizes 0,64,256,1024
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fixtures import FIXTURES_DIR
+from parse_pool import ParsePool, parse_record
+
+# Markup repeated to grow a page, shaped like the related-app grids on real pages
+_CARD = ('<div class="card"><a href="/app/related-{0}/"><img src="/img/{0}.webp" alt="Related app {0}" '
+         'loading="lazy"><h3>Related App {0}</h3></a><p class="meta"><span>v{0}.2.1</span> '
+         '<span>{0} MB</span></p><p>Premium unlocked build with every feature enabled, no ads.</p></div>\n')
+
+def inflate(content, size):
+    """content padded with related-app cards to about size bytes"""
+    cards = []
+    length = len(content)
+    while length < size:
+        card = _CARD.format(len(cards)).encode()
+        cards.append(card)
+        length += len(card)
+    if not cards:
+        return content
+    padding = b'<section class="related">' + b''.join(cards) + b'</section>'
+    position = content.rfind(b'</body>')
+    if position < 0:
+        return content + padding
+    return content[:position] + padding + content[position:]
+
+def run(parse, pages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(parse, pages))
+    return results, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parse throughput by worker count')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(FIXTURES_DIR, '**', '*.html')],
+                        help='HTML files or glob patterns')
+    parser.add_argument('--workers', default=f"0,1,2,{os.cpu_count() or 4}",
+                        help='Comma-separated worker counts to try (0 = parse in-thread)')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent callers')
+    parser.add_argument('--repeat', type=int, default=5, help='Times each page is parsed per run')
+    parser.add_argument('--sizes', default='0',
+                        help='Comma-separated page sizes in KB to pad the pages to (0 = as recorded)')
+    args = parser.parse_args()
+
+    files = []
+    for pattern in args.paths:
+        files.extend(sorted(glob.glob(pattern, recursive=True)))
+    if not files:
+        print("❌ No HTML fixtures found - record some with scripts/fixtures.py record first")
+        return 1
+    recorded = []
+    for path in files:
+        with open(path, 'rb') as f:
+            recorded.append(f.read())
+    worker_counts = [int(value) for value in args.workers.split(',')]
+
+    mismatches = 0
+    crossover = None
+    for size_kb in [int(value) for value in args.sizes.split(',')]:
+        contents = [inflate(content, size_kb * 1024) for content in recorded]
+        speedups, failed = bench_size(contents, worker_counts, args.threads, args.repeat)
+        mismatches += failed
+        if crossover is None and any(workers > 0 and speedup > 1.0 for workers, speedup in speedups.items()):
+            crossover = sum(map(len, contents)) // len(contents) // 1024
+        print()
+
+    if crossover is None:
+        print("⚖️  The pool never beat in-thread parsing at these sizes - keep APK_PARSE_WORKERS=0")
+    else:
+        print(f"⚖️  A pool beats in-thread parsing from pages of about {crossover} KB")
+    return 1 if mismatches else 0
+
+def bench_size(contents, worker_counts, threads, repeat):
+    """Print one table for these pages; returns ({workers: speedup}, mismatching runs)"""
+    pages = contents * repeat
+    expected = [parse_record(content) for content in contents] * repeat
+    print(f"📄 {len(contents)} pages ({sum(map(len, contents)) // 1024} KB) x {repeat}, {threads} threads\n")
+
+    print(f"{'workers':>7} {'warm-up s':>9} {'pages/s':>9} {'speedup':>8}")
+    baseline = None
+    speedups = {}
+    mismatches = 0
+    for workers in worker_counts:
+        warm_up = 0.0
+        pool = None
+        if workers > 0:
+            start = time.perf_counter()
+            pool = ParsePool(workers).warm_up()
+            warm_up = time.perf_counter() - start
+        try:
+            results, elapsed = run(pool.parse if pool else parse_record, pages, threads)
+        finally:
+            if pool:
+                pool.close()
+        rate = len(pages) / elapsed
+        baseline = baseline or rate
+        speedups[workers] = rate / baseline
+        print(f"{workers:>7} {warm_up:>9.2f} {rate:>9.1f} {rate / baseline:>7.2f}x")
+        if results != expected:
+            mismatches += 1
+            print(f"   ⚠️  results differ from in-thread parsing")
+    return speedups, mismatches
+
+if __name__ == "__main__":
+    raise SystemExit(main())
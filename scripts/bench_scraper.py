@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark GetModsApkScraper against recorded fixtures, with no network.
+
+Replays fixtures/html (see fixtures.py) from a local server and reports,
+per app, the requests made on the first (cold memo) and later (warm memo)
+resolutions, parse time per recorded page, and end-to-end latency of
+get_current_version and get_download_links.
+
+    python scripts/bench_scraper.py --repeat 20 --max-requests 2 --json bench.json
+
+Exits non-zero when a resolution fails or a --max-* budget is exceeded,
+so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from extractor import scan_html
+from fixtures import FIXTURES_DIR, FixtureServer
+from scraper import GetModsApkScraper
+from strategy_memo import StrategyMemo
+from utils import setup_session
+
+def parse_times(server, repeat):
+    """Mean scan_html time per recorded page, in ms"""
+    times = {}
+    for url, page in sorted(server.manifest['pages'].items()):
+        with open(os.path.join(server.directory, page['path']), 'rb') as f:
+            content = f.read()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scan_html(content)
+        times[url] = (time.perf_counter() - start) / repeat * 1000
+    return times
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def bench_app(scraper, server, app_url, repeat):
+    hits_before = sum(server.hits.values())
+    page = scraper.inspect_app(app_url, with_links=False)
+    cold_link = scraper.resolve_download_url(page) if page else None
+    cold_requests = sum(server.hits.values()) - hits_before
+
+    version_ms, resolve_ms, warm_requests = [], [], []
+    for _ in range(repeat):
+        _, elapsed = timed(scraper.get_current_version, app_url)
+        version_ms.append(elapsed)
+        hits_before = sum(server.hits.values())
+        link, elapsed = timed(scraper.get_download_links, app_url)
+        resolve_ms.append(elapsed)
+        warm_requests.append(sum(server.hits.values()) - hits_before)
+
+    return {
+        'app': app_url,
+        'resolved': bool(cold_link and link),
+        'requests_cold': cold_requests,
+        'requests_warm': max(warm_requests) if warm_requests else cold_requests,
+        'version_ms': statistics.median(version_ms) if version_ms else None,
+        'resolve_ms': statistics.median(resolve_ms) if resolve_ms else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraper against recorded fixtures')
+    parser.add_argument('--dir', default=FIXTURES_DIR, help='Fixture directory')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed iterations per app / page')
+    parser.add_argument('--json', help='Also write results to this file')
+    parser.add_argument('--max-requests', type=int, help='Fail if a warm resolution needs more requests')
+    parser.add_argument('--max-resolve-ms', type=float, help='Fail if median get_download_links exceeds this')
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.dir, 'manifest.json')):
+        print("❌ No fixtures found - record some with scripts/fixtures.py record first")
+        return 1
+
+    with FixtureServer(args.dir) as server, tempfile.TemporaryDirectory() as tmp:
+        session = setup_session(cache_dir=None, rate_limits=None)
+        scraper = GetModsApkScraper(session=session, memo=StrategyMemo(os.path.join(tmp, 'memo.json')))
+        scraper.base_domain = server.url
+
+        # The scraper narrates every step; keep the report readable
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            pages = parse_times(server, args.repeat)
+            apps = [bench_app(scraper, server, url, args.repeat) for url in server.app_urls()]
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    print(f"{'page':<60} {'parse ms':>9}")
+    for url, elapsed in pages.items():
+        name = url if len(url) <= 60 else '...' + url[-57:]
+        print(f"{name:<60} {elapsed:>9.2f}")
+
+    print(f"\n{'app':<50} {'req cold':>8} {'req warm':>8} {'version ms':>10} {'resolve ms':>10}")
+    failures = 0
+    for result in apps:
+        name = result['app'] if len(result['app']) <= 50 else '...' + result['app'][-47:]
+        print(f"{name:<50} {result['requests_cold']:>8} {result['requests_warm']:>8} "
+              f"{result['version_ms'] or 0:>10.2f} {result['resolve_ms'] or 0:>10.2f}")
+        if not result['resolved']:
+            failures += 1
+            print("   ❌ no APK link resolved")
+        if args.max_requests is not None and result['requests_warm'] > args.max_requests:
+            failures += 1
+            print(f"   ❌ {result['requests_warm']} requests, budget is {args.max_requests}")
+        if args.max_resolve_ms is not None and (result['resolve_ms'] or 0) > args.max_resolve_ms:
+            failures += 1
+            print(f"   ❌ resolve took {result['resolve_ms']:.1f} ms, budget is {args.max_resolve_ms} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'pages': pages, 'apps': apps}, f, indent=2)
+
+    total_requests = sum(result['requests_warm'] for result in apps)
+    print(f"\n📊 {len(apps)} apps, {len(pages)} pages, "
+          f"{total_requests / max(len(apps), 1):.1f} requests per app (warm), {failures} failures")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
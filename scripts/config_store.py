@@ -0,0 +1,206 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils import CONFIG_PATH, STATE_DIR, load_config, save_config
+
+CONFIG_DB_PATH = os.getenv('APK_CONFIG_DB', os.path.join(STATE_DIR, 'config.db'))
+# Fields stored in their own columns; anything else in an app entry is kept as JSON
+APP_COLUMNS = ('name', 'base_url', 'current_version', 'release_tag')
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    name TEXT PRIMARY KEY,
+    base_url TEXT,
+    current_version TEXT,
+    release_tag TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    position INTEGER NOT NULL,
+    imported_version TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS apps_release_tag ON apps (release_tag);
+CREATE TABLE IF NOT EXISTS version_history (
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (name, version)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class ConfigStore:
+    """Tracked-app configuration in SQLite, indexed by name and release tag.
+
+    config/apk-list.json stays the editable source: it is imported whenever
+    its contents change and exported again after versions are updated.
+    Version updates are single-row transactions, so concurrent workers (and
+    processes, via WAL and a busy timeout) never rewrite each other's apps.
+    """
+    def __init__(self, path=CONFIG_DB_PATH, json_path=CONFIG_PATH):
+        self.path = path
+        self.json_path = json_path
+        self.dirty = False
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        if os.path.exists(json_path):
+            self.sync_from_json()
+
+    def _connection(self):
+        # sqlite3 connections are not shared between threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _meta(self, db, key):
+        row = db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, db, key, value):
+        db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def sync_from_json(self):
+        """Import the JSON file if it changed since the last import and is not our own export"""
+        digest = _sha256(self.json_path)
+        with self._transaction() as db:
+            if digest in (self._meta(db, 'json_sha256'), self._meta(db, 'exported_sha256')):
+                return False
+        self.import_json(self.json_path)
+        return True
+
+    def import_json(self, path):
+        """Load apps from a config JSON file; apps missing from it are dropped.
+
+        A version the scraper advanced since the previous import is kept
+        unless the file itself now says something different.
+        """
+        config = load_config(path)
+        apps = config.get('tracked_apks', [])
+        extra_config = {key: value for key, value in config.items() if key != 'tracked_apks'}
+        with self._transaction() as db:
+            existing = {row['name']: row for row in db.execute('SELECT * FROM apps')}
+            for position, apk in enumerate(apps):
+                version = apk.get('current_version')
+                row = existing.get(apk['name'])
+                if row and row['imported_version'] == version:
+                    version = row['current_version']
+                db.execute(
+                    'INSERT OR REPLACE INTO apps (name, base_url, current_version, release_tag, extra, '
+                    'position, imported_version, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (apk['name'], apk.get('base_url'), version, apk.get('release_tag'),
+                     json.dumps({key: value for key, value in apk.items() if key not in APP_COLUMNS}),
+                     position, apk.get('current_version'), row['updated_at'] if row else time.time()))
+            names = [apk['name'] for apk in apps]
+            db.execute(f"DELETE FROM apps WHERE name NOT IN ({','.join('?' * len(names))})", names)
+            self._set_meta(db, 'config_extra', json.dumps(extra_config))
+            self._set_meta(db, 'json_sha256', _sha256(path))
+        print(f"📥 Imported {len(apps)} tracked apps from {path}")
+
+    def export_json(self, path=None):
+        """Write the current configuration back out in the apk-list.json format"""
+        path = path or self.json_path
+        config = self.as_config()
+        save_config(config, path)
+        with self._transaction() as db:
+            # imported_version and json_sha256 keep describing the last imported
+            # file: CI never commits the export, so the next checkout still has
+            # the old versions and must not roll the store back to them
+            self._set_meta(db, 'exported_sha256', _sha256(path))
+        self.dirty = False
+        return path
+
+    def flush(self):
+        if self.dirty and os.path.exists(self.json_path):
+            self.export_json()
+
+    def _to_apk(self, row):
+        apk = {'name': row['name'], 'base_url': row['base_url'],
+               'current_version': row['current_version'], 'release_tag': row['release_tag']}
+        apk.update(json.loads(row['extra']))
+        return apk
+
+    def as_config(self):
+        db = self._connection()
+        config = json.loads(self._meta(db, 'config_extra') or '{}')
+        config['tracked_apks'] = self.tracked_apks()
+        return config
+
+    def tracked_apks(self):
+        rows = self._connection().execute('SELECT * FROM apps ORDER BY position')
+        return [self._to_apk(row) for row in rows]
+
+    def get(self, name):
+        row = self._connection().execute('SELECT * FROM apps WHERE name = ?', (name,)).fetchone()
+        return self._to_apk(row) if row else None
+
+    def by_tag(self, release_tag):
+        row = self._connection().execute('SELECT * FROM apps WHERE release_tag = ?', (release_tag,)).fetchone()
+        return self._to_apk(row) if row else None
+
+    def update_version(self, name, version):
+        """Set one app's current_version; returns False if the app is unknown"""
+        with self._transaction() as db:
+            updated = db.execute('UPDATE apps SET current_version = ?, updated_at = ? WHERE name = ?',
+                                 (version, time.time(), name)).rowcount
+        if updated:
+            self.dirty = True
+            self.record_version(name, version)
+        return bool(updated)
+
+    def record_version(self, name, version, seen_at=None):
+        """Note that the site offered version; returns True the first time it is seen"""
+        with self._transaction() as db:
+            return bool(db.execute('INSERT OR IGNORE INTO version_history (name, version, first_seen) '
+                                   'VALUES (?, ?, ?)', (name, version, seen_at or time.time())).rowcount)
+
+    def version_history(self, name):
+        """[(version, first_seen), ...] for one app, oldest first"""
+        rows = self._connection().execute(
+            'SELECT version, first_seen FROM version_history WHERE name = ? ORDER BY first_seen', (name,))
+        return [(row['version'], row['first_seen']) for row in rows]
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+def shared_config_store():
+    """Process-wide config store; pending version updates are exported at exit"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ConfigStore()
+            atexit.register(_shared_store.flush)
+        return _shared_store
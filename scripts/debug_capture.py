@@ -0,0 +1,104 @@
+import atexit
+import os
+import queue
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+
+# Setting APK_DEBUG_HTML_DIR turns capture on without touching the command line
+DEBUG_HTML_DIR = os.getenv('APK_DEBUG_HTML_DIR')
+DEBUG_HTML_MAX_MB = int(os.getenv('APK_DEBUG_HTML_MAX_MB', '50'))
+DEBUG_QUEUE_SIZE = 64
+
+def app_slug(base_url):
+    """Directory name for an app, from the last segment of its page URL"""
+    path = urllib.parse.urlsplit(base_url).path.strip('/')
+    name = path.rsplit('/', 1)[-1] or urllib.parse.urlsplit(base_url).hostname or 'app'
+    return re.sub(r'[^A-Za-z0-9._-]+', '-', name)[:80]
+
+class DebugCapture:
+    """Save raw page bytes per app and step on a background thread.
+
+    Files land in <directory>/<app>/<YYYYmmddTHHMMSS>-<seq>-<step>.html,
+    where seq is a four-digit counter for this process. Once the directory
+    holds more than max_bytes, the oldest captures are deleted. Captures
+    are queued without blocking; if the writer falls behind they are
+    dropped rather than slowing the scraper down.
+    """
+    def __init__(self, directory, max_bytes=DEBUG_HTML_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=DEBUG_QUEUE_SIZE)
+        self._files = deque()
+        self._total = 0
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._scan_existing()
+        self._thread = threading.Thread(target=self._writer, name='debug-capture', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _scan_existing(self):
+        """Pick up captures from earlier runs so the size cap covers them too"""
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._files.append((path, size))
+            self._total += size
+
+    def capture(self, base_url, step, content):
+        """Queue content (bytes) for app base_url at pipeline step"""
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{seq:04d}-{re.sub(r'[^A-Za-z0-9._-]+', '-', step)}.html"
+        try:
+            self._queue.put_nowait((os.path.join(self.directory, app_slug(base_url), name), content))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, content = item
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(content)
+                self._files.append((path, len(content)))
+                self._total += len(content)
+                self._rotate()
+            except OSError as e:
+                print(f"⚠️  Could not write debug capture: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _rotate(self):
+        while self._total > self.max_bytes and self._files:
+            path, size = self._files.popleft()
+            self._total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Write out everything queued, then stop the writer"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped:
+            print(f"⚠️  Dropped {self.dropped} debug captures (writer could not keep up)")
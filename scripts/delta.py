@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Zip-entry delta packages between two versions of an APK.
+
+    python scripts/delta.py build old.apk new.apk -o new.apkdelta
+    python scripts/delta.py apply old.apk new.apkdelta -o new.apk
+
+A delta describes the new APK as a sequence of copies from the old one
+and literal bytes. Both central directories are read from memory-mapped
+files; every entry of the new APK whose CRC, compressed size and method
+match an entry of the old one (by name, else by content) has its local
+header and compressed data copied when the bytes are identical. All
+other bytes (changed entries, data descriptors, the signing block, the
+central directory) are stored as literals, LZMA-compressed. Applying a
+delta rebuilds the new APK byte for byte and checks its SHA-256.
+"""
+import argparse
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from artifact import ZIP_LOCAL_MAGIC, InvalidAPKError, read_central_directory
+
+DELTA_MAGIC = b'APKDLT01'
+DELTA_SUFFIX = '.apkdelta'
+LOCAL_HEADER = struct.Struct('<4s22xHH')
+LOCAL_HEADER_SIZE = 30
+# kind, old offset (copies only), length
+OP = struct.Struct('<BQQ')
+OP_COPY = 0
+OP_LITERAL = 1
+COMPARE_BLOCK = 1024 * 1024
+
+class DeltaError(Exception):
+    """A delta cannot be built or does not reproduce its target"""
+
+@dataclass
+class DeltaResult:
+    """Outcome of building one delta package"""
+    path: str
+    size: int
+    target_size: int
+    entries: int
+    reused: int
+    seconds: float
+
+    @property
+    def ratio(self):
+        return self.size / self.target_size if self.target_size else 1.0
+
+def _sha256(data):
+    digest = hashlib.sha256()
+    for start in range(0, len(data), COMPARE_BLOCK):
+        digest.update(data[start:start + COMPARE_BLOCK])
+    return digest.hexdigest()
+
+def _map(f):
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+        raise DeltaError(f"{f.name} is empty")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+
+def _entry_regions(data, entry):
+    """(header start, data start, data end) of an entry's local record"""
+    start = entry.local_offset
+    signature, name_len, extra_len = LOCAL_HEADER.unpack_from(data, start)
+    if signature != ZIP_LOCAL_MAGIC:
+        raise DeltaError(f"no local header for {entry.name} at {start}")
+    data_start = start + LOCAL_HEADER_SIZE + name_len + extra_len
+    return start, data_start, data_start + entry.compressed_size
+
+def _same_bytes(old, old_start, new, new_start, length):
+    for offset in range(0, length, COMPARE_BLOCK):
+        size = min(COMPARE_BLOCK, length - offset)
+        if old[old_start + offset:old_start + offset + size] != new[new_start + offset:new_start + offset + size]:
+            return False
+    return True
+
+def plan_ops(old, old_size, new, new_size):
+    """Copy/literal ops that turn old into new, plus (entries, reused) counts"""
+    old_entries = read_central_directory(old, old_size)
+    new_entries = read_central_directory(new, new_size)
+    by_name = {entry.name: entry for entry in old_entries}
+    by_content = {}
+    for entry in old_entries:
+        by_content.setdefault((entry.crc32, entry.compressed_size, entry.method), entry)
+
+    copies = []
+    reused = 0
+    for entry in sorted(new_entries, key=lambda entry: entry.local_offset):
+        key = (entry.crc32, entry.compressed_size, entry.method)
+        match = by_name.get(entry.name)
+        if match is None or (match.crc32, match.compressed_size, match.method) != key:
+            match = by_content.get(key)
+        if match is None:
+            continue
+        new_start, new_data, new_end = _entry_regions(new, entry)
+        old_start, old_data, old_end = _entry_regions(old, match)
+        if not _same_bytes(old, old_data, new, new_data, new_end - new_data):
+            continue
+        reused += 1
+        header_size = new_data - new_start
+        if old_data - old_start == header_size and _same_bytes(old, old_start, new, new_start, header_size):
+            copies.append((new_start, old_start, new_end - new_start))
+        else:
+            copies.append((new_data, old_data, new_end - new_data))
+
+    ops = []
+    cursor = 0
+    for new_start, old_start, length in copies:
+        if new_start < cursor:
+            # Overlapping records (a malformed zip); keep it simple and store them
+            continue
+        if new_start > cursor:
+            _append(ops, OP_LITERAL, 0, new_start - cursor)
+        _append(ops, OP_COPY, old_start, length)
+        cursor = new_start + length
+    if cursor < new_size:
+        _append(ops, OP_LITERAL, 0, new_size - cursor)
+    return ops, len(new_entries), reused
+
+def _append(ops, kind, offset, length):
+    """Add an op, merging it into the previous one when they are contiguous"""
+    if ops:
+        last_kind, last_offset, last_length = ops[-1]
+        if kind == last_kind == OP_LITERAL or (kind == last_kind == OP_COPY and last_offset + last_length == offset):
+            ops[-1] = (last_kind, last_offset, last_length + length)
+            return
+    ops.append((kind, offset, length))
+
+def build_delta(old_path, new_path, out_path):
+    """Write a delta that rebuilds new_path from old_path; returns a DeltaResult"""
+    start = time.perf_counter()
+    with open(old_path, 'rb') as old_file, open(new_path, 'rb') as new_file:
+        old, old_size = _map(old_file)
+        new, new_size = _map(new_file)
+        try:
+            ops, entries, reused = plan_ops(old, old_size, new, new_size)
+            header = json.dumps({
+                'format': 1,
+                'base_sha256': _sha256(old),
+                'base_size': old_size,
+                'target_sha256': _sha256(new),
+                'target_size': new_size,
+                'ops': len(ops),
+                'entries': entries,
+                'reused': reused
+            }).encode('utf-8')
+
+            tmp_path = out_path + '.tmp'
+            with open(tmp_path, 'wb') as out:
+                out.write(DELTA_MAGIC + struct.pack('<I', len(header)) + header)
+                compressor = lzma.LZMACompressor(preset=6)
+                out.write(compressor.compress(b''.join(OP.pack(*op) for op in ops)))
+                position = 0
+                for kind, offset, length in ops:
+                    if kind == OP_LITERAL:
+                        for block in range(position, position + length, COMPARE_BLOCK):
+                            out.write(compressor.compress(new[block:min(block + COMPARE_BLOCK, position + length)]))
+                    position += length
+                out.write(compressor.flush())
+            os.replace(tmp_path, out_path)
+        finally:
+            old.close()
+            new.close()
+    return DeltaResult(out_path, os.path.getsize(out_path), new_size, entries, reused, time.perf_counter() - start)
+
+def read_header(f):
+    if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise DeltaError("not an APK delta package")
+    (length,) = struct.unpack('<I', f.read(4))
+    return json.loads(f.read(length).decode('utf-8'))
+
+def apply_delta(old_path, delta_path, out_path):
+    """Rebuild the target APK from old_path and a delta; returns its SHA-256"""
+    with open(old_path, 'rb') as old_file, open(delta_path, 'rb') as delta_file:
+        header = read_header(delta_file)
+        old, old_size = _map(old_file)
+        try:
+            if old_size != header['base_size'] or _sha256(old) != header['base_sha256']:
+                raise DeltaError(f"{old_path} is not the APK this delta was built against")
+
+            digest = hashlib.sha256()
+            tmp_path = out_path + '.tmp'
+            try:
+                with lzma.open(delta_file) as payload, open(tmp_path, 'wb') as out:
+                    raw_ops = payload.read(OP.size * header['ops'])
+                    if len(raw_ops) != OP.size * header['ops']:
+                        raise DeltaError("delta is truncated")
+                    for kind, offset, length in OP.iter_unpack(raw_ops):
+                        for block in range(0, length, COMPARE_BLOCK):
+                            size = min(COMPARE_BLOCK, length - block)
+                            if kind == OP_COPY:
+                                data = old[offset + block:offset + block + size]
+                            else:
+                                data = payload.read(size)
+                            if len(data) != size:
+                                raise DeltaError("delta is truncated")
+                            digest.update(data)
+                            out.write(data)
+            except (EOFError, lzma.LZMAError) as e:
+                os.remove(tmp_path)
+                raise DeltaError(f"delta is truncated or corrupt: {e}") from e
+            except DeltaError:
+                os.remove(tmp_path)
+                raise
+        finally:
+            old.close()
+
+    if digest.hexdigest() != header['target_sha256'] or os.path.getsize(tmp_path) != header['target_size']:
+        os.remove(tmp_path)
+        raise DeltaError("rebuilt APK does not match the target SHA-256")
+    os.replace(tmp_path, out_path)
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and apply zip-entry APK deltas')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='Make a delta from OLD to NEW')
+    build_parser.add_argument('old')
+    build_parser.add_argument('new')
+    build_parser.add_argument('-o', '--output', help=f'Delta file (default: NEW{DELTA_SUFFIX})')
+    apply_parser = commands.add_parser('apply', help='Rebuild NEW from OLD and a delta')
+    apply_parser.add_argument('old')
+    apply_parser.add_argument('delta')
+    apply_parser.add_argument('-o', '--output', required=True, help='Where to write the rebuilt APK')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            result = build_delta(args.old, args.new, args.output or args.new + DELTA_SUFFIX)
+            print(f"🧩 {result.path}: {result.size} bytes, {result.ratio:.1%} of the APK "
+                  f"({result.reused}/{result.entries} entries reused), built in {result.seconds:.2f}s")
+        else:
+            start = time.perf_counter()
+            digest = apply_delta(args.old, args.delta, args.output)
+            print(f"✅ Rebuilt {args.output} (sha256 {digest[:12]}) in {time.perf_counter() - start:.2f}s")
+    except (DeltaError, InvalidAPKError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
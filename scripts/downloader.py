@@ -1,19 +1,153 @@
-from utils import setup_session, load_config, save_config
-import requests
+from utils import shared_session
+from config_store import shared_config_store
+import json
 import os
-from github import Github
+import socket
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import ReadTimeoutError
+from releases import GitHubReleases
+from store import ContentStore
+from metrics import METRICS
+from artifact import InvalidAPKError, StreamValidator, check_magic, inspect_apk
+from delta import DELTA_SUFFIX, DeltaError, build_delta
 import re
 
+# Parallel ranged downloads
+DOWNLOAD_CONNECTIONS = int(os.getenv('APK_DOWNLOAD_CONNECTIONS', '4'))
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024
+PARALLEL_MIN_SEGMENT = 4 * 1024 * 1024
+DOWNLOAD_ATTEMPTS = 5
+
+# A transfer averaging under STALL_MIN_RATE over STALL_WINDOW seconds has stalled;
+# the read timeout matches so a silent connection counts as stalled too
+STALL_WINDOW = float(os.getenv('APK_STALL_SECONDS', '20'))
+STALL_MIN_RATE = int(os.getenv('APK_STALL_MIN_KBPS', '32')) * 1024
+DOWNLOAD_TIMEOUT = (10, STALL_WINDOW)
+
+# Mirror racing: resolve every candidate link and sample each APK URL first
+MIRROR_RACING = os.getenv('APK_RACE_MIRRORS', '') == '1'
+MIRROR_PROBE_BYTES = 256 * 1024
+MIRROR_PROBE_SECONDS = 3
+
+# Delta stage: also publish a zip-entry delta from the previous stored version,
+# unless it comes out larger than DELTA_MAX_RATIO of the APK
+DELTA_ARTIFACTS = os.getenv('APK_DELTAS', '') == '1'
+DELTA_MAX_RATIO = 0.9
+
+# Adaptive read sizes: aim for reads that take about CHUNK_TARGET_SECONDS
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.25
+STATE_SAVE_INTERVAL = 8 * 1024 * 1024
+
+class DownloadStalledError(IOError):
+    """A transfer stopped making progress"""
+
+class StallDetector:
+    """Raise DownloadStalledError when a response averages too few bytes per second"""
+    def __init__(self, window=STALL_WINDOW, min_rate=STALL_MIN_RATE):
+        self.window = window
+        self.min_rate = min_rate
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+    
+    def update(self, count):
+        self.window_bytes += count
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+        rate = self.window_bytes / elapsed
+        if rate < self.min_rate:
+            raise DownloadStalledError(f"stalled at {rate / 1024:.1f} KB/s over {elapsed:.0f}s")
+        self.window_start = now
+        self.window_bytes = 0
+
+class DownloadJob:
+    """Shared state for one in-progress download.
+
+    Byte ranges may land out of order; the SHA-256 is fed inline whenever
+    a chunk continues the hashed prefix, and bytes that arrived early are
+    caught up from the .part file once the gap before them is filled.
+    """
+    def __init__(self, url, part_path, remote, state):
+        self.url = url
+        self.part_path = part_path
+        self.remote = remote
+        self.state = state
+        self.validator = StreamValidator(remote['size'])
+        self.lock = threading.Lock()
+        self.saved_mark = 0
+        self.fetched = 0
+        self.aborted = False
+        # Another mirror is waiting: give up on a stall instead of retrying here
+        self.fallback = False
+        # Segment threads report hashing time against the app that started the job
+        self.app = METRICS.current_app
+    
+    def write(self, f, segment, chunk):
+        """Write chunk at the segment's current offset and advance the hash"""
+        offset = segment[0] + segment[2]
+        f.write(chunk)
+        with self.lock:
+            segment[2] += len(chunk)
+            self.fetched += len(chunk)
+            if offset == self.validator.position:
+                with METRICS.timer('hash', app=self.app):
+                    self.validator.update(chunk)
+            self.catch_up()
+        METRICS.count('download_bytes_total', len(chunk))
+    
+    def contiguous_end(self):
+        """End offset of the bytes on disk that follow on from the start of the file"""
+        end_pos = 0
+        for start, end, done in sorted(self.state['segments']):
+            if start > end_pos:
+                break
+            end_pos = start + done
+            if start + done <= end:
+                break
+        return end_pos
+    
+    def catch_up(self):
+        """Hash bytes already on disk that the validator has not seen yet"""
+        target = self.contiguous_end()
+        if self.validator.position >= target:
+            return
+        with open(self.part_path, 'rb') as f:
+            f.seek(self.validator.position)
+            while self.validator.position < target:
+                block = f.read(min(1024 * 1024, target - self.validator.position))
+                if not block:
+                    break
+                with METRICS.timer('hash', app=self.app):
+                    self.validator.update(block)
+
 class APKDownloader:
-    def __init__(self, github_token=None):
-        self.session = setup_session()
-        self.gh = Github(github_token) if github_token else None
+    def __init__(self, github_token=None, session=None, connections=DOWNLOAD_CONNECTIONS, store=None, config=None,
+                 deltas=DELTA_ARTIFACTS):
+        self.session = session or shared_session()
+        self.config = config or shared_config_store()
+        self.releases = GitHubReleases(github_token, session=self.session) if github_token else None
+        self.store = store or ContentStore()
+        self.connections = connections
+        self.deltas = deltas
     
-    def download_apk(self, url, filename):
-        """Download APK file with proper handling"""
+    def download_apk(self, url, filename, app=None, version=None, mirrors=()):
+        """Download APK file with proper handling.
+
+        Returns an APKArtifact (path, size, SHA-256, zip entries) that has
+        been validated while streaming, or None on failure. mirrors are
+        other candidate URLs: all are sampled first, those serving the same
+        file as url (or the first that answers) are ranked, the download
+        starts from the fastest, and a stalled or failed transfer moves on
+        to the next one. With deltas enabled, the artifact also
+        gets a delta package from the app's previous version.
+        """
         try:
-            print(f"📥 Downloading APK from {url}")
-            
             # Ensure filename ends with .apk
             if not filename.lower().endswith('.apk'):
                 filename += '.apk'
@@ -23,96 +157,449 @@ class APKDownloader:
             
             filepath = os.path.join('downloads', filename)
             
-            # Stream download to handle large files
-            response = self.session.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            # Check if it's actually an APK file
-            content_type = response.headers.get('content-type', '').lower()
-            content_length = response.headers.get('content-length', 0)
-            
-            print(f"📊 Response - Type: {content_type}, Size: {content_length} bytes")
-            
-            # Write file in chunks
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            # Verify the downloaded file
-            file_size = os.path.getsize(filepath)
-            print(f"✅ Downloaded: {filepath} ({file_size} bytes)")
+            start_time = time.monotonic()
+            if mirrors:
+                ranked = self.race_mirrors([url, *mirrors])
+                if not ranked:
+                    raise IOError("no mirror answered with an APK")
+            else:
+                print(f"📥 Downloading APK from {url}")
+                ranked = [(url, self.probe_download(url))]
             
-            # Check if file is actually an APK (APK files start with PK header)
-            with open(filepath, 'rb') as f:
-                header = f.read(4)
-                if header == b'PK\x03\x04':
-                    print("🔍 File verified as valid APK (PK header found)")
-                else:
-                    print("⚠️  Warning: File doesn't appear to be a valid APK")
+            for i, (mirror, remote) in enumerate(ranked):
+                last = i + 1 == len(ranked)
+                try:
+                    artifact = self.fetch_artifact(mirror, remote, filepath, app, version, start_time,
+                                                   fallback=not last)
+                    break
+                except Exception as e:
+                    if last:
+                        raise
+                    METRICS.count('mirror_fallbacks_total')
+                    print(f"⚠️  {mirror} failed ({e}); falling back to {ranked[i + 1][0]}")
             
-            return filepath
+            if self.deltas and app and version:
+                self.build_delta(artifact, app, version)
+            return artifact
             
+        except InvalidAPKError as e:
+            print(f"❌ Downloaded file is not a valid APK: {e}")
+            return None
         except Exception as e:
             print(f"❌ Error downloading APK: {e}")
             return None
     
-    def upload_to_release(self, repo_name, filepath, release_tag, version):
-        """Upload APK to GitHub release with proper error handling"""
-        if not self.gh:
+    def fetch_artifact(self, url, remote, filepath, app, version, start_time, fallback=False):
+        """Download one probed URL into filepath and return the validated APKArtifact"""
+        part_path = filepath + '.part'
+        print(f"📊 Response - Type: {remote['content_type']}, Size: {remote['size'] or 'unknown'} bytes, "
+              f"Ranges: {'yes' if remote['ranges'] else 'no'}")
+        
+        stored = self.store.lookup(url, remote, app=app, version=version)
+        if stored:
+            self.store.materialize(stored['digest'], filepath)
+            print(f"♻️  Unchanged since last download ({stored['digest'][:12]}), reusing {filepath}")
+            return inspect_apk(filepath, stored['size'], stored['digest'], url=url, from_store=True)
+        
+        job = DownloadJob(url, part_path, remote, self.load_part_state(part_path, url, remote))
+        job.fallback = fallback
+        try:
+            with METRICS.span('download', url=url, size=remote['size']) as span:
+                if remote['ranges'] and remote['size'] and remote['size'] >= PARALLEL_MIN_SIZE and self.connections > 1:
+                    self.download_parallel(job)
+                else:
+                    self.download_single(job)
+                span['fetched'] = job.fetched
+            with METRICS.span('hash', what='verify'):
+                with job.lock:
+                    job.catch_up()
+                    digest = job.validator.finish()
+                artifact = inspect_apk(part_path, job.validator.position, digest, url=url)
+        except InvalidAPKError:
+            # Not worth resuming: the server is handing out the wrong bytes
+            self.discard_part(part_path)
+            raise
+        
+        os.replace(part_path, filepath)
+        self.clear_part_state(part_path)
+        artifact.path = filepath
+        self.store.add(filepath, url, remote, app=app, version=version, digest=digest)
+        
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        print(f"✅ Downloaded: {filepath} ({artifact.size} bytes, {job.fetched / (1024 * 1024) / elapsed:.2f} MB/s)")
+        print(f"🔍 File verified as valid APK (sha256 {digest[:12]}, {len(artifact.entries)} entries, AndroidManifest.xml present)")
+        return artifact
+    
+    def build_delta(self, artifact, app, version):
+        """Delta stage: diff the artifact against the app's previous stored version.
+
+        Sets artifact.delta_path and returns the DeltaResult, or None when
+        there is no previous version or the delta would not save enough.
+        """
+        previous = self.store.previous(app, version)
+        if not previous or previous['digest'] == artifact.sha256:
+            return None
+        delta_path = f"{artifact.path[:-len('.apk')]}-from-{previous['version']}{DELTA_SUFFIX}"
+        try:
+            with METRICS.span('delta', base=previous['version']) as span:
+                result = build_delta(self.store.object_path(previous['digest']), artifact.path, delta_path)
+                span['ratio'] = round(result.ratio, 4)
+        except (DeltaError, InvalidAPKError, OSError) as e:
+            print(f"⚠️  Could not build delta from {previous['version']}: {e}")
+            return None
+        
+        if result.ratio > DELTA_MAX_RATIO:
+            print(f"🧩 Delta from {previous['version']} is {result.ratio:.0%} of the APK, not worth publishing")
+            os.remove(delta_path)
+            return None
+        print(f"🧩 Delta from {previous['version']}: {result.size / (1024 * 1024):.2f} MB "
+              f"({result.ratio:.1%} of the APK, {result.reused}/{result.entries} entries reused), "
+              f"built in {result.seconds:.2f}s")
+        artifact.delta_path = delta_path
+        return result
+    
+    def race_mirrors(self, urls):
+        """Sample every mirror at once; return (url, remote) pairs, fastest first.
+
+        urls come in preference order and may include different builds (an
+        /download/<id>/ page per ABI, say). The first URL that answers with
+        an APK defines the artifact; only URLs serving the same file (same
+        size and, on the same host, the same ETag) are ranked against it.
+        """
+        print(f"🏁 Racing {len(urls)} mirrors")
+        app = METRICS.current_app
+        
+        def probe(url):
+            with METRICS.app(app):
+                return self.probe_download(url, MIRROR_PROBE_BYTES)
+        
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            futures = [(url, executor.submit(probe, url)) for url in urls]
+        ranked = []
+        for url, future in futures:
+            try:
+                remote = future.result()
+            except Exception as e:
+                print(f"   ❌ {url}: {e}")
+                continue
+            if ranked and not same_artifact(ranked[0][1], remote):
+                print(f"   ↪️  {url}: different file ({remote['size']} bytes), not a mirror")
+                continue
+            print(f"   ⏱️  {url}: {remote['latency'] * 1000:.0f} ms to first byte, "
+                  f"{remote['throughput'] / (1024 * 1024):.2f} MB/s")
+            ranked.append((url, remote))
+        ranked.sort(key=lambda item: estimated_seconds(item[1]))
+        if ranked:
+            print(f"📥 Downloading APK from {ranked[0][0]}")
+        return ranked
+    
+    def probe_download(self, url, sample=1):
+        """Ask for the first `sample` bytes to learn size, range support, validators and speed"""
+        started = time.monotonic()
+        with self.session.get(url, headers={'Range': f'bytes=0-{sample - 1}'}, stream=True,
+                              timeout=DOWNLOAD_TIMEOUT) as response:
+            latency = time.monotonic() - started
+            response.raise_for_status()
+            headers = response.headers
+            content_type = headers.get('content-type', '').lower()
+            if content_type.startswith(('text/html', 'application/json')):
+                raise InvalidAPKError(f"server answered with {content_type}")
+            
+            # Range requests give us the sample; otherwise peek at the start of the body
+            want = sample if response.status_code == 206 else max(sample, 4)
+            head = b''
+            while len(head) < want and time.monotonic() - started < latency + MIRROR_PROBE_SECONDS:
+                piece = response.raw.read(min(want - len(head), MIN_CHUNK_SIZE), decode_content=True)
+                if not piece:
+                    break
+                head += piece
+            check_magic(head)
+            throughput = len(head) / max(time.monotonic() - started - latency, 1e-6)
+            
+            size = None
+            ranges = False
+            if response.status_code == 206:
+                # Content-Range: bytes 0-0/12345
+                total = headers.get('content-range', '').rpartition('/')[2]
+                size = int(total) if total.isdigit() else None
+                ranges = size is not None
+            elif headers.get('content-length', '').isdigit():
+                size = int(headers['content-length'])
+            ranges = ranges or headers.get('accept-ranges', '').lower() == 'bytes'
+            return {
+                'url': response.url,
+                'size': size,
+                'ranges': ranges,
+                'etag': headers.get('etag'),
+                'last_modified': headers.get('last-modified'),
+                'content_type': content_type,
+                'latency': latency,
+                'throughput': throughput
+            }
+    
+    def load_part_state(self, part_path, url, remote):
+        """Resume state for a .part file, or a fresh one when it cannot be reused"""
+        try:
+            with open(part_path + '.json', 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        
+        reusable = (
+            state is not None and remote['ranges'] and os.path.exists(part_path)
+            and state.get('url') == url
+            and state.get('size') == remote['size']
+            and state.get('etag') == remote['etag']
+            and state.get('last_modified') == remote['last_modified']
+        )
+        if not reusable:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return {
+                'url': url,
+                'size': remote['size'],
+                'etag': remote['etag'],
+                'last_modified': remote['last_modified'],
+                'segments': []
+            }
+        
+        done = sum(segment[2] for segment in state['segments'])
+        print(f"⏯️  Resuming {os.path.basename(part_path)} ({done} bytes already on disk)")
+        return state
+    
+    def save_part_state(self, part_path, state):
+        tmp_path = part_path + '.json.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, part_path + '.json')
+    
+    def clear_part_state(self, part_path):
+        if os.path.exists(part_path + '.json'):
+            os.remove(part_path + '.json')
+    
+    def discard_part(self, part_path):
+        self.clear_part_state(part_path)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    
+    def download_single(self, job):
+        """Stream over one connection, resuming with a Range request after failures"""
+        remote = job.remote
+        if not job.state['segments']:
+            job.state['segments'] = [[0, (remote['size'] or 0) - 1, 0]]
+        segment = job.state['segments'][0]
+        if not os.path.exists(job.part_path):
+            open(job.part_path, 'wb').close()
+        segment[2] = min(segment[2], os.path.getsize(job.part_path))
+        
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            offset = segment[2]
+            headers = {'Range': f'bytes={offset}-'} if offset and remote['ranges'] else {}
+            try:
+                with self.session.get(job.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        # Server ignored the range; start over
+                        with job.lock:
+                            offset = segment[2] = 0
+                            job.validator = StreamValidator(remote['size'])
+                    with open(job.part_path, 'r+b', buffering=0) as f:
+                        f.seek(offset)
+                        f.truncate()
+                        for chunk in self.iter_adaptive(response):
+                            job.write(f, segment, chunk)
+                            self.maybe_save_state(job)
+                if remote['size'] and segment[2] < remote['size']:
+                    raise IOError(f"connection closed at {segment[2]} of {remote['size']} bytes")
+                return
+            except InvalidAPKError:
+                raise
+            except Exception as e:
+                self.save_part_state(job.part_path, job.state)
+                if attempt == DOWNLOAD_ATTEMPTS or not remote['ranges'] or self.should_fall_back(job, e):
+                    raise
+                print(f"⚠️  Download interrupted ({e}); resuming from byte {segment[2]} (attempt {attempt + 1}/{DOWNLOAD_ATTEMPTS})")
+                time.sleep(attempt)
+    
+    def download_parallel(self, job):
+        """Fetch the file as parallel byte ranges into a preallocated .part file"""
+        size = job.remote['size']
+        state = job.state
+        if not state['segments']:
+            count = min(self.connections, max(1, size // PARALLEL_MIN_SEGMENT))
+            bounds = [size * i // count for i in range(count + 1)]
+            state['segments'] = [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]
+        if not os.path.exists(job.part_path) or os.path.getsize(job.part_path) != size:
+            with open(job.part_path, 'wb') as f:
+                f.truncate(size)
+            for segment in state['segments']:
+                segment[2] = 0
+        self.save_part_state(job.part_path, state)
+        
+        pending = [segment for segment in state['segments'] if segment[0] + segment[2] <= segment[1]]
+        print(f"🧵 Fetching {len(pending)} byte ranges in parallel")
+        with ThreadPoolExecutor(max_workers=len(pending) or 1) as executor:
+            futures = [executor.submit(self.download_segment, job, segment) for segment in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                job.aborted = True
+                raise
+        
+        self.save_part_state(job.part_path, state)
+    
+    def download_segment(self, job, segment):
+        """Fetch one byte range, resuming it after failures"""
+        start, end = segment[0], segment[1]
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            offset = start + segment[2]
+            if offset > end:
+                return
+            try:
+                headers = {'Range': f'bytes={offset}-{end}'}
+                with self.session.get(job.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IOError(f"server ignored range request (HTTP {response.status_code})")
+                    with open(job.part_path, 'r+b', buffering=0) as f:
+                        f.seek(offset)
+                        for chunk in self.iter_adaptive(response):
+                            if job.aborted:
+                                return
+                            job.write(f, segment, chunk[:end + 1 - (start + segment[2])])
+                            self.maybe_save_state(job)
+                if start + segment[2] <= end:
+                    raise IOError(f"range {start}-{end} closed early")
+                return
+            except InvalidAPKError:
+                raise
+            except Exception as e:
+                with job.lock:
+                    self.save_part_state(job.part_path, job.state)
+                if attempt == DOWNLOAD_ATTEMPTS or job.aborted or self.should_fall_back(job, e):
+                    raise
+                print(f"⚠️  Range {start}-{end} interrupted ({e}); retrying (attempt {attempt + 1}/{DOWNLOAD_ATTEMPTS})")
+                time.sleep(attempt)
+    
+    def should_fall_back(self, job, error):
+        """Whether to hand a stalled transfer over to the next mirror"""
+        if not isinstance(error, DownloadStalledError):
+            return False
+        METRICS.count('download_stalls_total')
+        return job.fallback
+    
+    def maybe_save_state(self, job):
+        """Persist resume state every few MB"""
+        with job.lock:
+            done = sum(segment[2] for segment in job.state['segments'])
+            if done - job.saved_mark < STATE_SAVE_INTERVAL:
+                return
+            job.saved_mark = done
+            self.save_part_state(job.part_path, job.state)
+    
+    def iter_adaptive(self, response):
+        """Yield body chunks, growing the read size on fast links and shrinking it on slow ones.
+
+        Raises DownloadStalledError when the response stops making progress.
+        """
+        chunk_size = MIN_CHUNK_SIZE
+        stall = StallDetector()
+        while True:
+            started = time.monotonic()
+            try:
+                chunk = response.raw.read(chunk_size, decode_content=True)
+            except (ReadTimeoutError, socket.timeout) as e:
+                raise DownloadStalledError(f"no data for {STALL_WINDOW:.0f}s") from e
+            if not chunk:
+                return
+            stall.update(len(chunk))
+            yield chunk
+            elapsed = time.monotonic() - started
+            if elapsed < CHUNK_TARGET_SECONDS / 2 and chunk_size < MAX_CHUNK_SIZE:
+                chunk_size *= 2
+            elif elapsed > CHUNK_TARGET_SECONDS * 2 and chunk_size > MIN_CHUNK_SIZE:
+                chunk_size //= 2
+    
+    def upload_to_release(self, repo_name, artifact, release_tag, version):
+        """Upload a downloaded APKArtifact to a GitHub release.
+
+        The new file is uploaded under a temporary name and only then
+        swapped in, so the release never goes without an APK. Only earlier
+        uploads of the same app are replaced; other assets are left alone.
+        """
+        if not self.releases:
             print("❌ GitHub token not provided - cannot upload to releases")
             return False
         
         try:
-            repo = self.gh.get_repo(repo_name)
             print(f"📦 Preparing to upload to repository: {repo_name}")
             
-            # Check if file exists and has reasonable size
-            if not os.path.exists(filepath):
-                print(f"❌ File not found: {filepath}")
+            # Size and digest were settled while downloading
+            filepath = artifact.path
+            digest = artifact.sha256
+            if artifact.size < 1024:  # Less than 1KB
+                print(f"❌ File too small: {artifact.size} bytes - likely not a valid APK")
                 return False
             
-            file_size = os.path.getsize(filepath)
-            if file_size < 1024:  # Less than 1KB
-                print(f"❌ File too small: {file_size} bytes - likely not a valid APK")
-                return False
-            
-            print(f"📁 File to upload: {filepath} ({file_size} bytes)")
+            print(f"📁 File to upload: {filepath} ({artifact.size} bytes)")
+            asset_name = os.path.basename(filepath)
+            temp_name = f"uploading-{digest[:12]}-{asset_name}"
             
             # Check if release exists
-            try:
-                release = repo.get_release(release_tag)
+            release = self.releases.get_release(repo_name, release_tag)
+            if release:
                 print(f"🔄 Release '{release_tag}' exists, updating...")
-                
-                # Delete existing assets
-                assets = release.get_assets()
-                asset_count = 0
-                for asset in assets:
-                    print(f"🗑️  Deleting old asset: {asset.name}")
-                    asset.delete_asset()
-                    asset_count += 1
-                print(f"✅ Deleted {asset_count} old assets")
-                
-            except Exception as e:
+            else:
                 print(f"📝 Release '{release_tag}' doesn't exist, creating new release...")
-                # Create new release
-                release = repo.create_git_release(
-                    tag=release_tag,
-                    name=f"{os.path.basename(filepath).replace('.apk', '')} {version}",
-                    message=f"Auto-updated APK - Version {version}\n\nDownloaded from GetModsApk",
-                    draft=False,
-                    prerelease=False
+                release = self.releases.create_release(
+                    repo_name,
+                    release_tag,
+                    name=f"{asset_name.replace('.apk', '')} {version}",
+                    body=f"Auto-updated APK - Version {version}\n\nDownloaded from GetModsApk"
                 )
                 print(f"✅ Created new release: {release_tag}")
             
+            assets = self.releases.list_assets(repo_name, release)
+            for asset in assets:
+                if asset['name'] == asset_name and asset.get('digest') == f"sha256:{digest}":
+                    print(f"♻️  Release asset {asset_name} already has digest {digest[:12]}, skipping upload")
+                    return True
+            
+            # Leftovers from an interrupted run would block the temporary name
+            for asset in list(assets):
+                if asset['name'] == temp_name:
+                    self.releases.delete_asset(repo_name, release, asset)
+            
             # Upload APK file
-            print(f"⬆️  Uploading {os.path.basename(filepath)} to release...")
-            with open(filepath, 'rb') as f:
-                release.upload_asset(
-                    path=filepath,
-                    label=os.path.basename(filepath),
-                    content_type='application/vnd.android.package-archive'
+            print(f"⬆️  Uploading {asset_name} to release...")
+            with METRICS.span('upload', asset=asset_name, size=artifact.size):
+                uploaded, throughput = self.releases.upload_asset(
+                    release,
+                    filepath,
+                    temp_name,
+                    artifact.size,
+                    'application/vnd.android.package-archive'
                 )
+            METRICS.count('upload_bytes_total', artifact.size)
+            print(f"📶 Uploaded {artifact.size / (1024 * 1024):.1f} MB at {throughput:.2f} MB/s")
+            
+            # Swap: drop this app's previous APKs, then give the upload its real name
+            app_prefix = asset_name[:-len(f"-{version}.apk")] if asset_name.endswith(f"-{version}.apk") else None
+            superseded = [
+                asset for asset in self.releases.list_assets(repo_name, release)
+                if asset['id'] != uploaded['id'] and (
+                    asset['name'] == asset_name
+                    or (app_prefix and is_app_asset(asset['name'], app_prefix, '.apk'))
+                )
+            ]
+            for asset in superseded:
+                print(f"🗑️  Deleting old asset: {asset['name']}")
+                self.releases.delete_asset(repo_name, release, asset)
+            self.releases.rename_asset(repo_name, release, uploaded, asset_name)
+            
+            if artifact.delta_path and app_prefix:
+                self.upload_delta(repo_name, release, artifact.delta_path, app_prefix)
             
             print(f"✅ Successfully uploaded {filepath} to release {release_tag}")
             return True
@@ -121,24 +608,52 @@ class APKDownloader:
             print(f"❌ Error uploading to release: {e}")
             return False
     
+    def upload_delta(self, repo_name, release, delta_path, app_prefix):
+        """Publish a delta package next to the APK, replacing the app's older deltas.
+
+        Failures are reported but do not fail the release: the full APK is
+        already up.
+        """
+        try:
+            delta_name = os.path.basename(delta_path)
+            size = os.path.getsize(delta_path)
+            for asset in self.releases.list_assets(repo_name, release):
+                if is_app_asset(asset['name'], app_prefix, DELTA_SUFFIX):
+                    self.releases.delete_asset(repo_name, release, asset)
+            print(f"⬆️  Uploading delta {delta_name}...")
+            with METRICS.span('upload', asset=delta_name, size=size):
+                self.releases.upload_asset(release, delta_path, delta_name, size, 'application/octet-stream')
+            METRICS.count('upload_bytes_total', size)
+        except Exception as e:
+            print(f"⚠️  Could not upload delta {delta_path}: {e}")
+    
     def update_apk_list(self, apk_name, new_version):
         """Update APK list with new version"""
         try:
-            config = load_config()
-            updated = False
-            
-            for apk in config['tracked_apks']:
-                if apk['name'] == apk_name:
-                    print(f"📝 Updating {apk_name} from {apk['current_version']} to {new_version}")
-                    apk['current_version'] = new_version
-                    updated = True
-                    break
-            
-            if updated:
-                save_config(config)
+            apk = self.config.get(apk_name)
+            if apk and self.config.update_version(apk_name, new_version):
+                print(f"📝 Updating {apk_name} from {apk['current_version']} to {new_version}")
                 print(f"✅ Updated config for {apk_name}")
             else:
                 print(f"❌ Could not find {apk_name} in config")
                 
         except Exception as e:
             print(f"❌ Error updating APK list: {e}")
+
+def estimated_seconds(remote):
+    """Expected transfer time for a probed mirror"""
+    size = remote['size'] or MIRROR_PROBE_BYTES
+    return remote['latency'] + size / max(remote['throughput'], 1)
+
+def same_artifact(reference, remote):
+    """Whether two probed URLs serve the same file; unknown sizes never match"""
+    if reference['size'] is None or remote['size'] != reference['size']:
+        return False
+    same_host = urllib.parse.urlsplit(reference['url']).netloc == urllib.parse.urlsplit(remote['url']).netloc
+    if same_host and reference['etag'] and remote['etag']:
+        return reference['etag'] == remote['etag']
+    return True
+
+def is_app_asset(name, app_prefix, suffix):
+    """Whether name is a versioned asset of app_prefix, e.g. spotify-v8.9.apk but not spotify-lite-v1.0.apk"""
+    return re.fullmatch(rf'{re.escape(app_prefix)}-v?\d+(?:\.\d+)+(?:[-_+][^/]*)?{re.escape(suffix)}', name) is not None
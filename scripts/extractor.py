@@ -0,0 +1,451 @@
+from html.parser import HTMLParser
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import codecs
+import re
+
+# Patterns shared by the scraper; compiled once per process
+# x.y with up to two more components (v2.5, 7.34.3, 1.2.3.4)
+VERSION_PATTERN = r'v?(\d+\.\d+(?:\.\d+){0,2})'
+VERSION_RE = re.compile(VERSION_PATTERN, re.I)
+VERSION_ELEMENT_RE = re.compile(VERSION_PATTERN)
+APK_HREF_RE = re.compile(r'\.apk($|\?|#)', re.I)
+DOWNLOAD_ID_RE = re.compile(r'/download/\d+/', re.I)
+DOWNLOAD_PAGE_RE = re.compile(r'/download/?$', re.I)
+DOWNLOAD_TEXT_RE = re.compile(r'download|begin download', re.I)
+DOWNLOAD_CLASS_RE = re.compile(r'download', re.I)
+CONTENT_CLASS_RE = re.compile(r'content|main', re.I)
+
+# Default method priority for link discovery and APK link extraction
+DOWNLOAD_LINK_METHODS = (1, 2, 3)
+APK_LINK_METHODS = ('direct', 'data-download', 'iframe', 'javascript')
+
+# Read size for streamed version probes
+VERSION_PROBE_CHUNK = 4096
+# Where an undeclared page charset is looked for (<meta charset> must be in the first 1024 bytes)
+CHARSET_SNIFF_BYTES = 1024
+CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+# Script patterns, tried in this order for each script (first match wins)
+SCRIPT_APK_PATTERNS = [re.compile(pattern, re.I) for pattern in (
+    r'https?://[^"\']*\.apk[^"\']*',
+    r'downloadUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
+    r'fileUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
+    r'href\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']'
+)]
+SCRIPT_DOWNLOAD_PATTERNS = [re.compile(pattern, re.I) for pattern in (
+    r'https?://[^"\']*/download/[^"\']*',
+    r'https?://[^"\']*/file/[^"\']*',
+    r'https?://[^"\']*\.apk[^"\']*'
+)]
+
+VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'
+))
+
+# Tags whose position, attributes and sole string we keep
+RECORDED_TAGS = frozenset(('a', 'button', 'div', 'span', 'p', 'iframe'))
+
+class Element:
+    """Start-tag attributes plus the element's single string, if it has one"""
+    __slots__ = ('tag', 'attrs', 'string', 'children', 'text_child', 'child_string', 'last_was_text')
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.string = None
+        self.children = 0
+        self.text_child = None
+        self.child_string = None
+        self.last_was_text = False
+
+    def get(self, name, default=None):
+        value = self.attrs.get(name)
+        return default if value is None else value
+
+    def has_class(self, pattern):
+        value = self.attrs.get('class')
+        if value is None:
+            return False
+        return bool(pattern.search(value)) or any(pattern.search(part) for part in value.split())
+
+class PageScan(HTMLParser):
+    """Collect everything the scraper looks at in a single parser pass.
+
+    Mirrors what the BeautifulSoup lookups used to find: recorded elements
+    in document order, script bodies, the <title> text, the text of the
+    first main/article/content container and the whole-document text.
+    Data is fed incrementally, so a PageScan can also consume a stream.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+        self.scripts = []
+        self.title = None
+        self.text_chunks = []
+        self._stack = []
+        self._title_chunks = None
+        self._script_chunks = None
+        # First <main>, <article> and content <div>, in that priority
+        self._containers = {'main': None, 'article': None, 'div': None}
+        self._open_containers = []
+        self._body_started = False
+
+    # -- parser events ---------------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        attributes = {}
+        for name, value in attrs:
+            attributes.setdefault(name, '' if value is None else value)
+
+        if self._stack:
+            self._stack[-1].children += 1
+            self._stack[-1].last_was_text = False
+
+        if tag in VOID_TAGS:
+            if tag in RECORDED_TAGS or 'data-download' in attributes:
+                self.elements.append(Element(tag, attributes))
+            return
+
+        element = Element(tag, attributes)
+        if tag in RECORDED_TAGS or 'data-download' in attributes:
+            self.elements.append(element)
+        self._stack.append(element)
+
+        if tag == 'body':
+            self._body_started = True
+        if tag == 'title' and self.title is None:
+            self._title_chunks = []
+        elif tag == 'script':
+            self._script_chunks = []
+
+        container = None
+        if tag in ('main', 'article') and self._containers[tag] is None:
+            container = tag
+        elif tag == 'div' and self._containers['div'] is None and element.has_class(CONTENT_CLASS_RE):
+            container = 'div'
+        if container:
+            self._containers[container] = []
+            self._open_containers.append((element, container))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if not any(element.tag == tag for element in self._stack):
+            return
+        while self._stack:
+            element = self._stack.pop()
+            self._close(element)
+            if element.tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.text_chunks.append(data)
+        if self._stack:
+            parent = self._stack[-1]
+            if parent.last_was_text:
+                # One text node can arrive as several data events
+                if parent.children == 1:
+                    parent.text_child += data
+            else:
+                parent.children += 1
+                parent.last_was_text = True
+                if parent.children == 1:
+                    parent.text_child = data
+        if self._title_chunks is not None:
+            self._title_chunks.append(data)
+        if self._script_chunks is not None:
+            self._script_chunks.append(data)
+        for _, container in self._open_containers:
+            self._containers[container].append(data)
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._close(self._stack.pop())
+
+    def _close(self, element):
+        if element.children == 1:
+            element.string = element.text_child if element.text_child is not None else element.child_string
+
+        if self._stack:
+            parent = self._stack[-1]
+            if parent.children == 1 and parent.text_child is None:
+                # A sole child element passes its string up, as bs4's .string does
+                parent.child_string = element.string
+
+        if element.tag == 'title' and self._title_chunks is not None:
+            self.title = ''.join(self._title_chunks)
+            self._title_chunks = None
+        elif element.tag == 'script' and self._script_chunks is not None:
+            self.scripts.append(''.join(self._script_chunks))
+            self._script_chunks = None
+
+        self._open_containers = [(open_element, container) for open_element, container in self._open_containers
+                                 if open_element is not element]
+
+    # -- queries ---------------------------------------------------------
+
+    def text(self):
+        return ''.join(self.text_chunks)
+
+    def container_text(self):
+        """Text of the first main, else article, else content/main div"""
+        for container in ('main', 'article', 'div'):
+            chunks = self._containers[container]
+            if chunks is not None:
+                return ''.join(chunks)
+        return None
+
+    def find_version(self):
+        """Version string, searching title -> main content -> version elements -> whole text"""
+        if self.title is not None:
+            match = VERSION_RE.search(self.title)
+            if match:
+                return match.group(0)
+
+        content = self.container_text()
+        if content is not None:
+            match = VERSION_RE.search(content)
+            if match:
+                return match.group(0)
+
+        for element in self.elements:
+            if element.tag in ('span', 'div', 'p') and element.string and VERSION_RE.search(element.string):
+                match = VERSION_ELEMENT_RE.search(element.string)
+                if match:
+                    return match.group(0)
+
+        match = VERSION_RE.search(self.text())
+        return match.group(0) if match else None
+
+    def early_version(self):
+        """The version find_version() will return, if the data fed so far already settles it.
+
+        The title comes first in find_version()'s order, so a match there is
+        final once </title> has been seen; so is the first match inside the
+        first <main>, once the title has gone by without one. A match
+        followed only by digits and dots so far could still grow (1.2.3 ->
+        1.2.3.4) and is not trusted until more text arrives.
+        """
+        if self.title is not None:
+            match = VERSION_RE.search(self.title)
+            if match:
+                return match.group(0)
+        elif not self._body_started:
+            return None
+
+        chunks = self._containers['main']
+        if not chunks:
+            return None
+        text = ''.join(chunks)
+        match = VERSION_RE.search(text)
+        main_open = any(container == 'main' for _, container in self._open_containers)
+        if match and (text[match.end():].strip('0123456789.') or not main_open):
+            return match.group(0)
+        return None
+
+    def find_download_page_hrefs(self):
+        return [element.get('href') for element in self.elements
+                if element.tag == 'a' and element.get('href') is not None
+                and DOWNLOAD_PAGE_RE.search(element.get('href'))]
+
+    def has_download_id_links(self):
+        return any(element.tag == 'a' and DOWNLOAD_ID_RE.search(element.get('href', ''))
+                   for element in self.elements)
+
+    def find_download_links(self, prefer=None):
+        """Return (method, hrefs) for the first discovery method that finds anything.
+
+        Methods run in DOWNLOAD_LINK_METHODS order; prefer moves one of them
+        to the front (the one that worked last time for this app).
+        """
+        for method in _preferred_first(DOWNLOAD_LINK_METHODS, prefer):
+            hrefs = self._download_links_by(method)
+            if hrefs:
+                return method, hrefs
+        return None, []
+
+    def _download_links_by(self, method):
+        if method == 1:
+            # Method 1: links containing '/download/<id>/'
+            return [element.get('href') for element in self.elements
+                    if element.tag == 'a' and DOWNLOAD_ID_RE.search(element.get('href', ''))]
+        if method == 2:
+            # Method 2: buttons with download text
+            return [element.get('href') for element in self.elements
+                    if element.tag in ('a', 'button') and element.string is not None
+                    and DOWNLOAD_TEXT_RE.search(element.string)
+                    and '/download/' in element.get('href', '')]
+        # Method 3: any link with download in its class
+        return [element.get('href') for element in self.elements
+                if element.tag in ('a', 'div') and element.get('href') is not None
+                and element.has_class(DOWNLOAD_CLASS_RE)]
+
+    def find_apk_link(self, prefer=None):
+        """Return (method, href) for the first APK link, honouring method priority
+
+        prefer moves one of APK_LINK_METHODS to the front.
+        """
+        for method in _preferred_first(APK_LINK_METHODS, prefer):
+            href = self._apk_link_by(method)
+            if href:
+                return method, href
+        return None, None
+
+    def _apk_link_by(self, method):
+        if method == 'direct':
+            # Method 1: direct .apk links
+            for element in self.elements:
+                if element.tag == 'a':
+                    href = element.get('href', '')
+                    if href and APK_HREF_RE.search(href):
+                        return href
+        elif method == 'data-download':
+            # Method 2: download buttons with data attributes
+            for element in self.elements:
+                if 'data-download' in element.attrs and element.get('href') is not None:
+                    href = element.get('href')
+                    if href and '.apk' in href.lower():
+                        return href
+        elif method == 'iframe':
+            # Method 3: iframes
+            for element in self.elements:
+                if element.tag == 'iframe':
+                    src = element.get('src', '')
+                    if src and '.apk' in src.lower():
+                        return src
+        elif method == 'javascript':
+            # Method 4: JavaScript variables
+            for script in self.scripts:
+                if not script or '.apk' not in script.lower():
+                    continue
+                for pattern in SCRIPT_APK_PATTERNS:
+                    match = pattern.search(script)
+                    if match:
+                        return match.group(1) if pattern.groups else match.group(0)
+        return None
+
+    def find_javascript_links(self):
+        """URLs referenced from download-related scripts"""
+        links = []
+        for script in self.scripts:
+            if not script or 'download' not in script.lower():
+                continue
+            for pattern in SCRIPT_DOWNLOAD_PATTERNS:
+                links.extend(pattern.findall(script))
+        return links
+
+    def record(self):
+        """Every query answer for this page, as a small picklable PageRecord"""
+        return PageRecord(
+            version=self.find_version(),
+            download_page_hrefs=self.find_download_page_hrefs(),
+            download_id_links=self.has_download_id_links(),
+            download_links={method: self._download_links_by(method) for method in DOWNLOAD_LINK_METHODS},
+            apk_links={method: self._apk_link_by(method) for method in APK_LINK_METHODS},
+            javascript_links=self.find_javascript_links()
+        )
+
+@dataclass
+class PageRecord:
+    """PageScan query results, precomputed so they can cross a process boundary.
+
+    Answers the same queries as PageScan, so the scraper can use either.
+    """
+    version: Optional[str] = None
+    download_page_hrefs: List[str] = field(default_factory=list)
+    download_id_links: bool = False
+    download_links: Dict[int, List[str]] = field(default_factory=dict)
+    apk_links: Dict[str, Optional[str]] = field(default_factory=dict)
+    javascript_links: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a record saved with dataclasses.asdict() and a JSON round trip"""
+        data = dict(data)
+        data['download_links'] = {int(method): links for method, links in data.get('download_links', {}).items()}
+        return cls(**data)
+
+    def find_version(self):
+        return self.version
+
+    def find_download_page_hrefs(self):
+        return self.download_page_hrefs
+
+    def has_download_id_links(self):
+        return self.download_id_links
+
+    def find_download_links(self, prefer=None):
+        for method in _preferred_first(DOWNLOAD_LINK_METHODS, prefer):
+            if self.download_links.get(method):
+                return method, self.download_links[method]
+        return None, []
+
+    def find_apk_link(self, prefer=None):
+        for method in _preferred_first(APK_LINK_METHODS, prefer):
+            if self.apk_links.get(method):
+                return method, self.apk_links[method]
+        return None, None
+
+    def find_javascript_links(self):
+        return self.javascript_links
+
+def _preferred_first(methods, prefer):
+    if prefer in methods:
+        return (prefer,) + tuple(method for method in methods if method != prefer)
+    return methods
+
+def declared_charset(content_type):
+    """Codec named by a Content-Type charset parameter, or None"""
+    match = CHARSET_RE.search(content_type or '')
+    return _codec(match.group(1)) if match else None
+
+def sniff_charset(head, default='utf-8'):
+    """Codec named by a <meta charset> near the start of a page, else default"""
+    match = META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    return (_codec(match.group(1).decode('ascii')) if match else None) or default
+
+def _codec(name):
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def scan_until_version(chunks, encoding=None):
+    """Feed byte chunks into a PageScan, stopping once the version is settled.
+
+    Bytes are decoded with encoding (the response's declared charset), or
+    with the page's <meta charset> when there is none, falling back to UTF-8.
+    Returns (scan, complete, size): complete is False when the scan stopped
+    early, in which case only the version (and whatever came before it)
+    is reliable; size is the number of bytes consumed.
+    """
+    scan = PageScan()
+    decoder = None
+    size = 0
+    for chunk in chunks:
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(encoding or sniff_charset(chunk))(errors='replace')
+        size += len(chunk)
+        scan.feed(decoder.decode(chunk))
+        if scan.early_version():
+            return scan, False, size
+    if decoder:
+        scan.feed(decoder.decode(b'', final=True))
+    scan.close()
+    return scan, True, size
+
+def scan_html(content):
+    """Run one PageScan over a page body (bytes or str)"""
+    if isinstance(content, bytes):
+        content = content.decode(sniff_charset(content), errors='replace')
+    scan = PageScan()
+    scan.feed(content)
+    scan.close()
+    return scan
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Record getmodsapk crawls to disk and replay them from a local HTTP server.
+
+    python scripts/fixtures.py record https://getmodsapk.com/<app>/ ...
+    python scripts/fixtures.py serve --port 8080
+
+Recording runs the normal link resolution (app page, /download/,
+/download/<id>/ and any JavaScript links) and saves every page fetched
+along the way; APK bodies are never fetched. The replay server serves the
+recorded host at its root and any other recorded host under /_/<host>/,
+with absolute links in the pages rewritten to point back at itself.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join('fixtures', 'html')
+MANIFEST_NAME = 'manifest.json'
+
+def fixture_path(url):
+    """Relative file path a page URL is recorded under"""
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path.strip('/')
+    name = 'index.html'
+    if parts.query:
+        name = f"index-{hashlib.sha1(parts.query.encode('utf-8')).hexdigest()[:12]}.html"
+    return os.path.join(parts.hostname or 'unknown', *[p for p in path.split('/') if p], name)
+
+class FixtureRecorder:
+    """Response hook that saves every non-streamed page the session fetches"""
+    def __init__(self, directory=FIXTURES_DIR):
+        self.directory = directory
+        self.manifest = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'primary_host': None, 'apps': [], 'pages': {}}
+
+    def hook(self, response, *args, **kwargs):
+        # Streamed bodies are downloads; reading them here would consume them
+        if kwargs.get('stream') or response.status_code != 200:
+            return response
+        content_type = response.headers.get('Content-Type', '')
+        if 'html' not in content_type and not content_type.startswith('text/'):
+            return response
+        url = response.url
+        relative = fixture_path(url)
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        with self._lock:
+            self.manifest['pages'][url] = {'path': relative, 'content_type': content_type}
+        print(f"💾 Recorded {url} -> {relative}")
+        return response
+
+    def add_app(self, base_url):
+        with self._lock:
+            if base_url not in self.manifest['apps']:
+                self.manifest['apps'].append(base_url)
+            self.manifest['primary_host'] = self.manifest['primary_host'] or urllib.parse.urlsplit(base_url).netloc
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+def record(urls, directory=FIXTURES_DIR, session=None):
+    """Resolve each app URL once, recording the pages on the way"""
+    from scraper import GetModsApkScraper
+    from strategy_memo import StrategyMemo
+    from utils import setup_session
+
+    recorder = FixtureRecorder(directory)
+    # No HTTP cache: a 304 would leave nothing to record
+    session = session or setup_session(cache_dir=None)
+    session.hooks['response'].append(recorder.hook)
+    # A throwaway memo so the recording follows the default strategy order
+    memo_dir = tempfile.mkdtemp()
+    scraper = GetModsApkScraper(session=session, memo=StrategyMemo(os.path.join(memo_dir, 'memo.json')))
+    for url in urls:
+        recorder.add_app(url)
+        # Relative links resolve against the recorded site, as they do live
+        parts = urllib.parse.urlsplit(url)
+        scraper.base_domain = f"{parts.scheme}://{parts.netloc}"
+        scraper.get_download_links(url)
+    recorder.save()
+    shutil.rmtree(memo_dir, ignore_errors=True)
+    print(f"📼 {len(recorder.manifest['pages'])} pages recorded in {directory}")
+    return recorder.manifest
+
+class FixtureServer:
+    """Serve a recorded fixture directory over HTTP on 127.0.0.1.
+
+    Counts hits per path so callers can see how many requests a crawl made.
+    Use as a context manager, or call start() and stop().
+    """
+    def __init__(self, directory=FIXTURES_DIR, port=0):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+            self.manifest = json.load(f)
+        self.hits = Counter()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.routes = {_route_key(self.local_url(url)[len(self.url):]): page
+                       for url, page in self.manifest['pages'].items()}
+        self._thread = None
+
+    def local_url(self, url):
+        """Where a recorded URL is served from"""
+        parts = urllib.parse.urlsplit(url)
+        prefix = '' if parts.netloc == self.manifest['primary_host'] else f"/_/{parts.netloc}"
+        local = self.url + prefix + (parts.path or '/')
+        return local + ('?' + parts.query if parts.query else '')
+
+    def app_urls(self):
+        return [self.local_url(url) for url in self.manifest['apps']]
+
+    def rewrite(self, body):
+        """Point absolute links to recorded hosts back at this server"""
+        hosts = {urllib.parse.urlsplit(url).netloc for url in self.manifest['pages']}
+        text = body.decode('utf-8', errors='surrogateescape')
+        for host in hosts:
+            target = self.url if host == self.manifest['primary_host'] else f"{self.url}/_/{host}"
+            text = re.sub(rf'https?://{re.escape(host)}(?=[/"\'?#\s]|$)', target, text)
+        return text.encode('utf-8', errors='surrogateescape')
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = server.routes.get(_route_key(self.path))
+                with server._lock:
+                    server.hits[self.path] += 1
+                if page is None:
+                    self.send_error(404, 'not recorded')
+                    return
+                with open(os.path.join(server.directory, page['path']), 'rb') as f:
+                    body = server.rewrite(f.read())
+                self.send_response(200)
+                self.send_header('Content-Type', page['content_type'] or 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+def _route_key(path):
+    # /download and /download/ are the same page
+    parts = urllib.parse.urlsplit(path)
+    return parts.path.rstrip('/') + ('?' + parts.query if parts.query else '')
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay scraper HTML fixtures')
+    parser.add_argument('--dir', default=FIXTURES_DIR, help='Fixture directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='Crawl app pages and save every page fetched')
+    record_parser.add_argument('urls', nargs='*', help='App page URLs (default: every tracked app)')
+    serve_parser = commands.add_parser('serve', help='Serve recorded pages locally')
+    serve_parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        urls = args.urls
+        if not urls:
+            from config_store import shared_config_store
+            urls = [apk['base_url'] for apk in shared_config_store().tracked_apks()]
+        record(urls, args.dir)
+    else:
+        server = FixtureServer(args.dir, args.port)
+        print(f"🛰️  Replaying {len(server.routes)} pages from {args.dir} at {server.url}")
+        for url in server.app_urls():
+            print(f"   {url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import datetime
+import time
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError, ReadTimeout, ConnectTimeout
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from http_cache import CachingMixin
+
+try:
+    import httpx
+except ImportError:  # optional dependency: pip install 'httpx[http2]'
+    httpx = None
+
+def http2_available():
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class HTTPXRaw:
+    """File-like body over an httpx streaming response, as requests expects of .raw"""
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b''
+
+    def _next_chunk(self):
+        # Raise what urllib3 would, so requests and the downloader's stall
+        # detection and retries treat HTTP/2 bodies like HTTP/1.1 ones
+        url = str(self._response.url)
+        try:
+            return next(self._chunks)
+        except httpx.ReadTimeout as e:
+            raise ReadTimeoutError(None, url, f"Read timed out: {e}")
+        except httpx.DecodingError as e:
+            raise DecodeError(f"Could not decode body of {url}: {e}")
+        except (httpx.TransportError, httpx.StreamError) as e:
+            raise ProtocolError(f"Connection broken: {e!r}", e)
+
+    def read(self, amt=None, decode_content=True):
+        while amt is None or len(self._buffer) < amt:
+            try:
+                self._buffer += self._next_chunk()
+            except StopIteration:
+                break
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def stream(self, amt=65536, decode_content=True):
+        while True:
+            data = self.read(amt)
+            if not data:
+                return
+            yield data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+class HTTP2Adapter(BaseAdapter):
+    """requests transport adapter that sends through an HTTP/2 httpx client.
+
+    The httpx client always verifies against the default CA store and
+    connects directly, so requests with a custom verify setting, a client
+    certificate or a proxy go through a plain HTTP/1.1 adapter instead.
+    """
+    def __init__(self, pool_size=16):
+        if not http2_available():
+            raise RuntimeError("HTTP/2 needs httpx with the http2 extra installed")
+        super().__init__()
+        self.client = httpx.Client(
+            http2=True,
+            follow_redirects=False,
+            trust_env=False,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self.fallback = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if verify is not True or cert or select_proxy(request.url, proxies or {}):
+            return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                      proxies=proxies)
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+        else:
+            connect_timeout = read_timeout = timeout
+        httpx_request = self.client.build_request(
+            request.method,
+            request.url,
+            headers=dict(request.headers),
+            content=request.body,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+        start = time.perf_counter()
+        try:
+            httpx_response = self.client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise ConnectTimeout(e, request=request)
+        except httpx.ReadTimeout as e:
+            raise ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise ConnectionError(e, request=request)
+
+        response = Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        # httpx already undoes Content-Encoding when iterating the body
+        response.headers = CaseInsensitiveDict(
+            (k, v) for k, v in httpx_response.headers.items() if k.lower() != 'content-encoding')
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = HTTPXRaw(httpx_response)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        # Time to the response headers, as requests reports for HTTP/1.1
+        response.elapsed = datetime.timedelta(seconds=time.perf_counter() - start)
+        if not stream:
+            response.content
+            httpx_response.close()
+        return response
+
+    def close(self):
+        self.client.close()
+        self.fallback.close()
+
+class CachingHTTP2Adapter(CachingMixin, HTTP2Adapter):
+    """HTTP/2 client with the response cache in front"""
@@ -0,0 +1,245 @@
+import atexit
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from metrics import METRICS
+
+# Headers that describe the wire encoding rather than the stored (decoded) body
+_HOP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+# Streamed probe results kept for conditional re-checks (they are a few hundred bytes each)
+PROBE_MAX_ENTRIES = 4096
+
+class ResponseCache:
+    """On-disk store of validated GET responses with LRU eviction.
+
+    Bodies live in one file per URL next to an index.json holding the
+    validators (ETag / Last-Modified), the response headers and the last
+    access time used for eviction.
+    """
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.json')
+        self.probes_path = os.path.join(directory, 'probes.json')
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._load_index()
+        self.probes = self._load_json(self.probes_path)
+        # Access times change on every hit; persist them once at exit
+        atexit.register(self.flush)
+
+    def _load_index(self):
+        return self._load_json(self.index_path)
+
+    def _load_json(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_json(self, data, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _save_index(self):
+        self._save_json(self.index, self.index_path)
+
+    def _body_path(self, entry):
+        return os.path.join(self.directory, entry['file'])
+
+    def lookup(self, url):
+        """Return the index entry for url, or None if missing/unreadable"""
+        with self._lock:
+            entry = self.index.get(url)
+            if entry and os.path.exists(self._body_path(entry)):
+                return entry
+            return None
+
+    def read_body(self, url, entry):
+        with open(self._body_path(entry), 'rb') as f:
+            body = f.read()
+        with self._lock:
+            entry['last_used'] = time.time()
+        return body
+
+    def record(self, hit, revalidated=False):
+        METRICS.count('cache_hits_total' if hit else 'cache_misses_total')
+        if revalidated:
+            METRICS.count('cache_revalidated_total')
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if revalidated:
+                self.revalidated += 1
+
+    def flush(self):
+        with self._lock:
+            try:
+                self._save_index()
+                self._save_json(self.probes, self.probes_path)
+            except OSError as e:
+                print(f"⚠️  Could not save HTTP cache index: {e}")
+
+    def store(self, url, headers, body):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        cache_control = headers.get('Cache-Control', '').lower()
+        if not (etag or last_modified) or 'no-store' in cache_control:
+            return
+
+        entry = {
+            'file': hashlib.sha1(url.encode('utf-8')).hexdigest(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS},
+            'size': len(body),
+            'last_used': time.time(),
+        }
+        with self._lock:
+            tmp_path = f"{self._body_path(entry)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, self._body_path(entry))
+            self.index[url] = entry
+            self._evict()
+            self._save_index()
+
+    def lookup_probe(self, url):
+        """Validators and parse result of the last streamed probe of url, or None"""
+        with self._lock:
+            entry = self.probes.get(url)
+            if entry:
+                entry['last_used'] = time.time()
+            return entry
+
+    def store_probe(self, url, headers, result, complete):
+        """Keep what a streamed probe extracted, keyed by the page's validators.
+
+        A probe usually stops reading long before the end of the page, so
+        there is no body to store; the next probe sends a conditional
+        request and reuses result when the origin answers 304.
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in headers.get('Cache-Control', '').lower():
+            return
+        with self._lock:
+            self.probes[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'result': result,
+                'complete': complete,
+                'last_used': time.time()
+            }
+            for stale in sorted(self.probes, key=lambda key: self.probes[key]['last_used'])[:-PROBE_MAX_ENTRIES]:
+                del self.probes[stale]
+            self._save_json(self.probes, self.probes_path)
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for url, entry in sorted(self.index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(entry))
+            except OSError:
+                pass
+            total -= entry['size']
+            del self.index[url]
+
+    def summary(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        return (f"HTTP cache: {self.hits} hits ({self.revalidated} revalidated), {self.misses} misses, "
+                f"{len(self.index)} entries / {total / (1024 * 1024):.1f} MB on disk")
+
+class CachingMixin:
+    """Adds conditional requests and a per-run memo to a transport adapter.
+
+    Only plain GET requests are cached; streamed requests (APK downloads)
+    and authenticated API calls go straight to the network. Long-lived
+    sessions (--watch) must call clear_memo() between polls.
+    """
+    def __init__(self, cache, memo_max_bytes=5 * 1024 * 1024, **kwargs):
+        self.cache = cache
+        self.memo_max_bytes = memo_max_bytes
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _cached_response(self, request, headers, body):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = datetime.timedelta(0)
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def _remember(self, url, headers, body):
+        if len(body) <= self.memo_max_bytes:
+            with self._memo_lock:
+                self._memo[url] = (dict(headers), body)
+
+    def clear_memo(self):
+        """Forget memoized responses so the next GET revalidates with the origin"""
+        with self._memo_lock:
+            self._memo.clear()
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET' or stream or 'Authorization' in request.headers:
+            return super().send(request, stream=stream, **kwargs)
+
+        url = request.url
+        with self._memo_lock:
+            memoized = self._memo.get(url)
+        if memoized:
+            self.cache.record(hit=True)
+            return self._cached_response(request, *memoized)
+
+        entry = self.cache.lookup(url)
+        if entry:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry:
+            response.close()
+            body = self.cache.read_body(url, entry)
+            self.cache.record(hit=True, revalidated=True)
+            self._remember(url, entry['headers'], body)
+            return self._cached_response(request, entry['headers'], body)
+
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            body = response.content
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS}
+            self.cache.store(url, response.headers, body)
+            self._remember(url, headers, body)
+        return response
+
+class CachingAdapter(CachingMixin, HTTPAdapter):
+    """HTTP/1.1 connection pool with the response cache in front"""
@@ -1,20 +1,45 @@
 #!/usr/bin/env python3
 import argparse
-from scraper import GetModsApkScraper
+import sources
 from downloader import APKDownloader
-from utils import load_config, save_config
+from pipeline import run_pipeline
+from utils import normalize_version, setup_session, HTTP2_ENABLED, STATE_DIR
+from downloader import DELTA_ARTIFACTS, DOWNLOAD_CONNECTIONS, MIRROR_RACING
+from update_checker import read_manifest
+from versions import is_newer
+from config_store import shared_config_store
+from metrics import METRICS, RUN_LOG_KEEP, prune_run_logs
+from debug_capture import DEBUG_HTML_DIR, DEBUG_HTML_MAX_MB, DebugCapture
+from watch import Watcher
+from parse_pool import PARSE_WORKERS, shared_parse_pool
 import os
-import re
+import time
 
-def normalize_version(version):
-    """Normalize version string for comparison"""
-    if not version:
-        return ""
-    # Remove 'v' prefix and any non-version characters
-    version = re.sub(r'^v', '', str(version).strip())
-    # Keep only version numbers and dots
-    version = re.sub(r'[^\d.]', '', version)
-    return version
+# Default run-log directory; old logs are pruned only here
+RUN_LOG_DIR = os.path.join(STATE_DIR, 'runs')
+
+def select_apks(config, manifest_path=None):
+    """Tracked APKs to process: all of them, or only those in an update manifest"""
+    if not manifest_path:
+        return config.tracked_apks()
+    apks = [config.get(entry['name']) for entry in read_manifest(manifest_path)['updates']]
+    apks = [apk for apk in apks if apk]
+    print(f"📋 Manifest {manifest_path}: {len(apks)} changed apps")
+    return apks
+
+def resolve_mirrors(scraper, page, race):
+    """APK URLs for an inspected page: every mirror when racing, else the first that resolves"""
+    if race:
+        return scraper.resolve_mirrors(page)
+    download_url = scraper.resolve_download_url(page)
+    return [download_url] if download_url else []
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(description='APK Scraper for GetModsApk')
@@ -24,30 +49,125 @@ def main():
     parser.add_argument('--tag', help='Release tag for manual download')
     parser.add_argument('--name', help='APK name for manual download')
     parser.add_argument('--force', action='store_true', help='Force download even if version matches')
+    parser.add_argument('--manifest', help='Update manifest from update_checker.py; only its apps are processed (with --auto)')
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help='Process tracked APKs concurrently (with --auto)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Run as a daemon: poll each app on its own learned schedule and process updates as they appear')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Concurrent version checks / link resolutions in async and watch mode')
+    parser.add_argument('--transfer-workers', type=int, default=2,
+                        help='Concurrent downloads / uploads in async and watch mode')
+    parser.add_argument('--host-limit', type=positive_int,
+                        help="Max in-flight page requests per source site in async and watch mode (default: each source's policy)")
+    parser.add_argument('--rate-limit', type=float,
+                        help="Max requests per second per source site, 0 disables (default: each source's policy)")
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS,
+                        help='Parse pages on this many worker processes (default 0 parses in-thread, which is faster for site-sized pages)')
+    parser.add_argument('--deltas', action='store_true', default=DELTA_ARTIFACTS,
+                        help="Also publish a zip-entry delta from each app's previous version")
+    parser.add_argument('--race-mirrors', action='store_true', default=MIRROR_RACING,
+                        help='Resolve every candidate download link and download from the fastest mirror')
+    parser.add_argument('--http2', action='store_true', default=HTTP2_ENABLED,
+                        help='Use HTTP/2 for https requests (needs httpx[http2])')
+    parser.add_argument('--debug-html', metavar='DIR', default=DEBUG_HTML_DIR,
+                        help='Save every fetched page (raw bytes, per app and step) under DIR')
+    parser.add_argument('--debug-html-max-mb', type=int, default=DEBUG_HTML_MAX_MB,
+                        help='Size cap for --debug-html; oldest captures are deleted first')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print a per-app breakdown of time spent in each stage')
+    parser.add_argument('--run-log', default=os.getenv('APK_RUN_LOG') or os.path.join(
+                            RUN_LOG_DIR, f"run-{time.strftime('%Y%m%dT%H%M%S')}.jsonl"),
+                        help='JSON-lines log of spans and counters for this run')
+    parser.add_argument('--prometheus', default=os.getenv('APK_PROMETHEUS_TEXTFILE'),
+                        help='Also write counters and stage totals to this Prometheus textfile')
     
     args = parser.parse_args()
-    
+    METRICS.configure(args.run_log)
+    try:
+        run(args, parser)
+    finally:
+        METRICS.finish(args.prometheus)
+        print(f"🧾 Run log: {args.run_log}")
+        # Only our own run directory; --run-log may point anywhere
+        if os.path.abspath(os.path.dirname(args.run_log)) == os.path.abspath(RUN_LOG_DIR):
+            prune_run_logs(RUN_LOG_DIR, RUN_LOG_KEEP)
+
+def run(args, parser):
+    """Run the mode selected on the command line"""
     github_token = os.getenv('GITHUB_TOKEN')
     repo_name = os.getenv('GITHUB_REPOSITORY')
     
     print(f"🔑 GitHub Token: {'Provided' if github_token else 'Not provided'}")
     print(f"🏠 Repository: {repo_name}")
     
-    scraper = GetModsApkScraper()
-    downloader = APKDownloader(github_token)
+    # One session so connections, the per-host limit and the HTTP cache are shared
+    # by the scraper, downloader and release uploader
+    if args.async_mode or args.watch:
+        host_limits = sources.host_limits(args.host_limit)
+        pool_size = args.workers + args.transfer_workers * (DOWNLOAD_CONNECTIONS + 1)
+    else:
+        host_limits = None
+        pool_size = DOWNLOAD_CONNECTIONS + 2
+    session = setup_session(host_limits=host_limits, pool_size=max(pool_size, 4), http2=args.http2,
+                            rate_limits=sources.rate_limits(args.rate_limit))
+    
+    debug = DebugCapture(args.debug_html, args.debug_html_max_mb * 1024 * 1024) if args.debug_html else False
+    registry = sources.SourceRegistry(session=session, debug=debug, parser=shared_parse_pool(args.parse_workers))
+    downloader = APKDownloader(github_token, session=session, deltas=args.deltas)
     
-    if args.auto:
+    if args.watch:
+        print(f"👀 Watching tracked apps ({args.workers} workers, Ctrl+C to stop)...")
+        watcher = Watcher(
+            shared_config_store(),
+            registry,
+            downloader,
+            workers=args.workers,
+            prometheus=args.prometheus,
+            github_token=github_token,
+            repo_name=repo_name,
+            transfer_workers=args.transfer_workers,
+            race_mirrors=args.race_mirrors
+        )
+        downloaded_count = watcher.run()
+        print(f"\n" + "="*50)
+        print(f"📊 Summary: Downloaded {downloaded_count} new APK(s)")
+        
+    elif args.auto and args.async_mode:
+        print(f"🚀 Running auto scraper (async, {args.workers} workers)...")
+        downloaded_count = run_pipeline(
+            select_apks(shared_config_store(), args.manifest),
+            registry,
+            downloader,
+            github_token=github_token,
+            repo_name=repo_name,
+            force=args.force,
+            workers=args.workers,
+            transfer_workers=args.transfer_workers,
+            race_mirrors=args.race_mirrors
+        )
+        print(f"\n" + "="*50)
+        print(f"📊 Summary: Downloaded {downloaded_count} new APK(s)")
+        
+    elif args.auto:
         print("🚀 Running auto scraper...")
-        config = load_config()
         downloaded_count = 0
         
-        for apk in config['tracked_apks']:
+        for apk in select_apks(shared_config_store(), args.manifest):
+            METRICS.set_app(apk['name'])
             print(f"\n" + "="*50)
             print(f"🔍 Processing {apk['name']}...")
             print(f"🌐 URL: {apk['base_url']}")
             
+            try:
+                scraper = registry.for_url(apk['base_url'])
+            except sources.UnsupportedSourceError as e:
+                print(f"❌ {e}")
+                continue
+            
             # Check current version
-            current_version = scraper.get_current_version(apk['base_url'])
+            page = scraper.inspect_app(apk['base_url'], with_links=False)
+            current_version = page.version if page else None
             if not current_version:
                 print(f"❌ Could not determine current version for {apk['name']}")
                 continue
@@ -59,7 +179,8 @@ def main():
             print(f"📋 Config version: {apk['current_version']}")
             print(f"📊 Normalized comparison: {normalized_current} vs {normalized_config}")
             
-            should_download = args.force or (normalized_current != normalized_config)
+            # Only a strictly newer site version is worth a download
+            should_download = args.force or is_newer(current_version, apk['current_version'])
             
             if should_download:
                 if args.force:
@@ -67,23 +188,24 @@ def main():
                 else:
                     print(f"🆕 New version found: {current_version} (was {apk['current_version']})")
                 
-                # Get download link
-                download_url = scraper.get_download_links(apk['base_url'])
-                if download_url:
-                    print(f"🔗 Download URL obtained: {download_url}")
+                # Get download link(s)
+                mirrors = resolve_mirrors(scraper, page, args.race_mirrors)
+                if mirrors:
+                    print(f"🔗 Download URL obtained: {mirrors[0]}")
                     filename = f"{apk['name'].replace(' ', '-').lower()}-{current_version}.apk"
-                    filepath = downloader.download_apk(download_url, filename)
+                    artifact = downloader.download_apk(mirrors[0], filename, app=apk['name'], version=current_version,
+                                                       mirrors=mirrors[1:])
                     
-                    if filepath and os.path.exists(filepath):
-                        file_size = os.path.getsize(filepath) / (1024 * 1024)  # MB
-                        print(f"✅ Downloaded: {filepath} ({file_size:.2f} MB)")
+                    if artifact:
+                        file_size = artifact.size / (1024 * 1024)  # MB
+                        print(f"✅ Downloaded: {artifact.path} ({file_size:.2f} MB)")
                         downloaded_count += 1
                         
                         if github_token:
                             print(f"📤 Attempting to upload to GitHub releases...")
                             success = downloader.upload_to_release(
                                 repo_name, 
-                                filepath, 
+                                artifact, 
                                 apk['release_tag'], 
                                 current_version
                             )
@@ -95,7 +217,7 @@ def main():
                         else:
                             print(f"⚠️  No GitHub token - skipping release upload")
                     else:
-                        print(f"❌ Failed to download APK or file doesn't exist")
+                        print(f"❌ Failed to download a valid APK")
                 else:
                     print(f"❌ Could not find download link for {apk['name']}")
             else:
@@ -106,17 +228,25 @@ def main():
         
     elif args.manual and args.url and args.tag and args.name:
         print("🛠️ Running manual download...")
-        download_url = scraper.get_download_links(args.url)
+        METRICS.set_app(args.name)
+        try:
+            scraper = registry.for_url(args.url)
+        except sources.UnsupportedSourceError as e:
+            print(f"❌ {e}")
+            return
+        page = scraper.inspect_app(args.url)
+        mirrors = resolve_mirrors(scraper, page, args.race_mirrors) if page else []
         
-        if download_url:
-            current_version = scraper.get_current_version(args.url) or "unknown"
+        if mirrors:
+            current_version = page.version or "unknown"
             filename = f"{args.name.replace(' ', '-').lower()}-{current_version}.apk"
-            filepath = downloader.download_apk(download_url, filename)
+            artifact = downloader.download_apk(mirrors[0], filename, app=args.name, version=current_version,
+                                               mirrors=mirrors[1:])
             
-            if filepath and github_token:
+            if artifact and github_token:
                 downloader.upload_to_release(
                     repo_name,
-                    filepath,
+                    artifact,
                     args.tag,
                     current_version
                 )
@@ -125,6 +255,17 @@ def main():
     
     else:
         parser.print_help()
+        return
+    
+    if session.cache:
+        print(f"💾 {session.cache.summary()}")
+    for line in session.latency.summary():
+        print(f"🌐 {line}")
+    
+    if args.profile:
+        print(f"\n⏱️  Per-app stage breakdown:")
+        for line in METRICS.profile_report():
+            print(f"   {line}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Stages reported by --profile, in pipeline order
+STAGES = ('fetch', 'parse', 'extract', 'download', 'hash', 'upload')
+PROMETHEUS_PREFIX = 'apk_scraper'
+# Run logs kept in the default run-log directory
+RUN_LOG_KEEP = int(os.getenv('APK_RUN_LOG_KEEP', '20'))
+
+class Metrics:
+    """Process-wide counters, stage timers and spans.
+
+    span() times a block, adds it to the per-app stage totals and writes a
+    JSON line to the run log (when one is configured); timer() only adds to
+    the totals, for hot paths such as per-chunk hashing. The current app is
+    tracked per thread, so spans opened deep inside the scraper or the
+    downloader are attributed to the app being processed.
+    """
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.stage_seconds = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._log = None
+        self.run_id = time.strftime('%Y%m%dT%H%M%S')
+
+    def configure(self, run_log=None):
+        """Start writing span and counter events to run_log (JSON lines)"""
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            if run_log:
+                directory = os.path.dirname(run_log)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._log = open(run_log, 'a', buffering=1)
+        self.event('run_start', run_id=self.run_id, pid=os.getpid())
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+
+    def event(self, kind, **fields):
+        if self._log is None:
+            return
+        line = json.dumps(dict(ts=round(time.time(), 3), type=kind, **fields), default=str)
+        with self._lock:
+            if self._log:
+                self._log.write(line + '\n')
+
+    @property
+    def current_app(self):
+        return getattr(self._local, 'app', None)
+
+    def set_app(self, name):
+        """Attribute spans in this thread to app name from now on"""
+        self._local.app = name
+
+    @contextmanager
+    def app(self, name):
+        """Attribute spans in this thread to app name within the block"""
+        previous = self.current_app
+        self._local.app = name
+        try:
+            yield
+        finally:
+            self._local.app = previous
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def add_time(self, stage, seconds, app=None):
+        key = (app or self.current_app, stage)
+        with self._lock:
+            self.stage_seconds[key] += seconds
+            self.stage_counts[key] += 1
+
+    @contextmanager
+    def timer(self, stage, app=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, app=app)
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add_time(stage, elapsed)
+            self.event('span', name=stage, app=self.current_app, ms=round(elapsed * 1000, 2),
+                       error=error, **attrs)
+
+    def profile(self):
+        """{app: {stage: (seconds, calls)}}"""
+        result = defaultdict(dict)
+        with self._lock:
+            for (app, stage), seconds in self.stage_seconds.items():
+                result[app or '-'][stage] = (seconds, self.stage_counts[(app, stage)])
+        return dict(result)
+
+    def profile_report(self):
+        """Per-app stage breakdown as printable lines"""
+        stages = list(STAGES) + sorted({stage for (_, stage) in self.stage_seconds} - set(STAGES))
+        lines = [f"{'app':<30}" + ''.join(f"{stage:>10}" for stage in stages) + f"{'total':>10}"]
+        for app, by_stage in sorted(self.profile().items()):
+            seconds = [by_stage.get(stage, (0.0, 0))[0] for stage in stages]
+            name = app if len(app) <= 30 else app[:27] + '...'
+            lines.append(f"{name:<30}" + ''.join(f"{value:>9.2f}s" for value in seconds) + f"{sum(seconds):>9.2f}s")
+        return lines
+
+    def stage_totals(self):
+        """{stage: (seconds, calls)} summed over all apps"""
+        totals = defaultdict(lambda: [0.0, 0])
+        with self._lock:
+            for (app, stage), seconds in self.stage_seconds.items():
+                totals[stage][0] += seconds
+                totals[stage][1] += self.stage_counts[(app, stage)]
+        return {stage: tuple(total) for stage, total in totals.items()}
+
+    def stage_summary(self):
+        """One line of stage totals, in pipeline order"""
+        totals = self.stage_totals()
+        stages = [stage for stage in STAGES if stage in totals] + sorted(set(totals) - set(STAGES))
+        return '  '.join(f"{stage} {totals[stage][0]:.1f}s/{totals[stage][1]}" for stage in stages)
+
+    def write_prometheus(self, path):
+        """Write counters and stage totals in the node_exporter textfile format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+        stages = self.stage_totals()
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} counter")
+            for (counter, labels), value in counters:
+                if counter == name:
+                    lines.append(f"{PROMETHEUS_PREFIX}_{name}{_labels(labels)} {value:g}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary")
+        for stage, (seconds, calls) in sorted(stages.items()):
+            lines.append(f"{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage=\"{stage}\"}} {seconds:.6f}")
+            lines.append(f"{PROMETHEUS_PREFIX}_stage_seconds_count{{stage=\"{stage}\"}} {calls}")
+        lines.append(f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {time.time():.0f}")
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def finish(self, prometheus_path=None):
+        """Log the final counters and optionally export them for Prometheus"""
+        with self._lock:
+            counters = {name + _labels(labels): value for (name, labels), value in self.counters.items()}
+        self.event('run_end', run_id=self.run_id, counters=counters)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+        self.close()
+
+def prune_run_logs(directory, keep):
+    """Delete all but the newest `keep` run-*.jsonl logs in directory"""
+    logs = sorted(glob.glob(os.path.join(directory, 'run-*.jsonl')), key=os.path.getmtime, reverse=True)
+    for path in logs[keep:]:
+        os.remove(path)
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+METRICS = Metrics()
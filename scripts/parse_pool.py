@@ -0,0 +1,72 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from extractor import scan_html
+
+# Worker processes for HTML parsing; 0 parses in the calling thread. Site pages
+# are a few KB and parse faster in-thread; run bench_parse.py --sizes before
+# turning the pool on (it only paid off from ~64 KB pages when measured)
+PARSE_WORKERS = int(os.getenv('APK_PARSE_WORKERS', '0'))
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+# A small page that touches every PageScan query, run once per worker
+_WARM_UP_PAGE = (b'<html><head><title>App v1.0.0</title></head><body><main>'
+                 b'<a href="/app/download/">Download</a><a href="/download/1/">Download</a>'
+                 b'<iframe src="/f/app.apk"></iframe><script>var u = "https://x/download/1.apk";</script>'
+                 b'</main></body></html>')
+
+def _warm_up():
+    scan_html(_WARM_UP_PAGE).record()
+
+def parse_record(content):
+    """Worker task: raw page bytes in, PageRecord out"""
+    return scan_html(content).record()
+
+class ParsePool:
+    """Parse pages on a pool of worker processes, off the GIL.
+
+    Workers receive raw bytes and send back a PageRecord (a few lists and
+    strings); the parser state never crosses the process boundary. They
+    are started and warmed up once and reused for the whole run. If the
+    pool breaks, parsing falls back to the calling thread.
+    """
+    def __init__(self, workers=PARSE_WORKERS):
+        self.workers = workers
+        # spawn: forking a process that already runs HTTP threads is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_warm_up)
+        self.broken = False
+
+    def warm_up(self):
+        """Start every worker now rather than on the first page"""
+        for future in [self.executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+        return self
+
+    def parse(self, content):
+        if not self.broken:
+            try:
+                return self.executor.submit(parse_record, content).result()
+            except BrokenProcessPool as e:
+                self.broken = True
+                print(f"⚠️  Parse pool failed ({e}); parsing in-process from now on")
+        return parse_record(content)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+def shared_parse_pool(workers=PARSE_WORKERS):
+    """Process-wide ParsePool, or None when workers is 0; shut down at exit"""
+    global _shared_pool
+    if workers <= 0:
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParsePool(workers).warm_up()
+            atexit.register(_shared_pool.close)
+        return _shared_pool
@@ -0,0 +1,151 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from metrics import METRICS
+from versions import is_newer
+
+# App whose _process task is running, for metrics attribution
+_current_app = contextvars.ContextVar('pipeline_app', default=None)
+
+class AsyncPipeline:
+    """Run the --auto flow for many APKs concurrently.
+
+    Each app goes through version check -> link resolution -> download ->
+    upload. Scraping and transfers use separate concurrency budgets so
+    downloads and uploads for one app overlap with scraping for others.
+    Each source (see sources.py) also gets its own scrape concurrency cap,
+    and apps are interleaved across sources, so sites are crawled in
+    parallel without any one of them seeing more than its policy allows.
+    The blocking scraper/downloader calls run on a thread pool.
+    """
+    def __init__(self, sources, downloader, github_token=None, repo_name=None,
+                 force=False, workers=4, transfer_workers=2, race_mirrors=False):
+        self.sources = sources
+        self.downloader = downloader
+        self.github_token = github_token
+        self.repo_name = repo_name
+        self.force = force
+        self.workers = workers
+        self.transfer_workers = transfer_workers
+        self.race_mirrors = race_mirrors
+        self.executor = ThreadPoolExecutor(max_workers=workers + transfer_workers,
+                                           thread_name_prefix='pipeline')
+
+    async def _run_stage(self, func, *args):
+        """Run a blocking scraper/downloader call on the executor.
+
+        Stage times come from the METRICS spans inside those calls.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Executor threads do not inherit the task's context; carry the app over
+        app = _current_app.get()
+
+        def attributed():
+            with METRICS.app(app):
+                return func(*args)
+        return await loop.run_in_executor(self.executor, attributed)
+
+    async def _process(self, apk, page=None):
+        name = apk['name']
+        _current_app.set(name)
+        scraper = self.sources.for_url(apk['base_url'])
+        # Source slot first, so apps waiting on a busy site do not hold a worker
+        async with self._source_slots(scraper), self.scrape_slots:
+            if page is None:
+                print(f"🔍 [{name}] Checking {apk['base_url']} ({scraper.name})")
+                page = await self._run_stage(scraper.inspect_app, apk['base_url'], False)
+            current_version = page.version if page else None
+            if not current_version:
+                print(f"❌ [{name}] Could not determine current version")
+                return False
+
+            if not self.force and not is_newer(current_version, apk['current_version']):
+                print(f"✅ [{name}] No update available ({current_version}, have {apk['current_version']})")
+                return False
+
+            if self.force:
+                print(f"🔄 [{name}] Force downloading: {current_version}")
+            else:
+                print(f"🆕 [{name}] New version found: {current_version} (was {apk['current_version']})")
+
+            if self.race_mirrors:
+                mirrors = await self._run_stage(scraper.resolve_mirrors, page)
+            else:
+                download_url = await self._run_stage(scraper.resolve_download_url, page)
+                mirrors = [download_url] if download_url else []
+            if not mirrors:
+                print(f"❌ [{name}] Could not find download link")
+                return False
+
+        async with self.transfer_slots:
+            filename = f"{name.replace(' ', '-').lower()}-{current_version}.apk"
+            artifact = await self._run_stage(partial(
+                self.downloader.download_apk, mirrors[0], filename, app=name, version=current_version,
+                mirrors=mirrors[1:]))
+            if not artifact:
+                print(f"❌ [{name}] Failed to download a valid APK")
+                return False
+
+            if not self.github_token:
+                print(f"⚠️  [{name}] No GitHub token - skipping release upload")
+                return True
+
+            success = await self._run_stage(partial(
+                self.downloader.upload_to_release,
+                self.repo_name, artifact, apk['release_tag'], current_version))
+
+        if success:
+            await loop_call(self.executor, self.downloader.update_apk_list, name, current_version)
+            print(f"🎉 [{name}] Successfully completed")
+        else:
+            print(f"❌ [{name}] Failed to upload to release")
+        return True
+
+    def _source_slots(self, scraper):
+        if scraper.name not in self.source_slots:
+            self.source_slots[scraper.name] = asyncio.Semaphore(scraper.concurrency)
+        return self.source_slots[scraper.name]
+
+    async def _guarded(self, apk, page=None):
+        try:
+            return await self._process(apk, page)
+        except Exception as e:
+            print(f"❌ [{apk['name']}] Pipeline error: {e}")
+            return False
+
+    async def run(self, apks, pages=None):
+        """Process all APKs; returns the number of APKs downloaded
+
+        pages maps app names to AppPages that were already inspected (by the
+        watch daemon, say); those apps skip the version check fetch.
+        """
+        pages = pages or {}
+        self.scrape_slots = asyncio.Semaphore(self.workers)
+        self.transfer_slots = asyncio.Semaphore(self.transfer_workers)
+        self.source_slots = {}
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(self._guarded(apk, pages.get(apk['name']))
+                                             for apk in self.sources.interleave(apks)))
+        finally:
+            self.executor.shutdown(wait=False)
+        elapsed = time.perf_counter() - start
+        downloaded = sum(1 for result in results if result)
+        METRICS.event('pipeline', apps=len(results), downloaded=downloaded, seconds=round(elapsed, 3))
+        print(f"\n⏱️  Pipeline finished in {elapsed:.1f}s (per-app breakdown with --profile)")
+        summary = METRICS.stage_summary()
+        if summary:
+            print(f"   Stage totals (time/calls): {summary}")
+        return downloaded
+
+async def loop_call(executor, func, *args):
+    """Run a blocking call on executor from a coroutine"""
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+
+def run_pipeline(apks, sources, downloader, pages=None, **kwargs):
+    """Synchronous entry point for main.py"""
+    return asyncio.run(AsyncPipeline(sources, downloader, **kwargs).run(apks, pages))
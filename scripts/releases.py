@@ -0,0 +1,90 @@
+import os
+import time
+from utils import shared_session
+
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+UPLOAD_TIMEOUT = (10, 300)
+
+class GitHubReleases:
+    """Minimal GitHub releases client over the REST API.
+
+    Releases and asset listings are fetched once per run and kept in sync
+    locally as assets are uploaded, renamed and deleted. Point api_url at a
+    stub server (or set GITHUB_API_URL) to exercise it offline.
+    """
+    def __init__(self, token, session=None, api_url=GITHUB_API_URL):
+        # Authenticated requests bypass the HTTP cache, so listings are always fresh
+        self.session = session or shared_session()
+        self.api_url = api_url.rstrip('/')
+        self.headers = {
+            'Authorization': f'Bearer {token}',
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28'
+        }
+        self._releases = {}
+        self._assets = {}
+
+    def _request(self, method, url, **kwargs):
+        headers = dict(self.headers, **kwargs.pop('headers', {}))
+        response = self.session.request(method, url, headers=headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def get_release(self, repo_name, tag):
+        """Release for tag, or None if it does not exist"""
+        key = (repo_name, tag)
+        if key not in self._releases:
+            response = self.session.get(f"{self.api_url}/repos/{repo_name}/releases/tags/{tag}", headers=self.headers)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            self._releases[key] = response.json()
+        return self._releases[key]
+
+    def create_release(self, repo_name, tag, name, body):
+        release = self._request('POST', f"{self.api_url}/repos/{repo_name}/releases", json={
+            'tag_name': tag,
+            'name': name,
+            'body': body,
+            'draft': False,
+            'prerelease': False
+        }).json()
+        self._releases[(repo_name, tag)] = release
+        self._assets[release['id']] = []
+        return release
+
+    def list_assets(self, repo_name, release):
+        if release['id'] not in self._assets:
+            assets = []
+            url = f"{self.api_url}/repos/{repo_name}/releases/{release['id']}/assets?per_page=100"
+            while url:
+                response = self._request('GET', url)
+                assets.extend(response.json())
+                url = response.links.get('next', {}).get('url')
+            self._assets[release['id']] = assets
+        return self._assets[release['id']]
+
+    def upload_asset(self, release, path, name, size, content_type):
+        """Stream path to the release under name; returns (asset, MB/s)"""
+        upload_url = release['upload_url'].split('{', 1)[0]
+        start = time.monotonic()
+        with open(path, 'rb') as f:
+            # A file object body is sent in blocks straight from disk
+            asset = self._request('POST', upload_url, params={'name': name}, data=f, timeout=UPLOAD_TIMEOUT, headers={
+                'Content-Type': content_type,
+                'Content-Length': str(size)
+            }).json()
+        elapsed = max(time.monotonic() - start, 1e-6)
+        self._assets.setdefault(release['id'], []).append(asset)
+        return asset, size / (1024 * 1024) / elapsed
+
+    def rename_asset(self, repo_name, release, asset, name):
+        updated = self._request('PATCH', f"{self.api_url}/repos/{repo_name}/releases/assets/{asset['id']}",
+                                json={'name': name, 'label': name}).json()
+        assets = self._assets.get(release['id'], [])
+        self._assets[release['id']] = [updated if a['id'] == asset['id'] else a for a in assets]
+        return updated
+
+    def delete_asset(self, repo_name, release, asset):
+        self._request('DELETE', f"{self.api_url}/repos/{repo_name}/releases/assets/{asset['id']}")
+        self._assets[release['id']] = [a for a in self._assets.get(release['id'], []) if a['id'] != asset['id']]
@@ -1,233 +1,429 @@
-from utils import setup_session, extract_version_info
-from bs4 import BeautifulSoup
+from utils import shared_session, HTTP_RATE_LIMITS
+from sources import Source, register_source
+from extractor import VERSION_PROBE_CHUNK, PageRecord, declared_charset, scan_html, scan_until_version
+from strategy_memo import StrategyMemo
+from versions import parse_version
+from metrics import METRICS
+from debug_capture import DEBUG_HTML_DIR, DebugCapture
+import os
 import re
-import time
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
 
-class GetModsApkScraper:
-    def __init__(self):
-        self.session = setup_session()
+# Version-only checks stream the app page and stop reading once the version is known
+STREAM_VERSION_PROBE = os.getenv('APK_STREAM_VERSION_PROBE', '1') == '1'
+
+@dataclass
+class AppPage:
+    """Result of inspecting one app page"""
+    base_url: str
+    version: Optional[str] = None
+    download_page_url: Optional[str] = None
+    candidate_links: List[str] = field(default_factory=list)
+    javascript_links: List[str] = field(default_factory=list)
+    links_loaded: bool = False
+    # Discovery method that produced candidate_links
+    discovery: Optional[int] = None
+    # Memoised strategy for this app and the number of page requests made so far
+    strategy: dict = field(default_factory=dict, repr=False)
+    requests: int = 0
+    
+    @property
+    def link_ids(self):
+        """Numeric IDs of the /download/<id>/ candidates"""
+        ids = []
+        for url in self.candidate_links:
+            match = re.search(r'/download/(\d+)/', url)
+            if match:
+                ids.append(match.group(1))
+        return ids
+
+@register_source
+class GetModsApkScraper(Source):
+    name = 'getmodsapk'
+    hosts = ('getmodsapk.com',)
+    concurrency = 2
+    rate_limit = HTTP_RATE_LIMITS['getmodsapk.com']
+    
+    def __init__(self, session=None, memo=None, debug=None, parser=None):
+        self.session = session or shared_session()
+        self.memo = memo or StrategyMemo()
+        # Optional ParsePool; pages are parsed in the calling thread without one
+        self.parser = parser
+        # Raw page dumps are opt-in (--debug-html or APK_DEBUG_HTML_DIR)
+        if debug is None and DEBUG_HTML_DIR:
+            debug = DebugCapture(DEBUG_HTML_DIR)
+        self.debug = debug
         self.base_domain = "https://getmodsapk.com"
+        self.stream_versions = STREAM_VERSION_PROBE
+        self._requests_lock = threading.Lock()
+    
+    def fetch(self, page, url, step):
+        """GET a page on behalf of an app, counting the request"""
+        with self._requests_lock:
+            page.requests += 1
+        with METRICS.span('fetch', url=url) as span:
+            response = self.session.get(url)
+            span['status'] = response.status_code
+            span['bytes'] = len(response.content)
+            span['cached'] = getattr(response, 'from_cache', False)
+            response.raise_for_status()
+        if self.debug:
+            self.debug.capture(page.base_url, step, response.content)
+        return response
+    
+    def probe(self, page, url):
+        """Stream a page into a PageScan until its version is settled.
+
+        Returns (scan, complete) like scan_until_version(). The connection
+        is dropped as soon as the title or main content yields the version,
+        so most checks read a few KB instead of the whole page. The result
+        is cached under the page's ETag/Last-Modified, so the next probe is
+        a conditional request and a 304 skips parsing altogether.
+        """
+        with self._requests_lock:
+            page.requests += 1
+        cache = getattr(self.session, 'cache', None)
+        previous = cache.lookup_probe(url) if cache else None
+        headers = {}
+        if previous and previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous and previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        received = []
+
+        def chunks():
+            for chunk in response.iter_content(VERSION_PROBE_CHUNK):
+                received.append(chunk)
+                yield chunk
+
+        with METRICS.span('fetch', url=url, probe=True) as span:
+            response = self.session.get(url, stream=True, headers=headers)
+            try:
+                span['status'] = response.status_code
+                if response.status_code == 304 and previous:
+                    span['cached'] = True
+                    cache.record(hit=True, revalidated=True)
+                    return PageRecord.from_dict(previous['result']), previous['complete']
+                response.raise_for_status()
+                with METRICS.timer('parse'):
+                    encoding = declared_charset(response.headers.get('Content-Type'))
+                    scan, complete, size = scan_until_version(chunks(), encoding)
+            finally:
+                response.close()
+            span['bytes'] = size
+            span['early'] = not complete
+        METRICS.count('version_probe_bytes_total', size)
+        if not complete:
+            METRICS.count('version_probe_early_total')
+        if cache:
+            cache.record(hit=False)
+            if complete:
+                cache.store(url, response.headers, b''.join(received))
+            cache.store_probe(url, response.headers, asdict(scan.record()), complete)
+        if self.debug:
+            self.debug.capture(page.base_url, 'app-probe', b''.join(received))
+        return scan, complete
+
+    def has_validators(self, url):
+        """Whether a conditional GET (a cheap 304) is possible for url"""
+        cache = getattr(self.session, 'cache', None)
+        entry = cache.lookup(url) if cache else None
+        return bool(entry and (entry.get('etag') or entry.get('last_modified')))
+
+    def parse(self, content):
+        """scan_html (or a PageRecord from the parse pool), timed as the parse stage"""
+        with METRICS.span('parse', bytes=len(content), pool=bool(self.parser)):
+            if self.parser:
+                return self.parser.parse(content)
+            return scan_html(content)
+    
+    def inspect_app(self, base_url, with_links=True):
+        """Fetch and parse the app page once.
+
+        Returns an AppPage with the site version, the download page URL and,
+        when with_links is set, the candidate /download/<id>/ links (left for
+        later when the memo remembers last run's winning page).
+        Version-only inspections stream the page and stop early (see
+        probe()), unless a cached copy can be revalidated instead.
+        """
+        try:
+            print(f"📄 Accessing main page: {base_url}")
+            page = AppPage(base_url=base_url, strategy=self.memo.get(base_url))
+            if not with_links and self.stream_versions and not self.has_validators(base_url):
+                scan, complete = self.probe(page, base_url)
+            else:
+                response = self.fetch(page, base_url, 'app')
+                scan, complete = self.parse(response.content), True
+            with METRICS.span('extract', what='version'):
+                page.version = scan.find_version()
+                page.download_page_url = self.find_download_page_url(scan, base_url)
+            
+            # Some app pages already link straight to /download/<id>/
+            if complete and scan.has_download_id_links():
+                page.discovery, page.candidate_links = self.discover_links(scan, page.strategy.get('discovery'))
+                page.links_loaded = True
+            elif with_links and not page.strategy.get('link_url'):
+                # With a memoized winner, resolve_download_url() tries that page
+                # first and loads the download page only if it fails
+                self.load_candidate_links(page)
+            return page
+            
+        except Exception as e:
+            print(f"❌ Error accessing app page: {e}")
+            return None
+    
+    def find_download_page_url(self, scan, base_url):
+        """Download page linked from the app page, or the conventional /download/ path"""
+        expected = base_url.rstrip('/') + '/download/'
+        for href in scan.find_download_page_hrefs():
+            href = urllib.parse.urljoin(base_url, href)
+            if href.rstrip('/') == expected.rstrip('/'):
+                return href
+        return expected
+    
+    def load_candidate_links(self, page):
+        """Fetch the download page and collect candidate links into page"""
+        print(f"📥 Accessing download page...")
+        response = self.fetch(page, page.download_page_url, 'download')
+        
+        scan = self.parse(response.content)
+        page.discovery, page.candidate_links = self.discover_links(scan, page.strategy.get('discovery'))
+        with METRICS.span('extract', what='javascript_links'):
+            page.javascript_links = self.find_javascript_links(scan)
+        page.links_loaded = True
+        return page
+    
+    def full_url(self, href):
+        """Resolve an href found on a getmodsapk page"""
+        return href if href.startswith('http') else urllib.parse.urljoin(self.base_domain, href)
+    
+    def find_download_links(self, scan):
+        """Find /download/<id>/ style links, most specific method first"""
+        return self.discover_links(scan)[1]
+    
+    def discover_links(self, scan, prefer=None):
+        """Return (method, urls) of candidate links, trying method prefer first"""
+        with METRICS.span('extract', what='download_links') as span:
+            method, hrefs = scan.find_download_links(prefer)
+            span['method'] = method
+        
+        urls = []
+        for href in hrefs:
+            if not href:
+                continue
+            download_id_url = self.full_url(href)
+            if download_id_url not in urls:
+                urls.append(download_id_url)
+        return method, urls
     
     def get_download_links(self, base_url):
         """Get download links following the multi-step process"""
+        print(f"🔍 Starting download process for: {base_url}")
+        page = self.inspect_app(base_url)
+        if not page:
+            return None
+        return self.resolve_download_url(page)
+    
+    def resolve_download_url(self, page):
+        """Resolve the direct APK URL for an inspected app page
+
+        The strategy that worked last time for this app (or, failing that,
+        most often on this site) is tried first: its route, its candidate
+        link and its APK extraction method. Everything else remains as a
+        fallback, and the winner is written back to the memo.
+        """
         try:
-            print(f"🔍 Starting download process for: {base_url}")
+            if not page.links_loaded:
+                apk_link = self.try_memoized_link(page)
+                if apk_link:
+                    print(f"📊 Resolved in {page.requests} requests")
+                    return apk_link
+                self.load_candidate_links(page)
             
-            # Step 1: Navigate to base URL
-            print(f"📄 Step 1: Accessing main page...")
-            response = self.session.get(base_url)
-            response.raise_for_status()
+            print(f"📎 Found {len(page.candidate_links)} potential download links")
+            strategy = page.strategy
+            routes = [self.try_candidate_links, self.try_javascript_links]
+            if strategy.get('route') == 'javascript':
+                print("🧠 JavaScript links worked last time, trying them first")
+                routes.reverse()
             
-            # Step 2: Go to download page
-            download_page_url = base_url.rstrip('/') + '/download/'
-            print(f"📥 Step 2: Accessing download page...")
-            response = self.session.get(download_page_url)
-            response.raise_for_status()
+            for route in routes:
+                apk_link = route(page)
+                if apk_link:
+                    print(f"📊 Resolved in {page.requests} requests")
+                    return apk_link
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if strategy:
+                self.memo.forget(page.base_url)
+            return None
             
-            # Debug: Save HTML for inspection
-            with open('debug_page.html', 'w', encoding='utf-8') as f:
-                f.write(soup.prettify())
+        except Exception as e:
+            print(f"❌ Error in download process: {e}")
+            return None
+    
+    def try_memoized_link(self, page):
+        """Go straight to last run's winning page, skipping the download page.
+
+        Only accepted when that page shows the version being resolved, so an
+        old /download/<id>/ page can never hand back the previous APK.
+        """
+        strategy = page.strategy
+        link_url = strategy.get('link_url')
+        expected = parse_version(page.version)
+        if not link_url or expected is None:
+            return None
+        
+        print(f"🧠 Trying last winning page directly: {link_url}")
+        try:
+            scan = self.parse(self.fetch(page, link_url, 'memoized').content)
+        except Exception as e:
+            print(f"❌ Memoized page failed: {e}")
+            return None
+        if parse_version(scan.find_version()) != expected:
+            print(f"🔄 Memoized page does not show {page.version}, loading the download page")
+            return None
+        method, apk_link = self.find_apk_link(scan, link_url, strategy.get('extraction'))
+        if apk_link:
+            self.memo.record(page.base_url, strategy.get('route') or 'candidates', discovery=strategy.get('discovery'),
+                             link_index=strategy.get('link_index'), link_url=link_url, extraction=method,
+                             requests=page.requests)
+        return apk_link
+    
+    def try_candidate_links(self, page):
+        """Try the /download/<id>/ candidates, memoised winner first"""
+        strategy = page.strategy
+        ordered = self.memo.order_candidates(page.candidate_links, strategy)
+        if strategy.get('link_pattern') and ordered[:1] != page.candidate_links[:1]:
+            print(f"🧠 Trying last winning link first: {ordered[0]}")
+        
+        # Limit to first 5 to avoid too many requests; the rate limiter paces them
+        for i, download_id_url in enumerate(ordered[:5]):
+            print(f"🔍 Trying download link {i+1}: {download_id_url}")
+            method, apk_link = self.resolve_candidate(page, i, download_id_url)
+            if apk_link:
+                self.record_candidate(page, download_id_url, method)
+                return apk_link
+        return None
+    
+    def resolve_candidate(self, page, i, download_id_url):
+        """Fetch one /download/<id>/ page and return (method, APK URL)"""
+        try:
+            # Get final download page
+            final_response = self.fetch(page, download_id_url, f'candidate-{i+1}')
             
-            # Step 3: Find all potential download links
-            print(f"🔗 Step 3: Finding download links...")
+            # Extract direct APK download link
+            method, apk_link = self.find_apk_link(self.parse(final_response.content), download_id_url,
+                                                  page.strategy.get('extraction'))
+            if apk_link:
+                print(f"✅ Success! Found APK: {apk_link}")
+            return method, apk_link
             
-            # Method 1: Look for links containing '/download/'
-            download_links = soup.find_all('a', href=re.compile(r'/download/\d+/', re.I))
+        except Exception as e:
+            print(f"❌ Failed with link {i+1}: {e}")
+            return None, None
+    
+    def record_candidate(self, page, download_id_url, method):
+        self.memo.record(page.base_url, 'candidates', discovery=page.discovery,
+                         link_index=page.candidate_links.index(download_id_url),
+                         link_url=download_id_url, extraction=method, requests=page.requests)
+    
+    def resolve_mirrors(self, page):
+        """Resolve every candidate link concurrently and return all distinct APK URLs
+
+        For mirror racing: rather than stopping at the first candidate that
+        yields an APK link, the first five are fetched at once (the session's
+        host and rate limits still apply) so the downloader can pick the
+        fastest. Candidates are often different builds, so the downloader
+        only races those serving the same file as the first (see
+        APKDownloader.race_mirrors). The JavaScript links are only tried
+        when none resolves.
+        """
+        try:
+            if not page.links_loaded:
+                self.load_candidate_links(page)
             
-            if not download_links:
-                # Method 2: Look for buttons with download text
-                download_buttons = soup.find_all(['a', 'button'], 
-                                               string=re.compile(r'download|begin download', re.I))
-                for button in download_buttons:
-                    href = button.get('href', '')
-                    if href and '/download/' in href:
-                        download_links.append(button)
+            ordered = self.memo.order_candidates(page.candidate_links, page.strategy)[:5]
+            print(f"📎 Resolving {len(ordered)} download links concurrently")
+            app = METRICS.current_app
             
-            if not download_links:
-                # Method 3: Look for any links with download in class or id
-                download_links = soup.find_all(['a', 'div'], 
-                                             attrs={'class': re.compile(r'download', re.I),
-                                                   'href': re.compile(r'.*')})
+            def resolve(item):
+                with METRICS.app(app):
+                    return self.resolve_candidate(page, *item)
             
-            print(f"📎 Found {len(download_links)} potential download links")
+            with ThreadPoolExecutor(max_workers=max(len(ordered), 1)) as executor:
+                results = list(executor.map(resolve, enumerate(ordered)))
             
-            # Step 4: Try each download link
-            for i, link in enumerate(download_links[:5]):  # Limit to first 5 to avoid too many requests
-                href = link.get('href', '')
-                if not href:
-                    continue
-                    
-                # Construct full URL
-                if href.startswith('/'):
-                    download_id_url = self.base_domain + href
-                elif href.startswith('http'):
-                    download_id_url = href
-                else:
-                    download_id_url = urllib.parse.urljoin(self.base_domain, href)
-                
-                print(f"🔍 Trying download link {i+1}: {download_id_url}")
-                
-                try:
-                    # Step 4: Get final download page
-                    final_response = self.session.get(download_id_url)
-                    final_response.raise_for_status()
-                    
-                    final_soup = BeautifulSoup(final_response.content, 'html.parser')
-                    
-                    # Extract direct APK download link
-                    apk_link = self.extract_direct_apk_link(final_soup, download_id_url)
-                    if apk_link:
-                        print(f"✅ Success! Found APK: {apk_link}")
-                        return apk_link
-                    
-                    time.sleep(1)  # Be nice to the server
-                    
-                except Exception as e:
-                    print(f"❌ Failed with link {i+1}: {e}")
+            mirrors = []
+            for download_id_url, (method, apk_link) in zip(ordered, results):
+                if not apk_link or apk_link in mirrors:
                     continue
+                if not mirrors:
+                    self.record_candidate(page, download_id_url, method)
+                mirrors.append(apk_link)
+            
+            if not mirrors:
+                apk_link = self.try_javascript_links(page)
+                mirrors = [apk_link] if apk_link else []
+            if not mirrors and page.strategy:
+                self.memo.forget(page.base_url)
             
-            # If all methods fail, try JavaScript-based extraction
-            return self.extract_from_javascript(soup, base_url)
+            print(f"📊 Resolved {len(mirrors)} mirrors in {page.requests} requests")
+            return mirrors
             
         except Exception as e:
             print(f"❌ Error in download process: {e}")
-            return None
+            return []
     
-    def extract_direct_apk_link(self, soup, page_url):
-        """Extract direct APK download link from final page"""
-        print(f"🔍 Extracting APK link from: {page_url}")
-        
-        # Method 1: Direct .apk links
-        apk_links = soup.find_all('a', href=re.compile(r'\.apk($|\?|#)', re.I))
-        for link in apk_links:
-            href = link.get('href', '')
-            if href:
-                full_url = href if href.startswith('http') else urllib.parse.urljoin(self.base_domain, href)
-                print(f"📦 Found direct APK link: {full_url}")
-                return full_url
-        
-        # Method 2: Look for download buttons with data attributes
-        download_elements = soup.find_all(attrs={
-            'data-download': True,
-            'href': re.compile(r'.*')
-        })
-        for element in download_elements:
-            href = element.get('href', '')
-            if href and '.apk' in href.lower():
-                full_url = href if href.startswith('http') else urllib.parse.urljoin(self.base_domain, href)
-                print(f"📦 Found data-download APK: {full_url}")
-                return full_url
-        
-        # Method 3: Look for iframes or redirects
-        iframes = soup.find_all('iframe', src=re.compile(r'.*'))
-        for iframe in iframes:
-            src = iframe.get('src', '')
-            if src and '.apk' in src.lower():
-                full_url = src if src.startswith('http') else urllib.parse.urljoin(self.base_domain, src)
-                print(f"📦 Found iframe APK: {full_url}")
-                return full_url
+    def try_javascript_links(self, page):
+        """JavaScript-based extraction, recording the strategy when it works"""
+        print("🔄 Trying JavaScript-based extraction...")
         
-        # Method 4: Extract from JavaScript variables
-        script_tags = soup.find_all('script')
-        for script in script_tags:
-            if script.string:
-                # Look for various URL patterns in JavaScript
-                patterns = [
-                    r'https?://[^"\']*\.apk[^"\']*',
-                    r'downloadUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
-                    r'fileUrl\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']',
-                    r'href\s*[=:]\s*["\']([^"\']*\.apk[^"\']*)["\']'
-                ]
-                
-                for pattern in patterns:
-                    matches = re.findall(pattern, script.string, re.I)
-                    for match in matches:
-                        if isinstance(match, tuple):
-                            match = match[0]  # Get the first group if it's a tuple
-                        full_url = match if match.startswith('http') else urllib.parse.urljoin(self.base_domain, match)
-                        print(f"📦 Found JavaScript APK: {full_url}")
-                        return full_url
+        for i, match in enumerate(page.javascript_links):
+            print(f"🔗 Found potential JS download: {match}")
+            # Try to access this URL
+            try:
+                response = self.fetch(page, match, f'javascript-{i+1}')
+                method, apk_link = self.find_apk_link(self.parse(response.content), match,
+                                                      page.strategy.get('extraction'))
+                if apk_link:
+                    self.memo.record(page.base_url, 'javascript', extraction=method, link_url=match,
+                                     requests=page.requests)
+                    return apk_link
+            except Exception:
+                continue
         
-        print(f"❌ No APK link found on {page_url}")
         return None
     
-    def extract_from_javascript(self, soup, base_url):
-        """Alternative extraction method for JavaScript-heavy pages"""
-        print("🔄 Trying JavaScript-based extraction...")
+    def find_apk_link(self, scan, page_url, prefer=None):
+        """Return (method, url) of the APK link on a final page, trying method prefer first"""
+        print(f"🔍 Extracting APK link from: {page_url}")
         
-        # Look for scripts that might contain download logic
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string and 'download' in script.string.lower():
-                # Extract any URLs that might be download endpoints
-                url_patterns = [
-                    r'https?://[^"\']*/download/[^"\']*',
-                    r'https?://[^"\']*/file/[^"\']*',
-                    r'https?://[^"\']*\.apk[^"\']*'
-                ]
-                
-                for pattern in url_patterns:
-                    matches = re.findall(pattern, script.string, re.I)
-                    for match in matches:
-                        if 'getmodsapk' in match.lower():
-                            print(f"🔗 Found potential JS download: {match}")
-                            # Try to access this URL
-                            try:
-                                response = self.session.get(match)
-                                if response.status_code == 200:
-                                    js_soup = BeautifulSoup(response.content, 'html.parser')
-                                    apk_link = self.extract_direct_apk_link(js_soup, match)
-                                    if apk_link:
-                                        return apk_link
-                            except:
-                                continue
+        with METRICS.span('extract', what='apk_link') as span:
+            method, href = scan.find_apk_link(prefer)
+            span['method'] = method
+        if href:
+            full_url = self.full_url(href)
+            labels = {
+                'direct': 'direct APK link',
+                'data-download': 'data-download APK',
+                'iframe': 'iframe APK',
+                'javascript': 'JavaScript APK'
+            }
+            print(f"📦 Found {labels[method]}: {full_url}")
+            return method, full_url
         
-        return None
+        print(f"❌ No APK link found on {page_url}")
+        return None, None
+    
+    def find_javascript_links(self, scan):
+        """Collect getmodsapk URLs referenced from download-related scripts"""
+        return [link for link in scan.find_javascript_links() if 'getmodsapk' in link.lower()]
     
     def get_current_version(self, base_url):
         """Get current version from the website"""
-        try:
-            response = self.session.get(base_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for version in multiple places
-            version_pattern = r'v?(\d+\.\d+\.\d+)'
-            
-            # Check page title and headings
-            title = soup.find('title')
-            if title:
-                version_match = re.search(version_pattern, title.get_text(), re.I)
-                if version_match:
-                    return version_match.group(0)
-            
-            # Check main content
-            main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main', re.I))
-            if main_content:
-                version_match = re.search(version_pattern, main_content.get_text(), re.I)
-                if version_match:
-                    return version_match.group(0)
-            
-            # Check specific version elements
-            version_elements = soup.find_all(['span', 'div', 'p'], 
-                                           string=re.compile(r'v?\d+\.\d+\.\d+', re.I))
-            for element in version_elements:
-                version = extract_version_info(element.get_text())
-                if version:
-                    return version
-            
-            # Fallback: extract from any text
-            page_text = soup.get_text()
-            version_match = re.search(version_pattern, page_text, re.I)
-            if version_match:
-                return version_match.group(0)
-            
-            return None
-            
-        except Exception as e:
-            print(f"❌ Error getting current version: {e}")
-            return None
+        page = self.inspect_app(base_url, with_links=False)
+        return page.version if page else None
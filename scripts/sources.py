@@ -0,0 +1,107 @@
+import abc
+import importlib
+import inspect
+import itertools
+import urllib.parse
+
+# Modules that define Source plugins; importing one registers its sources
+SOURCE_MODULES = ('scraper',)
+
+_registry = []
+
+class UnsupportedSourceError(ValueError):
+    """No registered source handles a URL's host"""
+
+class Source(abc.ABC):
+    """Interface every APK site plugin implements.
+
+    Subclasses set `name`, the `hosts` they serve (a host also covers its
+    subdomains) and their politeness policy: `concurrency` in-flight
+    page requests (file downloads are not counted) and `rate_limit`
+    request starts per second. They implement inspect_app(), returning an
+    AppPage with at least the site version, and resolve_download_url(page),
+    returning a direct APK URL or None. Sites that offer several mirrors
+    can override resolve_mirrors(page).
+    """
+    name = None
+    hosts = ()
+    concurrency = 2
+    rate_limit = 2.0
+
+    @abc.abstractmethod
+    def inspect_app(self, base_url, with_links=True):
+        """AppPage for base_url (version, download page, links), or None"""
+
+    @abc.abstractmethod
+    def resolve_download_url(self, page):
+        """Direct APK URL for an AppPage, or None"""
+
+    def resolve_mirrors(self, page):
+        """Every direct APK URL for the page, best guess first"""
+        url = self.resolve_download_url(page)
+        return [url] if url else []
+
+    def get_current_version(self, base_url):
+        page = self.inspect_app(base_url, with_links=False)
+        return page.version if page else None
+
+    def get_download_links(self, base_url):
+        page = self.inspect_app(base_url)
+        return self.resolve_download_url(page) if page else None
+
+    @classmethod
+    def handles(cls, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        return any(host == domain or host.endswith('.' + domain) for domain in cls.hosts)
+
+def register_source(cls):
+    """Class decorator adding a Source subclass to the registry"""
+    if inspect.isabstract(cls):
+        missing = ', '.join(sorted(cls.__abstractmethods__))
+        raise TypeError(f"source {cls.__name__} does not implement {missing}")
+    if cls not in _registry:
+        _registry.append(cls)
+    return cls
+
+def load_sources():
+    for module in SOURCE_MODULES:
+        importlib.import_module(module)
+    return list(_registry)
+
+def source_for_url(url):
+    for cls in load_sources():
+        if cls.handles(url):
+            return cls
+    raise UnsupportedSourceError(f"no scraper source handles {url}")
+
+def host_limits(concurrency=None):
+    """Per-host in-flight caps for setup_session, from each source's policy"""
+    return {host: cls.concurrency if concurrency is None else concurrency for cls in load_sources() for host in cls.hosts}
+
+def rate_limits(rate=None):
+    """Per-host request rates for setup_session, from each source's policy"""
+    return {host: cls.rate_limit if rate is None else rate for cls in load_sources() for host in cls.hosts}
+
+class SourceRegistry:
+    """One scraper instance per source, picked by URL host"""
+    def __init__(self, **kwargs):
+        # Passed to every source constructor (session, memo, debug, parser, ...)
+        self.kwargs = kwargs
+        self._instances = {}
+
+    def for_url(self, url):
+        cls = source_for_url(url)
+        if cls not in self._instances:
+            self._instances[cls] = cls(**self.kwargs)
+        return self._instances[cls]
+
+    def interleave(self, apks):
+        """Round-robin apps across sources so one slow site cannot hog the workers"""
+        by_source = {}
+        for apk in apks:
+            try:
+                key = source_for_url(apk['base_url']).name
+            except UnsupportedSourceError:
+                key = None
+            by_source.setdefault(key, []).append(apk)
+        return [apk for group in itertools.zip_longest(*by_source.values()) for apk in group if apk]
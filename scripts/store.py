@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Kept outside STATE_DIR: CI caches that directory and must not carry full APKs around
+APK_STORE_DIR = os.getenv('APK_STORE_DIR', '.apk-store')
+# Versions kept per app; older objects are pruned after each add
+APK_STORE_KEEP = int(os.getenv('APK_STORE_KEEP', '2'))
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ContentStore:
+    """Content-addressed APK store.
+
+    Objects live at objects/<aa>/<sha256>.apk. index.json maps each source
+    URL to the digest plus the validators (ETag, Last-Modified, size) seen
+    when it was fetched, along with the app and version it belongs to.
+    """
+    def __init__(self, root=APK_STORE_DIR, keep=APK_STORE_KEEP):
+        self.root = root
+        self.keep = keep
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'entries': {}}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest + '.apk')
+
+    def _unchanged(self, entry, remote, size_only=False):
+        """True when the remote validators show the stored bytes are still current.
+
+        size_only accepts a matching Content-Length when the server sent no
+        validators; only safe once app and version are known to match.
+        """
+        if not os.path.exists(self.object_path(entry['digest'])):
+            return False
+        if remote.get('size') is not None and remote['size'] != entry.get('size'):
+            return False
+        if remote.get('etag') and entry.get('etag'):
+            return remote['etag'] == entry['etag']
+        if remote.get('last_modified') and entry.get('last_modified'):
+            return remote['last_modified'] == entry['last_modified']
+        return size_only and remote.get('size') is not None
+
+    def lookup(self, url, remote, app=None, version=None):
+        """Stored entry for url (or app/version) whose bytes are unchanged, else None"""
+        with self._lock:
+            entries = self.index['entries']
+            entry = entries.get(url)
+            if entry and self._unchanged(entry, remote):
+                return entry
+            if app and version:
+                # Download URLs are often tokenised; fall back to the app/version
+                for candidate in entries.values():
+                    if (candidate.get('app') == app and candidate.get('version') == version
+                            and self._unchanged(candidate, remote, size_only=True)):
+                        return candidate
+            return None
+
+    def previous(self, app, version):
+        """Newest stored entry of app for a version other than version, else None"""
+        with self._lock:
+            candidates = [entry for entry in self.index['entries'].values()
+                          if entry.get('app') == app and entry.get('version') != version
+                          and os.path.exists(self.object_path(entry['digest']))]
+        return max(candidates, key=lambda entry: entry['stored_at']) if candidates else None
+
+    def materialize(self, digest, filepath):
+        """Place the stored object at filepath (hard link when possible)"""
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        try:
+            os.link(self.object_path(digest), filepath)
+        except OSError:
+            shutil.copyfile(self.object_path(digest), filepath)
+        return filepath
+
+    def add(self, filepath, url, remote, app=None, version=None, digest=None):
+        """Record a freshly downloaded file; identical bytes are stored once"""
+        digest = digest or file_sha256(filepath)
+        object_path = self.object_path(digest)
+        # Linking, indexing and pruning happen under one lock so a concurrent
+        # add never prunes an object that is linked but not yet indexed
+        with self._lock:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            if os.path.exists(object_path):
+                print(f"♻️  Identical APK already in store ({digest[:12]}), deduplicating")
+                self.materialize(digest, filepath)
+            else:
+                try:
+                    os.link(filepath, object_path)
+                except OSError:
+                    shutil.copyfile(filepath, object_path)
+
+            replaced = self.index['entries'].get(url)
+            self.index['entries'][url] = {
+                'digest': digest,
+                'app': app,
+                'version': version,
+                'size': os.path.getsize(object_path),
+                'etag': remote.get('etag'),
+                'last_modified': remote.get('last_modified'),
+                'stored_at': time.time()
+            }
+            dropped = {replaced['digest']} if replaced else set()
+            if app:
+                dropped |= self._prune(app)
+            self._remove_unreferenced(dropped)
+            self._save_index()
+        return digest
+
+    def _prune(self, app):
+        """Drop all but the newest `keep` versions of app; returns the dropped digests"""
+        entries = self.index['entries']
+        by_version = {}
+        for url, entry in entries.items():
+            if entry.get('app') == app:
+                newest = by_version.get(entry.get('version'), 0)
+                by_version[entry.get('version')] = max(newest, entry['stored_at'])
+        stale = sorted(by_version, key=by_version.get, reverse=True)[self.keep:]
+        dropped = set()
+        for url in [url for url, entry in entries.items() if entry.get('app') == app and entry.get('version') in stale]:
+            dropped.add(entries.pop(url)['digest'])
+        return dropped
+
+    def _remove_unreferenced(self, digests):
+        """Delete the objects for digests that no index entry uses any more"""
+        live = {entry['digest'] for entry in self.index['entries'].values()}
+        for digest in digests - live:
+            try:
+                os.remove(self.object_path(digest))
+            except OSError:
+                pass
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from utils import STATE_DIR
+
+STRATEGY_MEMO_PATH = os.getenv('APK_STRATEGY_MEMO', os.path.join(STATE_DIR, 'strategy-memo.json'))
+
+def link_pattern(url):
+    """Shape of a link with its numbers wildcarded, e.g. /download/{n}/"""
+    return re.sub(r'\d+', '{n}', urllib.parse.urlsplit(url).path)
+
+class StrategyMemo:
+    """Which resolution strategy produced the APK last time, per app.
+
+    For every app base URL it keeps the route that worked ('candidates' or
+    'javascript'), the link discovery method, the index, URL shape and URL
+    of the winning candidate and the APK extraction method. Wins are also
+    tallied per site so apps without history start with the site's best
+    strategy.
+    """
+    def __init__(self, path=STRATEGY_MEMO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault('apps', {})
+        data.setdefault('sites', {})
+        return data
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, base_url):
+        """Strategy to try first for base_url (app history, else site favourites)"""
+        with self._lock:
+            entry = self.data['apps'].get(base_url)
+            if entry:
+                return dict(entry)
+            site = self.data['sites'].get(urllib.parse.urlsplit(base_url).hostname or '')
+            if not site:
+                return {}
+            return {key: _most_common(site.get(key)) for key in ('route', 'discovery', 'extraction', 'link_pattern')}
+
+    def order_candidates(self, links, strategy):
+        """Candidate links with the memoised winner moved to the front"""
+        pattern = strategy.get('link_pattern')
+        matching = [link for link in links if pattern and link_pattern(link) == pattern]
+        index = strategy.get('link_index')
+        first = None
+        if index is not None and index < len(links) and (not pattern or links[index] in matching):
+            first = links[index]
+        elif matching:
+            first = matching[0]
+        if first is None:
+            return list(links)
+        return [first] + [link for link in links if link != first]
+
+    def record(self, base_url, route, discovery=None, link_index=None, link_url=None, extraction=None, requests=None):
+        """Remember the strategy that just produced an APK link for base_url"""
+        entry = {
+            'route': route,
+            'discovery': discovery,
+            'link_index': link_index,
+            'link_pattern': link_pattern(link_url) if link_url else None,
+            'link_url': link_url,
+            'extraction': extraction,
+            'requests': requests,
+            'updated_at': time.time()
+        }
+        with self._lock:
+            previous = self.data['apps'].get(base_url, {})
+            same = all(previous.get(key) == entry[key] for key in ('route', 'discovery', 'link_pattern', 'extraction'))
+            entry['hits'] = previous.get('hits', 0) + 1 if same else 1
+            self.data['apps'][base_url] = entry
+
+            site = self.data['sites'].setdefault(urllib.parse.urlsplit(base_url).hostname or '', {})
+            for key in ('route', 'discovery', 'extraction', 'link_pattern'):
+                if entry[key] is not None:
+                    tally = site.setdefault(key, {})
+                    tally[str(entry[key])] = tally.get(str(entry[key]), 0) + 1
+            self.save()
+
+    def forget(self, base_url):
+        """Drop base_url's strategy after it stopped working"""
+        with self._lock:
+            if self.data['apps'].pop(base_url, None) is not None:
+                self.save()
+
+def _most_common(tally):
+    if not tally:
+        return None
+    value = Counter(tally).most_common(1)[0][0]
+    return int(value) if value.isdigit() else value
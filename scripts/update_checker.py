@@ -1,30 +1,138 @@
 #!/usr/bin/env python3
-from scraper import GetModsApkScraper
-from utils import load_config
+"""Check tracked apps for new versions and write a manifest of the changed ones.
+
+    python scripts/update_checker.py --shard 0/4 --manifest shard-0.json
+    python scripts/update_checker.py --merge shard-*.json --manifest updates.json
+
+main.py --auto --manifest updates.json then processes only those apps.
+"""
+import argparse
+import json
 import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import sources
+from utils import setup_session
+from versions import is_newer
+from config_store import shared_config_store
+
+DEFAULT_MANIFEST = 'update-manifest.json'
+
+def parse_shard(value):
+    """'i/N' -> (i, N) with 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}")
+    return index, count
+
+def in_shard(apk, shard):
+    """Stable shard assignment by app name, so list edits move few apps"""
+    index, count = shard
+    return zlib.crc32(apk['name'].encode('utf-8')) % count == index
+
+def check_app(registry, apk):
+    """Return (apk, site version or None)"""
+    print(f"Checking {apk['name']}...")
+    try:
+        page = registry.for_url(apk['base_url']).inspect_app(apk['base_url'], with_links=False)
+    except sources.UnsupportedSourceError as e:
+        print(f"❌ {e}")
+        return apk, None
+    return apk, page.version if page else None
+
+def check_updates(shard=(0, 1), workers=4, manifest_path=DEFAULT_MANIFEST, registry=None):
+    session = None
+    if registry is None:
+        # Each source's own concurrency cap and rate limit still apply per host
+        session = setup_session(host_limits=sources.host_limits(), rate_limits=sources.rate_limits(),
+                                pool_size=max(workers, 4))
+        registry = sources.SourceRegistry(session=session)
+    tracked = shared_config_store().tracked_apks()
+    apks = registry.interleave([apk for apk in tracked if in_shard(apk, shard)])
+    print(f"🧩 Shard {shard[0]}/{shard[1]}: {len(apks)} of {len(tracked)} apps")
+
+    updates = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for apk, current_version in executor.map(lambda apk: check_app(registry, apk), apks):
+            if not current_version:
+                print(f"⚠️  Could not read the site version for {apk['name']}")
+                errors.append(apk['name'])
+            elif is_newer(current_version, apk['current_version']):
+                print(f"UPDATE AVAILABLE: {apk['name']} {apk['current_version']} -> {current_version}")
+                updates.append({
+                    'name': apk['name'],
+                    'base_url': apk['base_url'],
+                    'release_tag': apk['release_tag'],
+                    'current_version': apk['current_version'],
+                    'site_version': current_version
+                })
+            else:
+                print(f"No update for {apk['name']}")
+
+    if session and session.cache:
+        print(session.cache.summary())
+
+    manifest = {
+        'generated_at': time.time(),
+        'shards': [f"{shard[0]}/{shard[1]}"],
+        'checked': len(apks),
+        'updates': updates,
+        'errors': errors
+    }
+    write_manifest(manifest, manifest_path)
+    return manifest
+
+def write_manifest(manifest, path):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📝 {len(manifest['updates'])} update(s) written to {path}")
+    set_outputs(manifest, path)
+
+def read_manifest(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def merge_manifests(paths, manifest_path=DEFAULT_MANIFEST):
+    """Combine per-shard manifests into one"""
+    merged = {'generated_at': time.time(), 'shards': [], 'checked': 0, 'updates': [], 'errors': []}
+    for path in paths:
+        manifest = read_manifest(path)
+        merged['shards'].extend(manifest.get('shards', []))
+        merged['checked'] += manifest.get('checked', 0)
+        merged['updates'].extend(manifest.get('updates', []))
+        merged['errors'].extend(manifest.get('errors', []))
+    write_manifest(merged, manifest_path)
+    return merged
+
+def set_outputs(manifest, path):
+    """Expose the result as GitHub Actions step outputs"""
+    output_file = os.getenv('GITHUB_OUTPUT')
+    if not output_file:
+        return
+    with open(output_file, 'a') as f:
+        f.write(f"updates_available={'true' if manifest['updates'] else 'false'}\n")
+        f.write(f"update_count={len(manifest['updates'])}\n")
+        f.write(f"manifest={path}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description='Check tracked APKs for new versions')
+    parser.add_argument('--shard', type=parse_shard, default=(0, 1),
+                        help='Check only shard i of N (0-based), e.g. 2/4')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent page checks')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help='Where to write the update manifest')
+    parser.add_argument('--merge', nargs='+', metavar='SHARD_MANIFEST',
+                        help='Merge shard manifests instead of checking')
+    args = parser.parse_args()
 
-def check_updates():
-    scraper = GetModsApkScraper()
-    config = load_config()
-    updates_available = False
-    
-    for apk in config['tracked_apks']:
-        print(f"Checking {apk['name']}...")
-        current_version = scraper.get_current_version(apk['base_url'])
-        
-        if current_version and current_version != apk['current_version']:
-            print(f"UPDATE AVAILABLE: {apk['name']} {apk['current_version']} -> {current_version}")
-            updates_available = True
-        else:
-            print(f"No update for {apk['name']}")
-    
-    # Set output for GitHub Actions
-    if updates_available:
-        print("::set-output name=updates_available::true")
+    if args.merge:
+        merge_manifests(args.merge, args.manifest)
     else:
-        print("::set-output name=updates_available::false")
-    
-    return updates_available
+        check_updates(args.shard, args.workers, args.manifest)
 
 if __name__ == "__main__":
-    check_updates()
+    main()
@@ -1,29 +1,325 @@
 import requests
 from bs4 import BeautifulSoup
+from collections import defaultdict
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+import email.utils
+import random
 import re
 import json
 import os
+import threading
+import time
+import urllib.parse
+from http_cache import CachingAdapter, ResponseCache
+from http2_adapter import CachingHTTP2Adapter, HTTP2Adapter, http2_available
+from versions import parse_version
+from metrics import METRICS
 
-def setup_session():
-    """Setup requests session with headers"""
-    session = requests.Session()
+CONFIG_PATH = 'config/apk-list.json'
+
+# Persistent state shared between runs (cached in CI with actions/cache)
+STATE_DIR = os.getenv('APK_STATE_DIR', '.scraper-state')
+HTTP_CACHE_DIR = os.getenv('APK_HTTP_CACHE_DIR', os.path.join(STATE_DIR, 'http-cache'))
+HTTP_CACHE_MAX_MB = int(os.getenv('APK_HTTP_CACHE_MAX_MB', '64'))
+
+# Shared transport settings
+HTTP_POOL_SIZE = int(os.getenv('APK_HTTP_POOL_SIZE', '16'))
+HTTP_RETRIES = int(os.getenv('APK_HTTP_RETRIES', '4'))
+HTTP_TIMEOUT = (float(os.getenv('APK_HTTP_CONNECT_TIMEOUT', '10')), float(os.getenv('APK_HTTP_READ_TIMEOUT', '30')))
+HTTP2_ENABLED = os.getenv('APK_HTTP2', '') == '1'
+# Requests per second per host (bursts of HTTP_RATE_BURST are let through)
+HTTP_RATE_LIMITS = {'getmodsapk.com': float(os.getenv('APK_GETMODSAPK_RPS', '2'))}
+HTTP_RATE_BURST = int(os.getenv('APK_HTTP_RATE_BURST', '3'))
+HTTP_BACKOFF_BASE = 1.0
+HTTP_BACKOFF_MAX = 30.0
+HTTP_RETRY_AFTER_MAX = 120.0
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+_response_caches = {}
+_response_caches_lock = threading.Lock()
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+class HostLimiter:
+    """Cap the number of in-flight page requests per host.
+
+    A streamed response keeps its slot until closed only while its body is
+    a page; file transfers give the slot back once their headers arrive,
+    so a long download never starves page fetches on the same site (their
+    concurrency is bounded by the pipeline's transfer workers instead).
+    """
+    def __init__(self, limits=None):
+        # Keys are host names; a limit for 'example.com' also covers its subdomains
+        self.limits = dict(limits or {})
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        for domain, limit in self.limits.items():
+            if host == domain or host.endswith('.' + domain):
+                with self._lock:
+                    if domain not in self._semaphores:
+                        self._semaphores[domain] = threading.BoundedSemaphore(limit)
+                    return self._semaphores[domain]
+        return None
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one request slot for the host of url"""
+        semaphore = self._semaphore(url)
+        if semaphore is None:
+            yield
+            return
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def acquire(self, url):
+        """Take a slot and return a callable that gives it back exactly once"""
+        semaphore = self._semaphore(url)
+        if semaphore is None:
+            return lambda: None
+        semaphore.acquire()
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                semaphore.release()
+        return release
+
+class RateLimiter:
+    """Space out request starts per host (generic cell rate algorithm).
+
+    Up to `burst` requests go out back to back; after that each host gets
+    at most `rate` request starts per second, however many threads share it.
+    """
+    def __init__(self, rates=None, burst=HTTP_RATE_BURST):
+        # Keys are host names; a rate for 'example.com' also covers its subdomains
+        self.rates = {domain: rate for domain, rate in (rates or {}).items() if rate and rate > 0}
+        self.burst = max(1, burst)
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def _domain(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        for domain in self.rates:
+            if host == domain or host.endswith('.' + domain):
+                return domain
+        return None
+
+    def reserve(self, url):
+        """Book the next start time for url's host; returns seconds to wait"""
+        domain = self._domain(url)
+        if domain is None:
+            return 0.0
+        interval = 1.0 / self.rates[domain]
+        with self._lock:
+            now = time.monotonic()
+            theoretical = max(self._next.get(domain, now), now)
+            delay = max(0.0, theoretical - now - (self.burst - 1) * interval)
+            self._next[domain] = theoretical + interval
+        return delay
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+class LatencyStats:
+    """Per-host request latency (time to response headers)"""
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self.retries = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, url, seconds):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            self._samples[host].append(seconds)
+
+    def record_retry(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            self.retries[host] += 1
+
+    def summary(self):
+        lines = []
+        with self._lock:
+            for host, samples in sorted(self._samples.items()):
+                ordered = sorted(samples)
+                p50 = ordered[len(ordered) // 2]
+                p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                lines.append(f"{host}: {len(ordered)} requests, p50 {p50 * 1000:.0f} ms, "
+                             f"p95 {p95 * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms, "
+                             f"{self.retries.get(host, 0)} retries")
+        return lines
+
+class ScraperSession(requests.Session):
+    """requests session shared by the scraper, downloader and release uploader.
+
+    Adds default timeouts, jittered exponential backoff on connection
+    errors and 429/5xx answers (honouring Retry-After), per-host
+    concurrency limits, per-host request rates and per-host latency
+    statistics.
+    """
+    def __init__(self, host_limiter=None, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, rate_limiter=None):
+        super().__init__()
+        self.host_limiter = host_limiter
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.cache = None
+        self.latency = LatencyStats()
+
+    def clear_memo(self):
+        """Drop every adapter's in-process response memo (the disk cache stays)"""
+        for adapter in self.adapters.values():
+            if hasattr(adapter, 'clear_memo'):
+                adapter.clear_memo()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+    def retry_after(self, response):
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return min(float(value), HTTP_RETRY_AFTER_MAX)
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return min(max(0.0, when.timestamp() - time.time()), HTTP_RETRY_AFTER_MAX)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        retryable = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries or not retryable
+            try:
+                response = self._limited_request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"🔁 {e.__class__.__name__} for {url}; retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    if not getattr(response, 'from_cache', False):
+                        self.latency.record(url, response.elapsed.total_seconds())
+                        METRICS.count('http_requests_total', host=urllib.parse.urlsplit(url).hostname or '')
+                    return response
+                delay = self.retry_after(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                print(f"🔁 HTTP {response.status_code} for {url}; retrying in {delay:.1f}s")
+                response.close()
+            self.latency.record_retry(url)
+            METRICS.count('http_retries_total', host=urllib.parse.urlsplit(url).hostname or '')
+            time.sleep(delay)
+
+    def _limited_request(self, method, url, *args, **kwargs):
+        if self.rate_limiter:
+            self.rate_limiter.wait(url)
+        if not self.host_limiter:
+            return super().request(method, url, *args, **kwargs)
+
+        release = self.host_limiter.acquire(url)
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            release()
+            raise
+
+        if not kwargs.get('stream') or not is_page_response(response):
+            release()
+            return response
+
+        # Streamed pages are still in flight until the response is closed
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+        response.close = close_and_release
+        return response
+
+def is_page_response(response):
+    """Whether a response body is a page (HTML, JSON, text) rather than a file"""
+    content_type = response.headers.get('Content-Type', '').lower()
+    return not content_type or content_type.startswith(('text/', 'application/json', 'application/xhtml', 'application/xml'))
+
+def get_response_cache(cache_dir):
+    """One ResponseCache per directory so sessions in a process share an index"""
+    with _response_caches_lock:
+        if cache_dir not in _response_caches:
+            _response_caches[cache_dir] = ResponseCache(cache_dir, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024)
+        return _response_caches[cache_dir]
+
+def setup_session(host_limits=None, cache_dir=HTTP_CACHE_DIR, pool_size=HTTP_POOL_SIZE,
+                  timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, http2=HTTP2_ENABLED, rate_limits=HTTP_RATE_LIMITS):
+    """Setup requests session with headers, pooling, retries and the conditional-request cache"""
+    session = ScraperSession(HostLimiter(host_limits) if host_limits else None, timeout=timeout, retries=retries,
+                             rate_limiter=RateLimiter(rate_limits) if rate_limits else None)
+    if cache_dir:
+        session.cache = get_response_cache(cache_dir)
+    
+    if http2 and not http2_available():
+        print("⚠️  HTTP/2 requested but httpx[http2] is not installed - using HTTP/1.1")
+        http2 = False
+    
+    if http2:
+        # HTTP/2 only applies to TLS; plain http stays on the HTTP/1.1 pool
+        https_adapter = CachingHTTP2Adapter(session.cache, pool_size=pool_size) if session.cache else HTTP2Adapter(pool_size=pool_size)
+    else:
+        https_adapter = None
+    http_adapter = (CachingAdapter(session.cache, pool_connections=pool_size, pool_maxsize=pool_size)
+                    if session.cache else HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    session.mount('http://', http_adapter)
+    session.mount('https://', https_adapter or http_adapter)
     session.headers.update({
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     })
     return session
 
+def shared_session():
+    """Process-wide session so scraper, downloader and uploader reuse connections"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = setup_session()
+        return _shared_session
+
 def extract_version_info(text):
     """Extract version from text"""
-    version_pattern = r'v?(\d+\.\d+\.\d+)'
+    version_pattern = r'v?(\d+\.\d+(?:\.\d+){0,2})'
     match = re.search(version_pattern, text)
     return match.group(0) if match else None
 
-def load_config():
+def normalize_version(version):
+    """Normalize version string for display and storage (v7.34.3-mod -> 7.34.3)"""
+    parsed = parse_version(version)
+    return str(parsed) if parsed else ""
+
+def load_config(path=CONFIG_PATH):
     """Load APK configuration"""
-    with open('config/apk-list.json', 'r') as f:
+    with open(path, 'r') as f:
         return json.load(f)
 
-def save_config(config):
+def save_config(config, path=CONFIG_PATH):
     """Save APK configuration"""
-    with open('config/apk-list.json', 'w') as f:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
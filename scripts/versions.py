@@ -0,0 +1,88 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache, total_ordering
+from typing import Optional, Tuple
+
+# 2-4 numeric components, then an optional pre-release/build suffix
+VERSION_PARSE_RE = re.compile(r'(?<![\d.])v?(\d+(?:\.\d+){1,3})(?!\.?\d)\s*[-_+ ]?\s*(.*)$', re.I)
+# The number may follow a dot, dash or space: beta2, rc.1, beta-3, "Beta 2"
+PRE_RELEASE_RE = re.compile(r'(dev|alpha|a|beta|b|preview|pre|rc)(?:[-. ]?(\d+))?\b', re.I)
+# Pre-releases order before the release they lead up to
+PRE_RELEASE_RANKS = {'dev': 0, 'alpha': 1, 'a': 1, 'beta': 2, 'b': 2, 'preview': 3, 'pre': 3, 'rc': 4}
+RELEASE_RANK = 5
+COMPONENTS = 4
+
+@total_ordering
+@dataclass(frozen=True, eq=False)
+class Version:
+    """A parsed app version.
+
+    release holds 2-4 numeric components. A pre-release tag (alpha, beta,
+    rc, ...) orders before the plain release; any other suffix ('mod',
+    'premium', '+build.5') is build metadata and is ignored when ordering,
+    so v7.34.3, 7.34.3-mod and 7.34.3.0 all compare equal.
+    """
+    raw: str
+    release: Tuple[int, ...]
+    pre: Optional[Tuple[str, int]] = None
+    build: str = ''
+
+    @property
+    def key(self):
+        release = self.release + (0,) * (COMPONENTS - len(self.release))
+        if self.pre:
+            return release + (PRE_RELEASE_RANKS[self.pre[0]], self.pre[1])
+        return release + (RELEASE_RANK, 0)
+
+    def __str__(self):
+        text = '.'.join(str(part) for part in self.release)
+        if self.pre:
+            text += f"-{self.pre[0]}{self.pre[1] or ''}"
+        return text
+
+    def __eq__(self, other):
+        return isinstance(other, Version) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+@lru_cache(maxsize=4096)
+def parse_version(text):
+    """Parse a version string, or return None if it has no 2-4 part version"""
+    if not text:
+        return None
+    match = VERSION_PARSE_RE.search(str(text).strip())
+    if not match:
+        return None
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    suffix = match.group(2).strip()
+    pre = None
+    pre_match = PRE_RELEASE_RE.match(suffix)
+    if pre_match:
+        tag = pre_match.group(1).lower()
+        pre = ('alpha' if tag == 'a' else 'beta' if tag == 'b' else 'pre' if tag == 'preview' else tag,
+               int(pre_match.group(2) or 0))
+        suffix = suffix[pre_match.end():].lstrip('-_+. ')
+    return Version(raw=str(text), release=release, pre=pre, build=suffix)
+
+def compare_versions(a, b):
+    """-1, 0 or 1 like cmp(); None when either side does not parse"""
+    va, vb = parse_version(a), parse_version(b)
+    if va is None or vb is None:
+        return None
+    return (va > vb) - (va < vb)
+
+def is_newer(site_version, current_version):
+    """True only when site_version is strictly newer than current_version.
+
+    An unparseable current version (missing, 'unknown') counts as older;
+    an unparseable site version never triggers a download.
+    """
+    site = parse_version(site_version)
+    if site is None:
+        return False
+    current = parse_version(current_version)
+    return current is None or site > current
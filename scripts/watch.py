@@ -0,0 +1,209 @@
+import heapq
+import os
+import random
+import signal
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import METRICS
+from pipeline import run_pipeline
+from sources import UnsupportedSourceError
+from versions import is_newer
+
+# Polling bounds for the watch daemon; the default matches the old 6-hour cron
+WATCH_DEFAULT_INTERVAL = 6 * 3600
+WATCH_MIN_INTERVAL = float(os.getenv('APK_WATCH_MIN_MINUTES', '30')) * 60
+WATCH_MAX_INTERVAL = float(os.getenv('APK_WATCH_MAX_HOURS', '72')) * 3600
+# Aim for this many polls per typical gap between an app's releases
+WATCH_POLLS_PER_RELEASE = 8
+WATCH_JITTER = 0.1
+# Spread the first round of polls instead of hitting every app at start-up
+WATCH_STAGGER = 2.0
+# Wake up at least this often to pick up config changes and signals
+WATCH_IDLE_MAX = 60.0
+
+def poll_interval(history, now=None):
+    """Seconds until an app should be polled again, from its version history.
+
+    history is [(version, first_seen), ...], oldest first. The typical
+    release gap is the median time between first sightings of consecutive
+    versions; the app is polled WATCH_POLLS_PER_RELEASE times per gap. Once
+    the app is overdue (no new version for longer than its usual gap), the
+    interval grows with how overdue it is. Without a cadence yet, the gap
+    is assumed to be at least as long as the app has been watched. Result
+    is clamped to [WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL].
+    """
+    now = now or time.time()
+    seen = [first_seen for _, first_seen in history]
+    gaps = [later - earlier for earlier, later in zip(seen, seen[1:]) if later > earlier]
+    since_change = now - seen[-1] if seen else 0
+    if gaps:
+        expected = statistics.median(gaps)
+    else:
+        expected = max(now - seen[0] if seen else 0, WATCH_DEFAULT_INTERVAL * WATCH_POLLS_PER_RELEASE)
+    interval = expected / WATCH_POLLS_PER_RELEASE
+    if since_change > expected:
+        interval *= since_change / expected
+    return min(max(interval, WATCH_MIN_INTERVAL), WATCH_MAX_INTERVAL)
+
+class WatchScheduler:
+    """Priority queue of (due time, app name)"""
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, name):
+        return name in self._due
+
+    def names(self):
+        return set(self._due)
+
+    def schedule(self, name, due):
+        # Rescheduling leaves the old heap entry behind; pop_due skips it
+        self._due[name] = due
+        heapq.heappush(self._heap, (due, name))
+
+    def discard(self, name):
+        self._due.pop(name, None)
+
+    def next_due(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Names of all apps due at or before now, earliest first"""
+        names = []
+        while self.next_due() is not None and self._heap[0][0] <= now:
+            _, name = heapq.heappop(self._heap)
+            del self._due[name]
+            names.append(name)
+        return names
+
+class Watcher:
+    """Long-running replacement for the update-checker cron.
+
+    Every tracked app sits in a WatchScheduler. When an app comes due its
+    page is checked; a newer version goes straight into the async pipeline
+    in this process (reusing the page already fetched), and the app is
+    rescheduled by poll_interval() from the version history the config
+    store keeps. Stops cleanly on SIGINT/SIGTERM after the current batch.
+    """
+    def __init__(self, config, sources, downloader, workers=4, prometheus=None, **pipeline_options):
+        self.config = config
+        self.sources = sources
+        self.downloader = downloader
+        self.workers = workers
+        self.prometheus = prometheus
+        self.pipeline_options = dict(pipeline_options, workers=workers)
+        self.scheduler = WatchScheduler()
+        self.stopping = threading.Event()
+        self.downloaded = 0
+
+    def next_poll(self, name, now):
+        interval = poll_interval(self.config.version_history(name), now)
+        return now + interval * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+    def sync_apps(self, now):
+        """Schedule newly tracked apps and forget removed ones"""
+        if os.path.exists(self.config.json_path):
+            self.config.sync_from_json()
+        names = [apk['name'] for apk in self.config.tracked_apks()]
+        new = [name for name in names if name not in self.scheduler]
+        for i, name in enumerate(new):
+            self.scheduler.schedule(name, now + i * WATCH_STAGGER)
+        for name in self.scheduler.names() - set(names):
+            self.scheduler.discard(name)
+
+    def check(self, apk):
+        """Inspect one app; returns its AppPage when the site has a newer version"""
+        METRICS.set_app(apk['name'])
+        scraper = self.sources.for_url(apk['base_url'])
+        page = scraper.inspect_app(apk['base_url'], with_links=False)
+        version = page.version if page else None
+        METRICS.count('watch_polls_total', source=scraper.name)
+        if not version:
+            print(f"❌ [{apk['name']}] Could not determine current version")
+            return None
+        if self.config.record_version(apk['name'], version):
+            print(f"🆕 [{apk['name']}] Site now offers {version}")
+        if is_newer(version, apk['current_version']):
+            return page
+        return None
+
+    def poll(self, names):
+        """Check the due apps concurrently and run the pipeline on the changed ones"""
+        apks = [apk for apk in map(self.config.get, names) if apk]
+        pages = {}
+        # A memoized page is only valid for one batch; without this every later
+        # poll would see the first copy of the download and candidate pages
+        session = getattr(self.downloader, 'session', None)
+        if hasattr(session, 'clear_memo'):
+            session.clear_memo()
+
+        def checked(apk):
+            try:
+                return apk, self.check(apk)
+            except UnsupportedSourceError as e:
+                print(f"❌ [{apk['name']}] {e}")
+                return apk, None
+            except Exception as e:
+                print(f"❌ [{apk['name']}] Check failed: {e}")
+                return apk, None
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='watch') as executor:
+            for apk, page in executor.map(checked, apks):
+                if page:
+                    pages[apk['name']] = page
+
+        if pages:
+            changed = [apk for apk in apks if apk['name'] in pages]
+            print(f"🚀 {len(changed)} changed: {', '.join(apk['name'] for apk in changed)}")
+            self.downloaded += run_pipeline(changed, self.sources, self.downloader, pages=pages,
+                                            **self.pipeline_options)
+            self.config.flush()
+
+    def wait(self, seconds):
+        """Sleep until seconds pass or a stop is requested; True if stopping"""
+        return self.stopping.wait(max(seconds, 0))
+
+    def stop(self, signum=None, frame=None):
+        if not self.stopping.is_set():
+            print("🛑 Stopping after the current batch...")
+        self.stopping.set()
+
+    def run(self):
+        """Poll until SIGINT/SIGTERM; returns the number of APKs downloaded"""
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            while not self.stopping.is_set():
+                now = time.time()
+                self.sync_apps(now)
+                due = self.scheduler.next_due()
+                if due is None:
+                    print("💤 No tracked apps; waiting for config changes")
+                    self.wait(WATCH_IDLE_MAX)
+                    continue
+                if due > now:
+                    self.wait(min(due - now, WATCH_IDLE_MAX))
+                    continue
+
+                names = self.scheduler.pop_due(now)
+                print(f"\n👀 Polling {len(names)} app(s) at {time.strftime('%H:%M:%S')}")
+                self.poll(names)
+                now = time.time()
+                for name in names:
+                    self.scheduler.schedule(name, self.next_poll(name, now))
+                next_due = self.scheduler.next_due()
+                if next_due is not None:
+                    print(f"⏰ Next poll in {max(next_due - now, 0) / 60:.0f} min ({len(self.scheduler)} apps scheduled)")
+                if self.prometheus:
+                    METRICS.write_prometheus(self.prometheus)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return self.downloaded
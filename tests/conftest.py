@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts are plain modules run with scripts/ on the path, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
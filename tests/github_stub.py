@@ -0,0 +1,181 @@
+"""In-memory stand-in for the GitHub releases REST API, served on 127.0.0.1.
+
+Implements just what GitHubReleases calls: release lookup by tag, release
+creation, paginated asset listings, asset uploads (with the sha256 digest
+GitHub reports), renames and deletes. Every request is logged as
+(method, path) so tests can check what was sent.
+"""
+import hashlib
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GitHubStub:
+    """Serve fake releases for any repo; use as a context manager"""
+    def __init__(self, token='test-token', page_size=2):
+        self.token = token
+        self.page_size = page_size
+        self.releases = {}
+        self.assets = {}
+        self.requests = []
+        self._ids = iter(range(1, 1 << 30))
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def add_release(self, repo_name, tag, assets=()):
+        """Seed a release with {name: bytes} assets; returns the release"""
+        with self._lock:
+            release = self._new_release(repo_name, tag, tag)
+        for name, content in dict(assets).items():
+            self._add_asset(release['id'], name, content)
+        return release
+
+    def asset_names(self, repo_name, tag):
+        release = self.releases[(repo_name, tag)]
+        return sorted(asset['name'] for asset in self.assets[release['id']])
+
+    def _new_release(self, repo_name, tag, name, body=''):
+        release_id = next(self._ids)
+        release = {
+            'id': release_id,
+            'tag_name': tag,
+            'name': name,
+            'body': body,
+            'upload_url': f"{self.url}/uploads/repos/{repo_name}/releases/{release_id}/assets{{?name,label}}"
+        }
+        self.releases[(repo_name, tag)] = release
+        self.assets[release_id] = []
+        return release
+
+    def _add_asset(self, release_id, name, content):
+        with self._lock:
+            asset = {
+                'id': next(self._ids),
+                'name': name,
+                'label': None,
+                'size': len(content),
+                'digest': f"sha256:{hashlib.sha256(content).hexdigest()}"
+            }
+            self.assets[release_id].append(asset)
+        return asset
+
+    def _find_asset(self, asset_id):
+        for release_id, assets in self.assets.items():
+            for asset in assets:
+                if asset['id'] == asset_id:
+                    return release_id, asset
+        return None, None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, payload=None, headers=()):
+                body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _dispatch(self):
+                parts = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parts.query))
+                with stub._lock:
+                    stub.requests.append((self.command, parts.path))
+                if self.headers.get('Authorization') != f"Bearer {stub.token}":
+                    self._body()
+                    return self._reply(401, {'message': 'Bad credentials'})
+                route = ROUTES.get(self.command, ())
+                for pattern, handler in route:
+                    match = re.fullmatch(pattern, parts.path)
+                    if match:
+                        return handler(self, query, *match.groups())
+                self._body()
+                self._reply(404, {'message': 'Not Found'})
+
+            def get_release(self, query, repo_name, tag):
+                release = stub.releases.get((repo_name, tag))
+                self._reply(200, release) if release else self._reply(404, {'message': 'Not Found'})
+
+            def create_release(self, query, repo_name):
+                data = json.loads(self._body())
+                with stub._lock:
+                    release = stub._new_release(repo_name, data['tag_name'], data.get('name'), data.get('body', ''))
+                self._reply(201, release)
+
+            def list_assets(self, query, repo_name, release_id):
+                assets = stub.assets.get(int(release_id))
+                if assets is None:
+                    return self._reply(404, {'message': 'Not Found'})
+                per_page = min(int(query.get('per_page', 30)), stub.page_size)
+                page = int(query.get('page', 1))
+                headers = []
+                if page * per_page < len(assets):
+                    next_url = f"{stub.url}/repos/{repo_name}/releases/{release_id}/assets?per_page={per_page}&page={page + 1}"
+                    headers.append(('Link', f'<{next_url}>; rel="next"'))
+                self._reply(200, assets[(page - 1) * per_page:page * per_page], headers)
+
+            def upload_asset(self, query, repo_name, release_id):
+                content = self._body()
+                if int(release_id) not in stub.assets:
+                    return self._reply(404, {'message': 'Not Found'})
+                if any(asset['name'] == query['name'] for asset in stub.assets[int(release_id)]):
+                    return self._reply(422, {'message': 'already_exists'})
+                self._reply(201, stub._add_asset(int(release_id), query['name'], content))
+
+            def update_asset(self, query, repo_name, asset_id):
+                data = json.loads(self._body())
+                with stub._lock:
+                    _, asset = stub._find_asset(int(asset_id))
+                    if asset:
+                        asset.update(name=data['name'], label=data.get('label'))
+                self._reply(200, asset) if asset else self._reply(404, {'message': 'Not Found'})
+
+            def delete_asset(self, query, repo_name, asset_id):
+                with stub._lock:
+                    release_id, asset = stub._find_asset(int(asset_id))
+                    if asset:
+                        stub.assets[release_id].remove(asset)
+                self._reply(204) if asset else self._reply(404, {'message': 'Not Found'})
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        repo = r'/repos/([^/]+/[^/]+)'
+        ROUTES = {
+            'GET': [(repo + r'/releases/tags/([^/]+)', Handler.get_release),
+                    (repo + r'/releases/(\d+)/assets', Handler.list_assets)],
+            'POST': [(repo + r'/releases', Handler.create_release),
+                     (r'/uploads' + repo + r'/releases/(\d+)/assets', Handler.upload_asset)],
+            'PATCH': [(repo + r'/releases/assets/(\d+)', Handler.update_asset)],
+            'DELETE': [(repo + r'/releases/assets/(\d+)', Handler.delete_asset)]
+        }
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
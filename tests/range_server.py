@@ -0,0 +1,106 @@
+"""Local HTTP file server with Range support, for downloader tests.
+
+Files are registered in memory. Each can turn off range support (Range
+is ignored and the whole body comes back with 200) or drop the
+connection after a number of bytes on the first transfer longer than
+that, to simulate an interrupted download. Every request is logged as
+(path, Range header).
+"""
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class RangeServer:
+    """Serve registered files on 127.0.0.1; use as a context manager"""
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def add(self, path, content, ranges=True, drop_after=None, etag=None,
+            content_type='application/vnd.android.package-archive'):
+        """Serve content at path; returns its URL"""
+        self.files[path] = {
+            'content': content,
+            'ranges': ranges,
+            'drop_after': drop_after,
+            'content_type': content_type,
+            'etag': etag or f'"{hashlib.sha1(content).hexdigest()}"'
+        }
+        return self.url + path
+
+    def ranges_requested(self, path):
+        return [value for requested, value in self.requests if requested == path and value]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                requested = self.headers.get('Range')
+                with server._lock:
+                    server.requests.append((path, requested))
+                    entry = server.files.get(path)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                content = entry['content']
+                start, end, status = 0, len(content) - 1, 200
+                match = re.fullmatch(r'bytes=(\d+)-(\d*)', requested or '')
+                if entry['ranges'] and match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), end) if match.group(2) else end
+                    status = 206
+                body = content[start:end + 1]
+
+                self.send_response(status)
+                self.send_header('Content-Type', entry['content_type'])
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', entry['etag'])
+                if entry['ranges']:
+                    self.send_header('Accept-Ranges', 'bytes')
+                if status == 206:
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(content)}")
+                self.end_headers()
+
+                with server._lock:
+                    drop_after = entry['drop_after']
+                    if drop_after is not None and drop_after < len(body):
+                        entry['drop_after'] = None
+                    else:
+                        drop_after = None
+                if drop_after is not None:
+                    self.wfile.write(body[:drop_after])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,23 @@
+"""Small zip files shaped like APKs, for download, validation and delta tests"""
+import io
+import random
+import zipfile
+
+def make_apk(entries=None, seed=0, payload_size=64 * 1024, compression=zipfile.ZIP_STORED):
+    """Bytes of a zip with an AndroidManifest.xml and some incompressible entries.
+
+    entries maps extra names to bytes; seed varies the generated payloads.
+    """
+    rng = random.Random(seed)
+    files = {
+        'AndroidManifest.xml': b'<manifest package="com.example.app"/>',
+        'classes.dex': rng.randbytes(payload_size),
+        'resources.arsc': rng.randbytes(payload_size // 2),
+        'res/raw/asset.bin': rng.randbytes(payload_size // 4),
+    }
+    files.update(entries or {})
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import struct
+import zipfile
+import pytest
+from artifact import (EOCD_SIZE, ZIP_CENTRAL_MAGIC, ZIP_EOCD_MAGIC, InvalidAPKError, StreamValidator,
+                      inspect_apk, read_central_directory)
+from synthetic_apk import make_apk
+
+def to_zip64(data):
+    """Rewrite a small zip with zip64 end records and 64-bit sizes/offsets in every entry"""
+    eocd = data.rfind(ZIP_EOCD_MAGIC)
+    (_, _, _, _, count, cd_size, cd_offset, _) = struct.unpack('<4sHHHHIIH', data[eocd:eocd + EOCD_SIZE])
+    directory = data[cd_offset:cd_offset + cd_size]
+    records = []
+    pos = 0
+    while pos < len(directory):
+        assert directory[pos:pos + 4] == ZIP_CENTRAL_MAGIC
+        compressed_size, file_size, name_len, extra_len, comment_len = struct.unpack('<II HHH', directory[pos + 20:pos + 34])
+        local_offset, = struct.unpack('<I', directory[pos + 42:pos + 46])
+        end = pos + 46 + name_len + extra_len + comment_len
+        zip64_extra = struct.pack('<HHQQQ', 0x0001, 24, file_size, compressed_size, local_offset)
+        header = bytearray(directory[pos:pos + 46])
+        struct.pack_into('<II', header, 20, 0xFFFFFFFF, 0xFFFFFFFF)
+        struct.pack_into('<H', header, 30, extra_len + len(zip64_extra))
+        struct.pack_into('<I', header, 42, 0xFFFFFFFF)
+        name = directory[pos + 46:pos + 46 + name_len]
+        extra = directory[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+        comment = directory[pos + 46 + name_len + extra_len:end]
+        records.append(bytes(header) + name + extra + zip64_extra + comment)
+        pos = end
+    directory = b''.join(records)
+    eocd64_offset = cd_offset + len(directory)
+    eocd64 = struct.pack('<4sQHHIIQQQQ', b'PK\x06\x06', 44, 45, 45, 0, 0, count, count, len(directory), cd_offset)
+    locator = struct.pack('<4sIQI', b'PK\x06\x07', 0, eocd64_offset, 1)
+    end_record = struct.pack('<4sHHHHIIH', ZIP_EOCD_MAGIC, 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+    return data[:cd_offset] + directory + eocd64 + locator + end_record
+
+def central_directory(data):
+    return read_central_directory(io.BytesIO(data), len(data))
+
+def test_stream_validator_hashes_chunks_in_order():
+    data = make_apk(seed=1)
+    validator = StreamValidator(len(data))
+    for start in range(0, len(data), 4096):
+        validator.update(data[start:start + 4096])
+
+    assert validator.finish() == hashlib.sha256(data).hexdigest()
+
+@pytest.mark.parametrize('head, message', [
+    (b'<!DOCTYPE html><html><body>Not found</body></html>', 'HTML page'),
+    (b'  <html>rate limited</html>', 'HTML page'),
+    (b'{"error": "expired link"}', 'JSON'),
+    (b'\x7fELF\x02\x01\x01', 'unexpected file header'),
+])
+def test_stream_validator_rejects_bad_magic(head, message):
+    with pytest.raises(InvalidAPKError, match=message):
+        StreamValidator().update(head)
+
+def test_stream_validator_accepts_magic_split_across_chunks():
+    validator = StreamValidator()
+    validator.update(b'PK')
+    validator.update(b'\x03\x04rest')
+
+    assert validator.position == 8
+
+def test_stream_validator_rejects_more_bytes_than_content_length():
+    validator = StreamValidator(10)
+    with pytest.raises(InvalidAPKError, match='more than the advertised 10'):
+        validator.update(b'PK\x03\x04' + b'\0' * 10)
+
+def test_stream_validator_rejects_short_body():
+    validator = StreamValidator(100)
+    validator.update(b'PK\x03\x04' + b'\0' * 10)
+
+    with pytest.raises(InvalidAPKError, match='Content-Length was 100'):
+        validator.finish()
+
+def test_central_directory_matches_zipfile():
+    data = make_apk(seed=2, compression=zipfile.ZIP_DEFLATED)
+    expected = zipfile.ZipFile(io.BytesIO(data)).infolist()
+
+    entries = central_directory(data)
+
+    assert [(e.name, e.crc32, e.compressed_size, e.file_size, e.local_offset, e.method) for e in entries] == \
+        [(i.filename, i.CRC, i.compress_size, i.file_size, i.header_offset, i.compress_type) for i in expected]
+
+def test_zip64_central_directory():
+    data = make_apk(seed=3)
+    zip64 = to_zip64(data)
+    # The rewrite must still be a zip that zipfile accepts
+    assert zipfile.ZipFile(io.BytesIO(zip64)).namelist() == zipfile.ZipFile(io.BytesIO(data)).namelist()
+
+    assert central_directory(zip64) == central_directory(data)
+
+def test_corrupt_zip64_record_is_rejected():
+    zip64 = bytearray(to_zip64(make_apk(seed=3)))
+    zip64[zip64.rfind(b'PK\x06\x06')] = ord('X')
+
+    with pytest.raises(InvalidAPKError, match='zip64'):
+        central_directory(bytes(zip64))
+
+@pytest.mark.parametrize('cut', [22, 1000, 60 * 1024])
+def test_truncated_zip_is_rejected(cut):
+    data = make_apk(seed=4)
+
+    with pytest.raises(InvalidAPKError):
+        central_directory(data[:-cut])
+
+def test_inspect_apk_requires_manifest(tmp_path):
+    path = tmp_path / 'plain.zip'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('classes.dex', b'dex')
+    path.write_bytes(buffer.getvalue())
+
+    with pytest.raises(InvalidAPKError, match='AndroidManifest.xml'):
+        inspect_apk(str(path), path.stat().st_size, 'digest')
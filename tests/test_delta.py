@@ -0,0 +1,52 @@
+import hashlib
+import random
+import zipfile
+import pytest
+from delta import DeltaError, apply_delta, build_delta
+from synthetic_apk import make_apk
+
+@pytest.fixture
+def versions(tmp_path):
+    """Two builds that share their native library and dex but not their resources"""
+    rng = random.Random(7)
+    shared = {'lib/arm64-v8a/libapp.so': rng.randbytes(256 * 1024), 'classes.dex': rng.randbytes(128 * 1024)}
+    old = make_apk({**shared, 'resources.arsc': rng.randbytes(32 * 1024)}, seed=1)
+    new = make_apk({**shared, 'resources.arsc': rng.randbytes(32 * 1024), 'assets/added.bin': rng.randbytes(8 * 1024)},
+                   seed=1, compression=zipfile.ZIP_STORED)
+    old_path, new_path = tmp_path / 'app-v1.apk', tmp_path / 'app-v2.apk'
+    old_path.write_bytes(old)
+    new_path.write_bytes(new)
+    return str(old_path), str(new_path), new
+
+def test_round_trip_rebuilds_new_apk_byte_for_byte(versions, tmp_path):
+    old_path, new_path, new = versions
+    delta_path = str(tmp_path / 'app-v2.apkdelta')
+
+    result = build_delta(old_path, new_path, delta_path)
+    digest = apply_delta(old_path, delta_path, str(tmp_path / 'rebuilt.apk'))
+
+    assert (tmp_path / 'rebuilt.apk').read_bytes() == new
+    assert digest == hashlib.sha256(new).hexdigest()
+    assert result.reused >= 2
+    assert result.ratio < 0.5
+
+def test_rejects_a_different_base(versions, tmp_path):
+    old_path, new_path, _ = versions
+    delta_path = str(tmp_path / 'app-v2.apkdelta')
+    build_delta(old_path, new_path, delta_path)
+    other = tmp_path / 'other.apk'
+    other.write_bytes(make_apk(seed=9))
+
+    with pytest.raises(DeltaError, match='not the APK this delta was built against'):
+        apply_delta(str(other), delta_path, str(tmp_path / 'rebuilt.apk'))
+    assert not (tmp_path / 'rebuilt.apk').exists()
+
+def test_rejects_a_truncated_delta(versions, tmp_path):
+    old_path, new_path, _ = versions
+    delta_path = tmp_path / 'app-v2.apkdelta'
+    build_delta(old_path, new_path, str(delta_path))
+    delta_path.write_bytes(delta_path.read_bytes()[:-64])
+
+    with pytest.raises(DeltaError, match='truncated'):
+        apply_delta(old_path, str(delta_path), str(tmp_path / 'rebuilt.apk'))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['app-v1.apk', 'app-v2.apk', 'app-v2.apkdelta']
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import pytest
+import downloader as downloader_module
+from config_store import ConfigStore
+from downloader import APKDownloader
+from range_server import RangeServer
+from store import ContentStore
+from synthetic_apk import make_apk
+from utils import setup_session
+
+@pytest.fixture
+def server():
+    with RangeServer() as running:
+        yield running
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    # download_apk writes into ./downloads
+    monkeypatch.chdir(tmp_path)
+    return APKDownloader(session=setup_session(cache_dir=None, rate_limits=None),
+                         store=ContentStore(str(tmp_path / 'store')),
+                         config=ConfigStore(str(tmp_path / 'config.db'), str(tmp_path / 'apk-list.json')))
+
+def test_race_only_ranks_urls_serving_the_same_file(server, downloader):
+    universal = make_apk(seed=1)
+    armeabi = make_apk(seed=2, payload_size=48 * 1024)
+    primary = server.add('/download/1202/app.apk', universal)
+    other_build = server.add('/download/1201/app.apk', armeabi)
+    mirror = server.add('/mirror/app.apk', universal)
+
+    ranked = downloader.race_mirrors([primary, other_build, mirror])
+
+    assert sorted(url for url, _ in ranked) == sorted([primary, mirror])
+
+def test_race_never_publishes_a_different_build(server, downloader):
+    wanted = make_apk(seed=1)
+    primary = server.add('/download/1202/app.apk', wanted)
+    other_build = server.add('/download/1201/app.apk', make_apk(seed=2, payload_size=16 * 1024))
+
+    artifact = downloader.download_apk(primary, 'app-v1.0.apk', app='app', version='v1.0', mirrors=[other_build])
+
+    with open(artifact.path, 'rb') as f:
+        assert f.read() == wanted
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    # Split a few hundred KB into ranges instead of needing 8 MB files
+    monkeypatch.setattr(downloader_module, 'PARALLEL_MIN_SIZE', 64 * 1024)
+    monkeypatch.setattr(downloader_module, 'PARALLEL_MIN_SEGMENT', 32 * 1024)
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_interrupted_download_resumes_from_part_file(server, downloader, monkeypatch):
+    content = make_apk(seed=3, payload_size=128 * 1024)
+    url = server.add('/app.apk', content, drop_after=100_000)
+    monkeypatch.setattr(downloader_module, 'DOWNLOAD_ATTEMPTS', 1)
+
+    assert downloader.download_apk(url, 'app-v1.0.apk', app='app', version='v1.0') is None
+    assert os.path.getsize('downloads/app-v1.0.apk.part') > 0
+
+    artifact = downloader.download_apk(url, 'app-v1.0.apk', app='app', version='v1.0')
+
+    assert read(artifact.path) == content
+    assert artifact.sha256 == hashlib.sha256(content).hexdigest()
+    resumed = [value for value in server.ranges_requested('/app.apk') if value != 'bytes=0-0']
+    assert len(resumed) == 1 and int(resumed[0][len('bytes='):-1]) > 0
+    assert not os.path.exists('downloads/app-v1.0.apk.part')
+    assert not os.path.exists('downloads/app-v1.0.apk.part.json')
+
+def test_parallel_segments_reassemble_byte_identical(server, downloader, small_segments):
+    content = make_apk(seed=4, payload_size=128 * 1024)
+    # The first range to pass 50 KB is cut off and has to be retried
+    url = server.add('/app.apk', content, drop_after=50_000)
+
+    artifact = downloader.download_apk(url, 'app-v1.0.apk', app='app', version='v1.0')
+
+    assert read(artifact.path) == content
+    assert artifact.sha256 == hashlib.sha256(content).hexdigest()
+    segments = [value for value in server.ranges_requested('/app.apk') if value != 'bytes=0-0']
+    assert len(set(segments)) == downloader.connections
+    assert len(segments) == downloader.connections + 1
+
+def test_range_ignored_falls_back_to_single_stream(server, downloader, small_segments):
+    content = make_apk(seed=5, payload_size=128 * 1024)
+    url = server.add('/app.apk', content, ranges=False)
+
+    artifact = downloader.download_apk(url, 'app-v1.0.apk', app='app', version='v1.0')
+
+    assert read(artifact.path) == content
+    # The probe's Range got a 200, so the file comes down in one plain GET
+    assert server.requests == [('/app.apk', 'bytes=0-0'), ('/app.apk', None)]
@@ -0,0 +1,42 @@
+import pytest
+from extractor import declared_charset, scan_html, scan_until_version, sniff_charset
+
+PAGE = '<html><head><title>Café Racer v3.1.4 MOD APK</title></head><body><main>ok</main></body></html>'
+
+def chunked(data, size=7):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+@pytest.mark.parametrize('content_type, expected', [
+    ('text/html; charset=UTF-8', 'utf-8'),
+    ('text/html;charset="ISO-8859-1"', 'iso8859-1'),
+    ('text/html; charset=utf-16', 'utf-16'),
+    ('text/html', None),
+    ('text/html; charset=no-such-codec', None),
+    (None, None),
+])
+def test_declared_charset(content_type, expected):
+    assert declared_charset(content_type) == expected
+
+def test_sniff_charset_reads_meta_tag():
+    assert sniff_charset(b'<html><head><meta charset="windows-1252">') == 'cp1252'
+    assert sniff_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">') == 'shift_jis'
+    assert sniff_charset(b'<html><head><title>x</title>') == 'utf-8'
+
+def test_streamed_scan_uses_declared_encoding():
+    scan, complete, _ = scan_until_version(chunked(PAGE.encode('utf-16')), encoding='utf-16')
+
+    assert scan.find_version() == 'v3.1.4'
+    # Decoded correctly, the title settles the version before the body
+    assert not complete
+
+def test_streamed_scan_sniffs_meta_charset():
+    page = PAGE.replace('<head>', '<head><meta charset="iso-8859-1">').encode('iso-8859-1')
+    scan, _, _ = scan_until_version(chunked(page))
+    assert scan.find_version() == 'v3.1.4'
+    assert scan_html(page).find_version() == 'v3.1.4'
+
+def test_multibyte_characters_split_across_chunks():
+    page = PAGE.replace('Café', 'Café ' * 50).encode('utf-8')
+    scan, _, _ = scan_until_version(chunked(page, 3), encoding='utf-8')
+
+    assert scan.find_version() == 'v3.1.4'
@@ -0,0 +1,27 @@
+import os
+from metrics import Metrics, prune_run_logs
+
+def test_stage_summary_sums_apps_in_pipeline_order():
+    metrics = Metrics()
+    metrics.add_time('download', 2.0, app='spotify')
+    metrics.add_time('fetch', 0.5, app='spotify')
+    metrics.add_time('fetch', 0.25, app='youtube')
+    metrics.add_time('verify', 1.0, app='youtube')
+
+    assert metrics.stage_totals()['fetch'] == (0.75, 2)
+    assert metrics.stage_summary() == 'fetch 0.8s/2  download 2.0s/1  verify 1.0s/1'
+
+def test_stage_summary_is_empty_without_spans():
+    assert Metrics().stage_summary() == ''
+
+def test_prune_run_logs_keeps_newest_and_other_files(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"run-2026010{i}T000000.jsonl"
+        path.write_text('{}\n')
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    (tmp_path / 'notes.jsonl').write_text('mine')
+
+    prune_run_logs(str(tmp_path), 2)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'notes.jsonl', 'run-20260103T000000.jsonl', 'run-20260104T000000.jsonl']
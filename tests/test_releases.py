@@ -0,0 +1,77 @@
+import hashlib
+import os
+import pytest
+from artifact import APKArtifact
+from config_store import ConfigStore
+from downloader import APKDownloader
+from github_stub import GitHubStub
+from releases import GitHubReleases
+from store import ContentStore
+from utils import setup_session
+
+REPO = 'owner/apk-mirror'
+TAG = 'spotify'
+
+@pytest.fixture
+def stub():
+    with GitHubStub() as server:
+        yield server
+
+@pytest.fixture
+def downloader(stub, tmp_path):
+    session = setup_session(cache_dir=None, rate_limits=None)
+    downloader = APKDownloader(session=session, store=ContentStore(str(tmp_path / 'store')),
+                               config=ConfigStore(str(tmp_path / 'config.db'), str(tmp_path / 'apk-list.json')))
+    downloader.releases = GitHubReleases(stub.token, session=session, api_url=stub.url)
+    return downloader
+
+def make_artifact(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return APKArtifact(path=str(path), size=len(content), sha256=hashlib.sha256(content).hexdigest())
+
+def test_creates_release_for_new_app(stub, downloader, tmp_path):
+    artifact = make_artifact(tmp_path, 'spotify-v8.9.28.apk', os.urandom(4096))
+
+    assert downloader.upload_to_release(REPO, artifact, TAG, 'v8.9.28')
+
+    assert stub.asset_names(REPO, TAG) == ['spotify-v8.9.28.apk']
+    asset = stub.assets[stub.releases[(REPO, TAG)]['id']][0]
+    assert asset['digest'] == f"sha256:{artifact.sha256}"
+    assert ('POST', f"/repos/{REPO}/releases") in stub.requests
+
+def test_replaces_previous_version_and_keeps_unrelated_assets(stub, downloader, tmp_path):
+    artifact = make_artifact(tmp_path, 'spotify-v8.9.28.apk', os.urandom(4096))
+    release = stub.add_release(REPO, TAG, {
+        'spotify-v8.9.27.apk': b'old apk' * 200,
+        'spotify-lite-v1.0.apk': b'another app' * 200,
+        'youtube-v19.1.apk': b'unrelated' * 200,
+        'README.txt': b'notes',
+        # Temporary name of an upload that was interrupted before the swap
+        f"uploading-{artifact.sha256[:12]}-spotify-v8.9.28.apk": b'partial'
+    })
+    kept = {asset['name']: asset['id'] for asset in stub.assets[release['id']]
+            if not asset['name'].startswith(('spotify-v', 'uploading-'))}
+
+    assert downloader.upload_to_release(REPO, artifact, TAG, 'v8.9.28')
+
+    assert stub.asset_names(REPO, TAG) == sorted(list(kept) + ['spotify-v8.9.28.apk'])
+    assert {asset['name']: asset['id'] for asset in stub.assets[release['id']] if asset['name'] in kept} == kept
+    assert ('POST', f"/repos/{REPO}/releases") not in stub.requests
+
+def test_skips_upload_when_digest_matches(stub, downloader, tmp_path):
+    content = os.urandom(4096)
+    stub.add_release(REPO, TAG, {'spotify-v8.9.28.apk': content})
+    artifact = make_artifact(tmp_path, 'spotify-v8.9.28.apk', content)
+
+    assert downloader.upload_to_release(REPO, artifact, TAG, 'v8.9.28')
+
+    assert not [path for method, path in stub.requests if path.startswith('/uploads/')]
+    assert stub.asset_names(REPO, TAG) == ['spotify-v8.9.28.apk']
+
+def test_rejects_bad_token(stub, tmp_path):
+    releases = GitHubReleases('wrong', session=setup_session(cache_dir=None, rate_limits=None), api_url=stub.url)
+    stub.add_release(REPO, TAG)
+
+    with pytest.raises(Exception):
+        releases.list_assets(REPO, stub.releases[(REPO, TAG)])
@@ -0,0 +1,46 @@
+"""Request and latency budgets for the scraper, replayed from fixtures/html"""
+import contextlib
+import io
+import os
+import pytest
+from bench_scraper import bench_app
+from fixtures import FIXTURES_DIR, FixtureServer
+from scraper import GetModsApkScraper
+from strategy_memo import StrategyMemo
+from utils import setup_session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, FIXTURES_DIR)
+# A warm resolution is the app page plus the memoized download page
+MAX_WARM_REQUESTS = 2
+MAX_COLD_REQUESTS = 4
+# Loose enough for a loaded CI runner; a regression here is usually 10x, not 10%
+MAX_RESOLVE_MS = float(os.getenv('APK_BENCH_MAX_RESOLVE_MS', '250'))
+
+pytestmark = pytest.mark.skipif(not os.path.exists(os.path.join(FIXTURES, 'manifest.json')),
+                                reason='no recorded fixtures')
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    memo_path = str(tmp_path_factory.mktemp('memo') / 'memo.json')
+    with FixtureServer(FIXTURES) as server:
+        scraper = GetModsApkScraper(session=setup_session(cache_dir=None, rate_limits=None), memo=StrategyMemo(memo_path))
+        scraper.base_domain = server.url
+        # The scraper narrates every step
+        with contextlib.redirect_stdout(io.StringIO()):
+            return {url.rstrip('/').rsplit('/', 1)[-1]: bench_app(scraper, server, url, repeat=5)
+                    for url in server.app_urls()}
+
+def test_every_fixture_app_resolves(results):
+    assert results
+    assert [app for app, result in results.items() if not result['resolved']] == []
+
+def test_request_budget_per_app(results):
+    over = {app: (result['requests_cold'], result['requests_warm']) for app, result in results.items()
+            if result['requests_cold'] > MAX_COLD_REQUESTS or result['requests_warm'] > MAX_WARM_REQUESTS}
+    assert over == {}
+
+def test_resolve_latency(results):
+    slow = {app: round(result['resolve_ms'], 1) for app, result in results.items()
+            if result['resolve_ms'] > MAX_RESOLVE_MS}
+    assert slow == {}
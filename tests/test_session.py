@@ -0,0 +1,39 @@
+import threading
+import pytest
+from range_server import RangeServer
+from utils import setup_session
+
+@pytest.fixture
+def server():
+    with RangeServer() as running:
+        yield running
+
+def fetch_in_thread(session, url):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(response=session.get(url)), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    return result.get('response')
+
+def test_streamed_download_does_not_hold_a_page_slot(server):
+    session = setup_session(host_limits={'127.0.0.1': 1}, cache_dir=None, rate_limits=None)
+    download = server.add('/dl/app.apk', b'\0' * (1 << 20))
+    page = server.add('/app/', b'<html></html>', content_type='text/html; charset=utf-8')
+
+    transfer = session.get(download, stream=True)
+    try:
+        response = fetch_in_thread(session, page)
+        assert response is not None and response.status_code == 200
+    finally:
+        transfer.close()
+
+def test_streamed_page_holds_its_slot_until_closed(server):
+    session = setup_session(host_limits={'127.0.0.1': 1}, cache_dir=None, rate_limits=None)
+    page = server.add('/app/', b'<html></html>', content_type='text/html')
+    other = server.add('/other/', b'<html></html>', content_type='text/html')
+
+    streamed = session.get(page, stream=True)
+    assert not session.host_limiter._semaphore(other).acquire(blocking=False)
+    streamed.close()
+
+    assert fetch_in_thread(session, other).status_code == 200
@@ -0,0 +1,30 @@
+import pytest
+import sources
+from sources import Source, register_source
+
+def test_incomplete_source_fails_at_registration():
+    class HalfSource(Source):
+        name = 'half'
+        hosts = ('half.example',)
+
+        def inspect_app(self, base_url, with_links=True):
+            return None
+
+    with pytest.raises(TypeError, match='resolve_download_url'):
+        register_source(HalfSource)
+    assert HalfSource not in sources.load_sources()
+
+def test_base_source_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        Source()
+
+def test_registered_sources_handle_subdomains():
+    cls = sources.source_for_url('https://dl.getmodsapk.com/file.apk')
+
+    assert cls.handles('https://getmodsapk.com/app/')
+    assert not cls.handles('https://notgetmodsapk.com/app/')
+
+def test_host_limit_override_is_not_dropped_when_falsy():
+    assert set(sources.host_limits().values()) == {2}
+    assert set(sources.host_limits(5).values()) == {5}
+    assert set(sources.host_limits(0).values()) == {0}
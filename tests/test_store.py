@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from store import ContentStore, file_sha256
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def test_concurrent_adds_keep_every_app(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'), keep=1)
+
+    def add(i):
+        path = write(tmp_path, f"app{i}.apk", os.urandom(2048))
+        return store.add(path, f"https://files.example/app{i}.apk", {'size': 2048}, app=f"app{i}", version='1.0')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        digests = list(executor.map(add, range(32)))
+
+    assert all(os.path.exists(store.object_path(digest)) for digest in digests)
+    assert len(store.index['entries']) == 32
+
+def test_prune_removes_only_dropped_versions(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'), keep=1)
+    other = store.add(write(tmp_path, 'other.apk', b'other' * 500), 'https://x/other.apk', {}, app='other', version='1')
+    old = store.add(write(tmp_path, 'old.apk', b'old' * 500), 'https://x/app-1.apk', {}, app='app', version='1')
+    new = store.add(write(tmp_path, 'new.apk', b'new' * 500), 'https://x/app-2.apk', {}, app='app', version='2')
+
+    assert not os.path.exists(store.object_path(old))
+    assert os.path.exists(store.object_path(new))
+    assert os.path.exists(store.object_path(other))
+    assert store.lookup('https://x/app-1.apk', {}) is None
+
+def test_identical_bytes_are_stored_once(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+    content = os.urandom(4096)
+    first = store.add(write(tmp_path, 'a.apk', content), 'https://x/a.apk', {}, app='a', version='1')
+    second = store.add(write(tmp_path, 'b.apk', content), 'https://y/a.apk', {}, app='a', version='1')
+
+    assert first == second == file_sha256(str(tmp_path / 'b.apk'))
+    assert os.path.exists(store.object_path(first))
+
+def test_size_only_match_needs_app_and_version(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+    store.add(write(tmp_path, 'a.apk', b'x' * 1024), 'https://x/a.apk', {'size': 1024}, app='a', version='1')
+
+    assert store.lookup('https://x/a.apk', {'size': 1024}) is None
+    assert store.lookup('https://x/tokenised?t=2', {'size': 1024}, app='a', version='1') is not None
+    assert store.lookup('https://x/a.apk', {'size': 1024, 'etag': '"e"'}) is None
@@ -0,0 +1,102 @@
+import pytest
+from extractor import scan_html
+from utils import extract_version_info, normalize_version
+from versions import compare_versions, is_newer, parse_version
+
+@pytest.mark.parametrize('text, release, pre, build', [
+    ('7.34.3', (7, 34, 3), None, ''),
+    ('v7.34.3', (7, 34, 3), None, ''),
+    ('V2.5', (2, 5), None, ''),
+    ('1.2.3.4', (1, 2, 3, 4), None, ''),
+    ('7.34.3-mod', (7, 34, 3), None, 'mod'),
+    ('7.34.3 Premium', (7, 34, 3), None, 'Premium'),
+    ('1.0.0+build.5', (1, 0, 0), None, 'build.5'),
+    ('2.0.0-beta', (2, 0, 0), ('beta', 0), ''),
+    ('2.0.0-beta2', (2, 0, 0), ('beta', 2), ''),
+    ('2.0.0-beta.3', (2, 0, 0), ('beta', 3), ''),
+    ('2.0.0-beta-4', (2, 0, 0), ('beta', 4), ''),
+    ('5.0 Beta 2', (5, 0), ('beta', 2), ''),
+    ('1.0.0-rc1', (1, 0, 0), ('rc', 1), ''),
+    ('1.0.0 RC 2', (1, 0, 0), ('rc', 2), ''),
+    ('1.0.0a1', (1, 0, 0), ('alpha', 1), ''),
+    ('1.0.0b', (1, 0, 0), ('beta', 0), ''),
+    ('3.1-preview', (3, 1), ('pre', 0), ''),
+    ('4.0.0-dev', (4, 0, 0), ('dev', 0), ''),
+    ('2.0-beta-mod', (2, 0), ('beta', 0), 'mod'),
+    ('App Name v3.2.1 MOD APK', (3, 2, 1), None, 'MOD APK'),
+])
+def test_parse_version(text, release, pre, build):
+    version = parse_version(text)
+    assert version.release == release
+    assert version.pre == pre
+    assert version.build == build
+
+@pytest.mark.parametrize('text', [None, '', 'unknown', '7', 'v', 'latest', '.5', '1.'])
+def test_parse_version_rejects(text):
+    assert parse_version(text) is None
+
+@pytest.mark.parametrize('older, newer', [
+    ('7.34.3', '7.35.0'),
+    ('7.9', '7.10'),
+    ('1.2.3', '1.2.3.1'),
+    ('1.9.9.9', '2.0'),
+    ('2.0.0-beta', '2.0.0'),
+    ('2.0.0-alpha2', '2.0.0-beta1'),
+    ('2.0.0-beta1', '2.0.0-beta2'),
+    ('5.0 Beta 2', '5.0 Beta 10'),
+    ('2.0.0-rc9', '2.0.0'),
+    ('2.0.0-dev', '2.0.0-a'),
+    ('1.0', '1.0.1-beta'),
+])
+def test_ordering(older, newer):
+    assert parse_version(older) < parse_version(newer)
+    assert compare_versions(older, newer) == -1
+    assert compare_versions(newer, older) == 1
+    assert is_newer(newer, older)
+    assert not is_newer(older, newer)
+
+@pytest.mark.parametrize('a, b', [
+    ('7.34.3', 'v7.34.3'),
+    ('7.34.3', '7.34.3-mod'),
+    ('7.34.3', '7.34.3.0'),
+    ('2.5', '2.5.0.0'),
+    ('1.0.0-beta', '1.0.0-b0'),
+    ('1.0.0+build.1', '1.0.0+build.2'),
+])
+def test_equal_versions(a, b):
+    assert parse_version(a) == parse_version(b)
+    assert hash(parse_version(a)) == hash(parse_version(b))
+    assert compare_versions(a, b) == 0
+    assert not is_newer(a, b)
+    assert not is_newer(b, a)
+
+@pytest.mark.parametrize('site, current, expected', [
+    ('1.0.0', None, True),
+    ('1.0.0', 'unknown', True),
+    ('unknown', '1.0.0', False),
+    (None, None, False),
+    ('v2.5', '2.4.9', True),
+])
+def test_is_newer_unparseable(site, current, expected):
+    assert is_newer(site, current) is expected
+
+def test_compare_versions_unparseable():
+    assert compare_versions('1.0', 'unknown') is None
+
+@pytest.mark.parametrize('text, expected', [
+    ('v7.34.3-mod', '7.34.3'),
+    ('5.0 Beta 2', '5.0-beta2'),
+    ('unknown', ''),
+])
+def test_normalize_version(text, expected):
+    assert normalize_version(text) == expected
+
+@pytest.mark.parametrize('html, expected', [
+    ('<title>App v2.5 MOD APK</title>', 'v2.5'),
+    ('<title>App v7.34.3 MOD APK</title>', 'v7.34.3'),
+    ('<title>App 1.2.3.4</title>', '1.2.3.4'),
+    ('<body><main><p>Version 10.1 (Premium)</p></main></body>', '10.1'),
+])
+def test_page_version_detection(html, expected):
+    assert scan_html(html).find_version() == expected
+    assert extract_version_info(html) == expected
@@ -0,0 +1,39 @@
+import pytest
+from versions import is_newer, parse_version
+
+hypothesis = pytest.importorskip('hypothesis')
+from hypothesis import given, strategies as st  # noqa: E402
+
+components = st.lists(st.integers(min_value=0, max_value=10 ** 6), min_size=2, max_size=4)
+pre_tags = st.sampled_from(['dev', 'alpha', 'a', 'beta', 'b', 'preview', 'pre', 'rc'])
+separators = st.sampled_from(['', '-', '.', ' '])
+
+def render(release):
+    return '.'.join(map(str, release))
+
+@given(components, st.booleans())
+def test_release_round_trip(release, prefix):
+    version = parse_version(('v' if prefix else '') + render(release))
+    assert version.release == tuple(release)
+    assert version.pre is None
+
+@given(components, pre_tags, separators, st.integers(min_value=0, max_value=999))
+def test_pre_release_number_survives_separator(release, tag, separator, number):
+    version = parse_version(f"{render(release)}-{tag}{separator}{number}")
+    assert version.pre[1] == number
+    assert version < parse_version(render(release))
+
+@given(components, components)
+def test_ordering_matches_padded_tuples(a, b):
+    pad = lambda release: tuple(release) + (0,) * (4 - len(release))
+    assert is_newer(render(a), render(b)) == (pad(a) > pad(b))
+
+@given(components, components, components)
+def test_ordering_is_transitive(a, b, c):
+    va, vb, vc = sorted(parse_version(render(release)) for release in (a, b, c))
+    assert va <= vb <= vc and va <= vc
+
+@given(components, st.sampled_from(['mod', 'Premium', '+build.7', ' MOD APK']))
+def test_build_suffix_is_ignored(release, suffix):
+    assert parse_version(render(release) + suffix) == parse_version(render(release))
+    assert not is_newer(render(release) + suffix, render(release))